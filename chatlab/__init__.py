@@ -15,27 +15,61 @@ I am the king of the skies, the lord of the avian realm. Squawk!
 __author__ = """Kyle Kelley"""
 __email__ = "rgbkrk@gmail.com"
 
-from . import models
+import importlib
+from typing import TYPE_CHECKING
+
 from ._version import __version__
-from .chat import Chat
-from .decorators import ChatlabMetadata, expose_exception_to_llm, incremental_display
-from .messaging import (
-    ai,
-    assistant,
-    assistant_function_call,
-    function_result,
-    human,
-    narrate,
-    system,
-    user,
-    tool_result,
-)
-from .registry import FunctionRegistry
-from spork import Markdown
-from instructor import Partial
+
+if TYPE_CHECKING:
+    from . import models
+    from .batch import BatchResult, run_many
+    from .chat import Chat
+    from .decorators import ChatlabMetadata, cached_tool, expose_exception_to_llm, incremental_display
+    from .messaging import (
+        ai,
+        assistant,
+        assistant_function_call,
+        function_result,
+        human,
+        narrate,
+        system,
+        user,
+        tool_result,
+    )
+    from .registry import FunctionRegistry
+    from .turns import TurnResult
+    from spork import Markdown
+    from instructor import Partial
 
 __version__ = __version__
 
+# Everything is imported on first access (PEP 562), so `import chatlab` doesn't pay for openai,
+# IPython and pydantic until they're needed.
+_lazy_attributes = {
+    "Markdown": "spork",
+    "human": ".messaging",
+    "ai": ".messaging",
+    "narrate": ".messaging",
+    "system": ".messaging",
+    "user": ".messaging",
+    "assistant": ".messaging",
+    "assistant_function_call": ".messaging",
+    "incremental_display": ".decorators",
+    "function_result": ".messaging",
+    "tool_result": ".messaging",
+    "Chat": ".chat",
+    "FunctionRegistry": ".registry",
+    "TurnResult": ".turns",
+    "run_many": ".batch",
+    "BatchResult": ".batch",
+    "ChatlabMetadata": ".decorators",
+    "expose_exception_to_llm": ".decorators",
+    "cached_tool": ".decorators",
+    "Partial": "instructor",
+}
+
+_lazy_modules = {"models"}
+
 __all__ = [
     "Markdown",
     "human",
@@ -51,7 +85,28 @@ __all__ = [
     "models",
     "Chat",
     "FunctionRegistry",
+    "TurnResult",
+    "run_many",
+    "BatchResult",
     "ChatlabMetadata",
     "expose_exception_to_llm",
+    "cached_tool",
     "Partial",
 ]
+
+
+def __getattr__(name: str):
+    if name in _lazy_modules:
+        value = importlib.import_module(f".{name}", __name__)
+    elif name in _lazy_attributes:
+        value = getattr(importlib.import_module(_lazy_attributes[name], __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # Only import once
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
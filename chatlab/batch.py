@@ -0,0 +1,144 @@
+"""Run many independent chats concurrently.
+
+`run_many` takes a collection of prompts, runs each one through its own `Chat` (including any
+rounds of tool calls), and yields results as each chat finishes. Nothing is displayed, and all
+of the chats share the process-wide connection pool and rate limit governor.
+
+Example:
+    >>> from chatlab import run_many, system
+
+    >>> prompts = ["Summarize the French revolution", "Summarize the Meiji restoration"]
+    >>> async for result in run_many(prompts, initial_context=[system("Be brief.")], concurrency=4):
+    ...     print(result.index, f"{result.latency:.2f}s", result.chat.messages[-1]["content"])
+
+"""
+
+import asyncio
+import time
+from typing import AsyncIterator, Iterable, Optional, Sequence, Union
+
+from openai.types.chat import ChatCompletionMessageParam
+from pydantic import BaseModel, ConfigDict
+
+from .chat import Chat
+from .turns import TurnResult
+
+Prompt = Union[str, ChatCompletionMessageParam, Sequence[Union[str, ChatCompletionMessageParam]]]
+
+
+class BatchResult(BaseModel):
+    """The result of running one prompt from `run_many`."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: int
+    """The position of the prompt in the input."""
+
+    chat: Optional[Chat] = None
+    """The chat the prompt ran in, including its full history. Not set when the chat couldn't be created."""
+
+    turn: Optional[TurnResult] = None
+    """How the turn went. Not set when the chat raised an error."""
+
+    error: Optional[Exception] = None
+    """The error raised while running the chat, if any."""
+
+    latency: float = 0.0
+    """Seconds from submitting the prompt to the end of the turn."""
+
+    @property
+    def prompt_tokens(self) -> int:
+        """Prompt tokens used for this prompt, when reported by the API."""
+        return self.turn.prompt_tokens if self.turn is not None else 0
+
+    @property
+    def completion_tokens(self) -> int:
+        """Completion tokens used for this prompt, when reported by the API."""
+        return self.turn.completion_tokens if self.turn is not None else 0
+
+
+async def run_one(
+    index: int,
+    prompt: Prompt,
+    initial_context: Sequence[Union[str, ChatCompletionMessageParam]] = (),
+    **chat_kwargs,
+) -> BatchResult:
+    """Run a single prompt through a fresh, headless chat."""
+    if isinstance(prompt, (str, dict)):
+        messages = [prompt]
+    else:
+        messages = list(prompt)
+
+    start = time.monotonic()
+    chat: Optional[Chat] = None
+    try:
+        # Creating the chat can fail for one prompt (a bad keyword argument, a missing API key) without
+        # stopping the rest of the batch
+        chat = Chat(*initial_context, display=False, **chat_kwargs)
+        turn = await chat.submit(*messages)
+    except Exception as e:
+        return BatchResult(index=index, chat=chat, error=e, latency=time.monotonic() - start)
+
+    return BatchResult(index=index, chat=chat, turn=turn, latency=time.monotonic() - start)
+
+
+async def run_many(
+    prompts: Iterable[Prompt],
+    initial_context: Sequence[Union[str, ChatCompletionMessageParam]] = (),
+    concurrency: int = 8,
+    include_usage: bool = True,
+    **chat_kwargs,
+) -> AsyncIterator[BatchResult]:
+    """Run many prompts through their own chats concurrently, yielding results as they complete.
+
+    Args:
+        prompts (Iterable): The prompts to run. Each can be a string, a message, or a sequence of messages.
+
+        initial_context (Sequence): Messages to start every chat with, like a shared system prompt.
+
+        concurrency (int): The most chats to run at once.
+
+        include_usage (bool): Ask the API to report token usage for each chat.
+
+        chat_kwargs: Passed along to each `Chat`, e.g. `model` or `function_registry`.
+
+    Yields:
+        BatchResult: The result for each prompt, in the order they finish. Errors are captured on the result.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    # Workers share one iterator so prompts are pulled lazily and each is run exactly once
+    pending = enumerate(prompts)
+    results: asyncio.Queue[Union[BatchResult, Exception, None]] = asyncio.Queue()
+
+    async def worker():
+        try:
+            for index, prompt in pending:
+                result = await run_one(
+                    index, prompt, initial_context=initial_context, include_usage=include_usage, **chat_kwargs
+                )
+                await results.put(result)
+        except Exception as e:
+            # Errors from the chats themselves are captured on results; anything else stops the batch
+            await results.put(e)
+        finally:
+            # Signal that this worker is done
+            await results.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+
+    try:
+        finished = 0
+        while finished < len(workers):
+            result = await results.get()
+            if result is None:
+                finished += 1
+                continue
+            if isinstance(result, Exception):
+                raise result
+            yield result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
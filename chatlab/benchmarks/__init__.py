@@ -0,0 +1,37 @@
+"""Offline benchmarks for ChatLab's client-side performance.
+
+A local stub server speaks the OpenAI chat completions streaming protocol, sending scripted
+content, tool calls and legacy function calls at a configurable chunk size and rate. Pointing a
+`Chat` at it with `base_url` measures ChatLab's own overhead without network access or API spend.
+
+Run the suite from the command line, saving a report and comparing it against an earlier one:
+
+    python -m chatlab.benchmarks --output after.json --baseline before.json
+
+Or from Python:
+
+    >>> from chatlab.benchmarks import SuiteConfig, run_suite
+    >>> report = await run_suite(SuiteConfig(iterations=5))
+    >>> print(report.table())
+
+"""
+
+from .report import BenchmarkReport, BenchmarkResult, Comparison, compare, regressions
+from .scripts import ScriptedToolCall, StreamScript, after_tools
+from .server import StubServer
+from .suite import RenderingSink, SuiteConfig, run_suite
+
+__all__ = [
+    "BenchmarkReport",
+    "BenchmarkResult",
+    "Comparison",
+    "compare",
+    "regressions",
+    "ScriptedToolCall",
+    "StreamScript",
+    "after_tools",
+    "StubServer",
+    "RenderingSink",
+    "SuiteConfig",
+    "run_suite",
+]
@@ -0,0 +1,52 @@
+"""Run the benchmark suite: `python -m chatlab.benchmarks --help`."""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from .report import BenchmarkReport, compare, comparison_table, regressions
+from .suite import SuiteConfig, run_suite
+
+
+def main(argv=None) -> int:
+    """Run the suite, print the results and compare them with a baseline."""
+    parser = argparse.ArgumentParser(prog="python -m chatlab.benchmarks", description=__doc__)
+    parser.add_argument("--iterations", type=int, default=SuiteConfig().iterations)
+    parser.add_argument("--warmup", type=int, default=SuiteConfig().warmup)
+    parser.add_argument("--content-chars", type=int, default=SuiteConfig().content_chars)
+    parser.add_argument("--chunk-size", type=int, default=SuiteConfig().chunk_size)
+    parser.add_argument("--tool-calls", type=int, default=SuiteConfig().tool_calls)
+    parser.add_argument("--argument-chars", type=int, default=SuiteConfig().argument_chars)
+    parser.add_argument("--only", nargs="*", help="Names of the benchmarks to run")
+    parser.add_argument("--output", type=Path, help="Save the report as JSON")
+    parser.add_argument("--baseline", type=Path, help="A saved report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Slowdown allowed before failing")
+    args = parser.parse_args(argv)
+
+    config = SuiteConfig(
+        iterations=args.iterations,
+        warmup=args.warmup,
+        content_chars=args.content_chars,
+        chunk_size=args.chunk_size,
+        tool_calls=args.tool_calls,
+        argument_chars=args.argument_chars,
+    )
+    report = asyncio.run(run_suite(config, args.only))
+    print(report.table())
+
+    if args.output is not None:
+        args.output.write_text(report.model_dump_json(indent=2))
+
+    if args.baseline is None:
+        return 0
+
+    baseline = BenchmarkReport.model_validate_json(args.baseline.read_text())
+    comparisons = compare(baseline, report)
+    print()
+    print(comparison_table(comparisons, args.tolerance))
+    return 1 if regressions(comparisons, args.tolerance) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Benchmark results in a form that can be saved and compared between runs."""
+
+import platform
+import statistics
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, Field
+
+from .._version import __version__
+
+
+class BenchmarkResult(BaseModel):
+    """Timings for one benchmark."""
+
+    name: str
+    """What was measured."""
+
+    samples: List[float]
+    """Seconds for each iteration."""
+
+    units: int = 1
+    """How many units of work (chunks, tool calls) each iteration did."""
+
+    unit: str = "iteration"
+    """What the units are."""
+
+    baseline: Optional[str] = None
+    """The benchmark that does the same work without what this one measures, for computing overhead."""
+
+    @property
+    def mean(self) -> float:
+        """Mean seconds per iteration."""
+        return statistics.fmean(self.samples)
+
+    @property
+    def median(self) -> float:
+        """Median seconds per iteration."""
+        return statistics.median(self.samples)
+
+    @property
+    def p95(self) -> float:
+        """95th percentile of seconds per iteration."""
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    @property
+    def per_unit(self) -> float:
+        """Median seconds per unit of work."""
+        return self.median / max(self.units, 1)
+
+
+class BenchmarkReport(BaseModel):
+    """Results from a run of the benchmark suite."""
+
+    results: List[BenchmarkResult] = Field(default_factory=list)
+
+    chatlab_version: str = __version__
+    python_version: str = Field(default_factory=platform.python_version)
+    created: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+    def get(self, name: str) -> Optional[BenchmarkResult]:
+        """Get a result by name."""
+        for result in self.results:
+            if result.name == name:
+                return result
+        return None
+
+    def overhead(self, result: BenchmarkResult) -> Optional[float]:
+        """Median seconds a result spends beyond its baseline, per unit of work."""
+        if result.baseline is None:
+            return None
+        baseline = self.get(result.baseline)
+        if baseline is None:
+            return None
+        return (result.median - baseline.median) / max(result.units, 1)
+
+    def table(self) -> str:
+        """Format the results as a text table."""
+        width = name_width(result.name for result in self.results)
+        lines = [
+            f"{'benchmark':<{width}} {'median':>10} {'p95':>10} {'per unit':>12} {'overhead/unit':>14}  unit",
+        ]
+        for result in self.results:
+            overhead = self.overhead(result)
+            lines.append(
+                f"{result.name:<{width}} {ms(result.median):>10} {ms(result.p95):>10} {us(result.per_unit):>12} "
+                f"{us(overhead) if overhead is not None else '-':>14}  {result.unit}"
+            )
+        return "\n".join(lines)
+
+
+def name_width(names: Iterable[str]) -> int:
+    """Width of the name column in tables."""
+    return max([len("benchmark"), *(len(name) for name in names)])
+
+
+def ms(seconds: float) -> str:
+    """Format seconds as milliseconds."""
+    return f"{seconds * 1000:.2f}ms"
+
+
+def us(seconds: float) -> str:
+    """Format seconds as microseconds."""
+    return f"{seconds * 1_000_000:.1f}us"
+
+
+class Comparison(BaseModel):
+    """How one benchmark changed between two runs."""
+
+    name: str
+    baseline: float
+    """Median seconds per unit in the baseline run."""
+
+    current: float
+    """Median seconds per unit in the current run."""
+
+    @property
+    def change(self) -> float:
+        """Relative change, where 0.1 is 10% slower."""
+        if self.baseline == 0:
+            return 0.0
+        return self.current / self.baseline - 1
+
+
+def compare(baseline: BenchmarkReport, current: BenchmarkReport) -> List[Comparison]:
+    """Compare the benchmarks that ran in both reports."""
+    previous: Dict[str, BenchmarkResult] = {result.name: result for result in baseline.results}
+    return [
+        Comparison(name=result.name, baseline=previous[result.name].per_unit, current=result.per_unit)
+        for result in current.results
+        if result.name in previous
+    ]
+
+
+def regressions(comparisons: List[Comparison], tolerance: float = 0.1) -> List[Comparison]:
+    """Find the benchmarks that got slower by more than `tolerance`."""
+    return [comparison for comparison in comparisons if comparison.change > tolerance]
+
+
+def comparison_table(comparisons: List[Comparison], tolerance: float = 0.1) -> str:
+    """Format comparisons as a text table, marking regressions."""
+    width = name_width(comparison.name for comparison in comparisons)
+    lines = [f"{'benchmark':<{width}} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for comparison in comparisons:
+        flag = "  REGRESSION" if comparison.change > tolerance else ""
+        lines.append(
+            f"{comparison.name:<{width}} {us(comparison.baseline):>12} {us(comparison.current):>12} "
+            f"{comparison.change:>+8.1%}{flag}"
+        )
+    return "\n".join(lines)
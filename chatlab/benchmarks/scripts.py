@@ -0,0 +1,160 @@
+"""Scripted responses for the stub server, encoded as OpenAI chat completion chunks.
+
+A `StreamScript` describes what the model "says": some content, some tool calls, or a legacy
+function call. It's split into chunks of `chunk_size` characters, the same way a real model
+streams, so the client does the same work it would against the API.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from pydantic import BaseModel
+
+
+class ScriptedToolCall(BaseModel):
+    """A tool call (or legacy function call) for the stub to stream."""
+
+    name: str
+    arguments: str = "{}"
+
+
+class StreamScript(BaseModel):
+    """A scripted response from the stub server.
+
+    Args:
+        content (str): Assistant content to stream.
+
+        tool_calls (List[ScriptedToolCall]): Tool calls to stream after the content.
+
+        function_call (ScriptedToolCall): A legacy function call to stream after the content.
+
+        chunk_size (int): Characters of content or arguments per chunk.
+
+        chunks_per_second (float): Rate to send chunks at. `None` sends them as fast as possible.
+
+        first_token_delay (float): Seconds to wait before the first chunk.
+    """
+
+    content: str = ""
+    tool_calls: List[ScriptedToolCall] = []
+    function_call: Optional[ScriptedToolCall] = None
+
+    chunk_size: int = 4
+    chunks_per_second: Optional[float] = None
+    first_token_delay: float = 0.0
+
+    @property
+    def finish_reason(self) -> str:
+        """The finish reason the script ends with."""
+        if self.tool_calls:
+            return "tool_calls"
+        if self.function_call is not None:
+            return "function_call"
+        return "stop"
+
+
+Responder = Callable[[Dict[str, Any]], StreamScript]
+"""Picks the script to respond with from the request body."""
+
+
+def split(text: str, size: int) -> List[str]:
+    """Split text into pieces of `size` characters."""
+    size = max(size, 1)
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def stream_deltas(script: StreamScript) -> Iterator[Dict[str, Any]]:
+    """Yield the deltas for a script, one per chunk."""
+    yield {"role": "assistant", "content": ""}
+
+    for piece in split(script.content, script.chunk_size):
+        yield {"content": piece}
+
+    for index, tool_call in enumerate(script.tool_calls):
+        yield {
+            "tool_calls": [
+                {
+                    "index": index,
+                    "id": f"call_{index}",
+                    "type": "function",
+                    "function": {"name": tool_call.name, "arguments": ""},
+                }
+            ]
+        }
+        for piece in split(tool_call.arguments, script.chunk_size):
+            yield {"tool_calls": [{"index": index, "function": {"arguments": piece}}]}
+
+    if script.function_call is not None:
+        yield {"function_call": {"name": script.function_call.name, "arguments": ""}}
+        for piece in split(script.function_call.arguments, script.chunk_size):
+            yield {"function_call": {"arguments": piece}}
+
+
+def completion_tokens(script: StreamScript) -> int:
+    """Count the chunks of content and arguments as tokens."""
+    return sum(1 for delta in stream_deltas(script)) - 1
+
+
+def stream_chunks(script: StreamScript, model: str, include_usage: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield `chat.completion.chunk` objects for a script."""
+    base = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0, "model": model}
+
+    for delta in stream_deltas(script):
+        yield {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+
+    yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": script.finish_reason}]}
+
+    if include_usage:
+        tokens = completion_tokens(script)
+        yield {
+            **base,
+            "choices": [],
+            "usage": {"prompt_tokens": 0, "completion_tokens": tokens, "total_tokens": tokens},
+        }
+
+
+def full_completion(script: StreamScript, model: str) -> Dict[str, Any]:
+    """Build the `chat.completion` object for a script, for requests that don't stream."""
+    message: Dict[str, Any] = {"role": "assistant", "content": script.content or None}
+    if script.tool_calls:
+        message["tool_calls"] = [
+            {
+                "id": f"call_{index}",
+                "type": "function",
+                "function": {"name": tool_call.name, "arguments": tool_call.arguments},
+            }
+            for index, tool_call in enumerate(script.tool_calls)
+        ]
+    if script.function_call is not None:
+        message["function_call"] = {"name": script.function_call.name, "arguments": script.function_call.arguments}
+
+    tokens = completion_tokens(script)
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": script.finish_reason}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+def after_tools(calls: StreamScript, answer: StreamScript) -> Responder:
+    """Respond with `calls` until tool results come back, then with `answer`.
+
+    This scripts a whole turn: the model calls tools, then responds to their results.
+    """
+
+    def respond(body: Dict[str, Any]) -> StreamScript:
+        messages = body.get("messages") or [{}]
+        if messages[-1].get("role") in ("tool", "function"):
+            return answer
+        return calls
+
+    return respond
+
+
+def as_responder(script: Union[StreamScript, Responder]) -> Responder:
+    """Wrap a fixed script as a responder."""
+    if isinstance(script, StreamScript):
+        return lambda body: script
+    return script
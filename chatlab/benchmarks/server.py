@@ -0,0 +1,225 @@
+"""A local stub of the OpenAI chat completions API.
+
+The server speaks just enough HTTP/1.1 for the OpenAI client: `POST .../chat/completions`,
+answered with server-sent events when streaming or a JSON body when not, over kept-alive
+connections. It runs its own event loop on a background thread and encodes each script once, so
+as little of its work as possible shows up in the client's timings.
+
+Example:
+    >>> from chatlab import Chat
+    >>> from chatlab.benchmarks import StreamScript, StubServer
+
+    >>> with StubServer(StreamScript(content="Hello from the stub!")) as server:
+    ...     chat = Chat(base_url=server.url, api_key="stub", display=False)
+    ...     await chat("Hi")
+
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .scripts import Responder, StreamScript, as_responder, full_completion, stream_chunks
+
+STREAM_HEADERS = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: text/event-stream\r\n"
+    b"Cache-Control: no-cache\r\n"
+    b"Transfer-Encoding: chunked\r\n"
+    b"Connection: keep-alive\r\n\r\n"
+)
+
+
+def http_chunk(data: bytes) -> bytes:
+    """Frame data for chunked transfer encoding."""
+    return b"%x\r\n%s\r\n" % (len(data), data)
+
+
+def http_response(status: str, body: bytes, content_type: str = "application/json") -> bytes:
+    """Build a complete HTTP response."""
+    return (
+        f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+        "Connection: keep-alive\r\n\r\n"
+    ).encode() + body
+
+
+class StubServer:
+    """A local server that streams scripted chat completions.
+
+    Args:
+        script (StreamScript | Responder): The script to respond with, or a function picking a
+            script from each request's body.
+
+        host (str): The interface to listen on.
+
+        port (int): The port to listen on. `0` picks a free port.
+
+    The server can be used as a (sync or async) context manager, or started and stopped by hand.
+    """
+
+    def __init__(self, script: Union[StreamScript, Responder], host: str = "127.0.0.1", port: int = 0):
+        """Create a stopped server."""
+        self.responder = as_responder(script)
+        self.host = host
+        self.port = port
+
+        self.requests = 0
+        """The number of chat completion requests served."""
+
+        self.last_request: Optional[Dict[str, Any]] = None
+        """The body of the last chat completion request."""
+
+        # Encoded events for each script, keyed by id. The script is kept alongside so the id stays unique.
+        self.__encoded: Dict[Tuple[int, str, bool], Tuple[StreamScript, List[bytes]]] = {}
+
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__ready = threading.Event()
+        self.__error: Optional[BaseException] = None
+
+    @property
+    def url(self) -> str:
+        """The base URL to pass to `Chat(base_url=...)`."""
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self) -> "StubServer":
+        """Start serving on a background thread."""
+        if self.__thread is not None:
+            return self
+
+        self.__ready.clear()
+        self.__thread = threading.Thread(target=self.__run, name="chatlab-stub-server", daemon=True)
+        self.__thread.start()
+        self.__ready.wait()
+
+        if self.__error is not None:
+            self.__thread = None
+            raise self.__error
+        return self
+
+    def stop(self):
+        """Stop serving and close every connection."""
+        if self.__thread is None or self.__loop is None:
+            return
+
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__thread = None
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    async def __aenter__(self) -> "StubServer":
+        return self.start()
+
+    async def __aexit__(self, *exc_info):
+        self.stop()
+
+    def __run(self):
+        loop = asyncio.new_event_loop()
+        self.__loop = loop
+
+        try:
+            server = loop.run_until_complete(asyncio.start_server(self.__handle, self.host, self.port))
+        except BaseException as e:
+            self.__error = e
+            self.__ready.set()
+            loop.close()
+            return
+
+        self.port = server.sockets[0].getsockname()[1]
+        self.__ready.set()
+
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            # Connections kept alive by clients are still waiting on their next request
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    def __encode(self, script: StreamScript, model: str, include_usage: bool) -> List[bytes]:
+        key = (id(script), model, include_usage)
+        cached = self.__encoded.get(key)
+        if cached is not None and cached[0] is script:
+            return cached[1]
+
+        events = [
+            http_chunk(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+            for chunk in stream_chunks(script, model, include_usage)
+        ]
+        events.append(http_chunk(b"data: [DONE]\n\n"))
+        events.append(b"0\r\n\r\n")
+
+        self.__encoded[key] = (script, events)
+        return events
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+                    writer.write(http_response("404 Not Found", b'{"error": {"message": "Not found"}}'))
+                    await writer.drain()
+                    continue
+
+                await self.__respond(json.loads(body or b"{}"), writer)
+        except asyncio.CancelledError:
+            pass
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def __respond(self, body: Dict[str, Any], writer: asyncio.StreamWriter):
+        self.requests += 1
+        self.last_request = body
+
+        script = self.responder(body)
+        model = body.get("model", "stub")
+
+        if not body.get("stream"):
+            writer.write(http_response("200 OK", json.dumps(full_completion(script, model)).encode()))
+            await writer.drain()
+            return
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        events = self.__encode(script, model, include_usage)
+
+        writer.write(STREAM_HEADERS)
+        if script.first_token_delay:
+            await writer.drain()
+            await asyncio.sleep(script.first_token_delay)
+
+        if script.chunks_per_second is None:
+            writer.write(b"".join(events))
+            await writer.drain()
+            return
+
+        interval = 1 / script.chunks_per_second
+        for index, event in enumerate(events):
+            if index:
+                await asyncio.sleep(interval)
+            writer.write(event)
+            await writer.drain()
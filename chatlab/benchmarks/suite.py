@@ -0,0 +1,261 @@
+"""The benchmark suite: ChatLab's client-side costs, measured against the stub server.
+
+Each benchmark times a whole turn against the local stub. The `raw_*` benchmarks stream the same
+responses with just the OpenAI client, so subtracting them leaves ChatLab's own overhead:
+
+    - submit_content: `Chat.submit` streaming plain content, per chunk
+    - submit_tool_calls: a turn of parallel tool calls, per tool call
+    - submit_function_call: a turn with a legacy function call
+    - render_content and render_tool_calls: the same turns, rendering every view update
+"""
+
+import json
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+from openai import AsyncStream
+from openai.types.chat import ChatCompletionMessageParam
+from pydantic import BaseModel
+
+from ..chat import Chat
+from ..clients import ClientPool
+from ..registry import FunctionRegistry
+from .report import BenchmarkReport, BenchmarkResult
+from .scripts import Responder, ScriptedToolCall, StreamScript, after_tools
+from .server import StubServer
+
+MODEL = "gpt-4o-mini"
+API_KEY = "stub"
+
+
+class SuiteConfig(BaseModel):
+    """How much work each benchmark does."""
+
+    iterations: int = 20
+    """Timed iterations per benchmark."""
+
+    warmup: int = 2
+    """Untimed iterations to run first, to warm up connections and caches."""
+
+    content_chars: int = 4000
+    """Characters of content in content responses."""
+
+    chunk_size: int = 4
+    """Characters of content or arguments per chunk."""
+
+    tool_calls: int = 8
+    """Parallel tool calls in tool call responses."""
+
+    argument_chars: int = 200
+    """Characters of arguments in each tool call."""
+
+
+def lookup(key: str) -> str:
+    """Look up a key."""
+    return key[:8]
+
+
+class RenderingSink:
+    """A view sink that renders every view it's sent, like a frontend would."""
+
+    def __init__(self):
+        """Start with nothing rendered."""
+        self.renders = 0
+
+    def display(self, view: Any) -> None:
+        """Render a newly shown view."""
+        self.render(view)
+
+    def update(self, view: Any) -> None:
+        """Render an updated view."""
+        self.render(view)
+
+    def render(self, view: Any):
+        """Render a view down to plain data."""
+        rendered = view.render()
+        if hasattr(rendered, "to_dict"):
+            rendered.to_dict()
+        self.renders += 1
+
+
+class Scenarios:
+    """The scripted responses for a suite configuration."""
+
+    def __init__(self, config: SuiteConfig):
+        """Script the responses."""
+        words = "The quick brown fox jumps over the lazy dog. "
+        content = (words * (config.content_chars // len(words) + 1))[: config.content_chars]
+        arguments = json.dumps({"key": "k" * max(config.argument_chars - 11, 0)})
+        answer = StreamScript(content="Done.", chunk_size=config.chunk_size)
+
+        self.content = StreamScript(content=content, chunk_size=config.chunk_size)
+        self.tool_calls = after_tools(
+            StreamScript(
+                tool_calls=[ScriptedToolCall(name="lookup", arguments=arguments)] * config.tool_calls,
+                chunk_size=config.chunk_size,
+            ),
+            answer,
+        )
+        self.function_call = after_tools(
+            StreamScript(
+                function_call=ScriptedToolCall(name="lookup", arguments=arguments),
+                chunk_size=config.chunk_size,
+            ),
+            answer,
+        )
+
+        self.content_chunks = len(range(0, len(content), max(config.chunk_size, 1)))
+
+
+# Request bodies that get the first and second response of a scripted turn
+FIRST_REQUEST: List[ChatCompletionMessageParam] = [{"role": "user", "content": "Hi"}]
+AFTER_TOOLS: List[ChatCompletionMessageParam] = FIRST_REQUEST + [
+    {"role": "tool", "tool_call_id": "call_0", "content": "k"}
+]
+
+
+async def time_iterations(run: Callable[[], Awaitable[Any]], iterations: int, warmup: int) -> List[float]:
+    """Time `iterations` runs of `run` after `warmup` untimed ones."""
+    for _ in range(warmup):
+        await run()
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await run()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+class Suite:
+    """Runs the benchmarks against one stub server per scenario."""
+
+    def __init__(self, config: SuiteConfig, pool: ClientPool):
+        """Prepare the scenarios."""
+        self.config = config
+        self.pool = pool
+        self.scenarios = Scenarios(config)
+
+    async def measure(
+        self,
+        name: str,
+        responder: Responder,
+        run: Callable[[StubServer], Awaitable[Any]],
+        units: int = 1,
+        unit: str = "iteration",
+        baseline: Optional[str] = None,
+    ) -> BenchmarkResult:
+        """Time `run` against a stub server responding with `responder`."""
+        with StubServer(responder) as server:
+            samples = await time_iterations(lambda: run(server), self.config.iterations, self.config.warmup)
+        return BenchmarkResult(name=name, samples=samples, units=units, unit=unit, baseline=baseline)
+
+    async def raw(self, server: StubServer, *requests: List[ChatCompletionMessageParam]):
+        """Stream responses with just the OpenAI client."""
+        client = self.pool.get(API_KEY, server.url)
+        for messages in requests:
+            stream = await client.chat.completions.create(model=MODEL, messages=messages, stream=True)
+            assert isinstance(stream, AsyncStream)
+            async for _ in stream:
+                pass
+
+    def chat(self, server: StubServer, display: Any = False, legacy_function_calling: bool = False) -> Chat:
+        """Create a fresh chat against the stub."""
+        registry = FunctionRegistry()
+        registry.register(lookup)
+        return Chat(
+            base_url=server.url,
+            api_key=API_KEY,
+            model=MODEL,
+            client_pool=self.pool,
+            function_registry=registry,
+            legacy_function_calling=legacy_function_calling,
+            display=display,
+            max_display_rate=None,
+            context_policy=None,
+        )
+
+    async def submit(self, server: StubServer, **kwargs):
+        """Run a turn with a fresh chat."""
+        await self.chat(server, **kwargs).submit("Hi")
+
+    async def run(self, only: Optional[List[str]] = None) -> BenchmarkReport:
+        """Run the benchmarks, or just those named in `only`."""
+        scenarios = self.scenarios
+        chunks = scenarios.content_chunks
+        tool_calls = self.config.tool_calls
+
+        benchmarks = [
+            ("raw_content", scenarios.content, lambda s: self.raw(s, FIRST_REQUEST), chunks, "chunk", None),
+            ("submit_content", scenarios.content, lambda s: self.submit(s), chunks, "chunk", "raw_content"),
+            (
+                "raw_tool_calls",
+                scenarios.tool_calls,
+                lambda s: self.raw(s, FIRST_REQUEST, AFTER_TOOLS),
+                tool_calls,
+                "tool call",
+                None,
+            ),
+            (
+                "submit_tool_calls",
+                scenarios.tool_calls,
+                lambda s: self.submit(s),
+                tool_calls,
+                "tool call",
+                "raw_tool_calls",
+            ),
+            (
+                "raw_function_call",
+                scenarios.function_call,
+                lambda s: self.raw(s, FIRST_REQUEST, AFTER_TOOLS),
+                1,
+                "function call",
+                None,
+            ),
+            (
+                "submit_function_call",
+                scenarios.function_call,
+                lambda s: self.submit(s, legacy_function_calling=True),
+                1,
+                "function call",
+                "raw_function_call",
+            ),
+            (
+                "render_content",
+                scenarios.content,
+                lambda s: self.submit(s, display=RenderingSink()),
+                chunks,
+                "chunk",
+                "submit_content",
+            ),
+            (
+                "render_tool_calls",
+                scenarios.tool_calls,
+                lambda s: self.submit(s, display=RenderingSink()),
+                tool_calls,
+                "tool call",
+                "submit_tool_calls",
+            ),
+        ]
+
+        report = BenchmarkReport()
+        for name, responder, run, units, unit, baseline in benchmarks:
+            if only is not None and name not in only:
+                continue
+            report.results.append(await self.measure(name, responder, run, units, unit, baseline))  # type: ignore
+        return report
+
+
+async def run_suite(config: Optional[SuiteConfig] = None, only: Optional[List[str]] = None) -> BenchmarkReport:
+    """Run the benchmark suite against local stub servers.
+
+    Args:
+        config (SuiteConfig): How much work each benchmark does.
+
+        only (List[str]): Names of the benchmarks to run. Defaults to all of them.
+
+    Returns:
+        BenchmarkReport: The timings, which can be saved with `model_dump_json` and compared with `compare`.
+    """
+    async with ClientPool(http2=False) as pool:
+        return await Suite(config or SuiteConfig(), pool).run(only)
@@ -0,0 +1,186 @@
+"""On-disk cache of chat completions for deterministic requests.
+
+With `temperature=0` (the default for `Chat`), the same model, messages and tools tend to produce
+the same response. When a `ResponseCache` is given to a `Chat`, responses to those requests are
+stored in a local SQLite database and replayed on the next identical request. Cached streams are
+replayed chunk by chunk, so displays and tool calls behave exactly as they did the first time.
+
+Example:
+    >>> from chatlab import Chat
+    >>> from chatlab.cache import ResponseCache
+
+    >>> cache = ResponseCache(max_entries=5_000, ttl=7 * 24 * 60 * 60)
+    >>> chat = Chat(response_cache=cache)
+    >>> await chat("Name three colors")  # Re-running this cell replays the stored response
+
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING, Any, AsyncIterator, List, Optional
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    # The OpenAI types take a while to import, and tools that only use `request_key` don't need them
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+
+def default_cache_path() -> str:
+    """Get the default location of the response cache, following XDG conventions."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "chatlab", "responses.sqlite3")
+
+
+def _to_json(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    # Message records and views of the history serialize like the dicts and lists they stand in for
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, Sequence) and not isinstance(obj, (str, bytes)):
+        return list(obj)
+    return str(obj)
+
+
+def request_key(request: dict) -> str:
+    """Create a stable hash for a request payload, independent of key order."""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_to_json)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """A SQLite backed cache of chat completion responses with LRU and TTL eviction.
+
+    Args:
+        path (str): Where to store the cache. Defaults to `~/.cache/chatlab/responses.sqlite3`. Use ":memory:" for
+        a cache that only lasts as long as the process.
+
+        max_entries (int): The most responses to keep. The least recently used responses are evicted first.
+
+        ttl (float): Seconds a response stays valid for. Responses never expire by default.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1000, ttl: Optional[float] = None):
+        """Open (or create) the cache."""
+        self.path = path if path is not None else default_cache_path()
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        """Get the stored payloads for a request key, if present and not expired."""
+        now = time.time()
+
+        with self.__lock, self.__connection:
+            row = self.__connection.execute(
+                "SELECT payload, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            payload, created_at = row
+            if self.ttl is not None and created_at + self.ttl < now:
+                self.__connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+
+            self.__connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+
+        return json.loads(payload)
+
+    def set(self, key: str, payloads: List[dict]):
+        """Store the payloads for a request key, evicting the least recently used responses over `max_entries`."""
+        now = time.time()
+
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(payloads, separators=(",", ":")), now, now),
+            )
+            self.__connection.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        """Remove every response from the cache."""
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM responses")
+
+    def delete_prefix(self, prefix: str):
+        """Remove every entry whose key starts with `prefix`."""
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM responses WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def close(self):
+        """Close the underlying database."""
+        self.__connection.close()
+
+    def __len__(self) -> int:
+        """Return the number of cached responses."""
+        with self.__lock:
+            return self.__connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    async def get_completion(self, key: str) -> Optional["ChatCompletion"]:
+        """Get a cached non-streaming completion."""
+        from openai.types.chat import ChatCompletion
+
+        payloads = await asyncio.to_thread(self.get, key)
+        if not payloads:
+            return None
+        return ChatCompletion.model_validate(payloads[0])
+
+    async def set_completion(self, key: str, completion: "ChatCompletion"):
+        """Cache a non-streaming completion."""
+        # Usage is left out so that replays don't count towards tokens spent
+        await asyncio.to_thread(self.set, key, [completion.model_dump(mode="json", exclude={"usage"})])
+
+    async def get_stream(self, key: str) -> Optional[AsyncIterator["ChatCompletionChunk"]]:
+        """Get a cached stream, ready to be replayed chunk by chunk."""
+        from openai.types.chat import ChatCompletionChunk
+
+        payloads = await asyncio.to_thread(self.get, key)
+        if payloads is None:
+            return None
+
+        async def replay():
+            for payload in payloads:
+                yield ChatCompletionChunk.model_validate(payload)
+
+        return replay()
+
+    async def record_stream(
+        self, key: str, stream: AsyncIterator["ChatCompletionChunk"]
+    ) -> AsyncIterator["ChatCompletionChunk"]:
+        """Pass a stream through, storing it once the model has finished its response.
+
+        Streams that end without a finish reason are not stored.
+        """
+        payloads: List[dict] = []
+
+        async for chunk in stream:
+            if chunk.choices:
+                payloads.append(chunk.model_dump(mode="json", exclude={"usage"}))
+
+            # Readers of the stream may stop at the finish reason, so store it before passing that chunk on
+            if any(choice.finish_reason is not None for choice in chunk.choices):
+                await asyncio.to_thread(self.set, key, payloads)
+
+            yield chunk
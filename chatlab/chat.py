@@ -14,18 +14,27 @@ I am the king of the skies, the lord of the avian realm. Squawk!
 import asyncio
 import logging
 import os
-from typing import Callable, List, Optional, Tuple, Type, Union, overload
+import time
+import uuid
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union, overload
 
 import openai
-from openai import AsyncOpenAI, AsyncStream
 from openai.types import FunctionDefinition
 from openai.types.chat import ChatCompletion, ChatCompletionChunk, ChatCompletionMessageParam
 from pydantic import BaseModel
 
+from .cache import ResponseCache, request_key
+from .metrics import ChatStats, Observer, RequestMetrics, ToolMetrics, TurnMetrics
+from .clients import ClientPool, default_client_pool
 from .errors import ChatLabError
-from .messaging import assistant_tool_calls, human
+from .context import TokenCounter, TrimPolicy, context_budget, drop_oldest
+from .history import MessageHistory, MessageRecord
+from .ratelimit import RateLimitGovernor, default_governor
+from .stores.base import ConversationStore, load_tail
+from .messaging import assistant_tool_calls
 from .registry import FunctionRegistry, PythonHallucinationFunction
-from .views import ToolArguments, AssistantMessageView
+from .turns import TurnResult
+from .views import ToolArguments, ToolCalled, AssistantMessageView, ViewSink, null_sink
 
 from .models import GPT_3_5_TURBO
 
@@ -48,6 +57,49 @@ class Chat:
 
         allow_hallucinated_python (bool): Include the built-in Python function when hallucinated by the model.
 
+        client_pool (ClientPool): The pool of API clients to draw from. Defaults to a pool shared by all chats.
+
+        max_concurrent_tool_calls (int): The maximum number of parallel tool calls to run at once. Unlimited by default.
+
+        max_tool_rounds (int): The maximum number of rounds of tool calls to run in one turn before handing control
+        back. `None` allows unlimited rounds.
+
+        turn_timeout (float): Seconds a turn may take, across all of its requests and tool rounds. No limit by default.
+
+        rate_limiter (RateLimitGovernor): Paces requests and handles rate limit retries. Defaults to a governor shared
+        by all chats.
+
+        display (bool | ViewSink): Display responses and tool calls in the notebook. Set to `False` to run headless,
+        without any display overhead, or pass a `ViewSink` to send the views somewhere else.
+
+        max_display_rate (float): The most times per second to update the display of a streaming response. Every
+        delta is kept; updates are just batched together. `None` updates on every delta.
+
+        include_usage (bool): Ask for token usage on streamed responses, reported on each `TurnResult`.
+
+        response_cache (ResponseCache): Replay stored responses to identical requests made with `temperature=0`.
+
+        context_policy (TrimPolicy): How to trim the messages sent when the history outgrows the context window. Set
+        to `None` to always send the full history. See `chatlab.context` for policies.
+
+        max_context_tokens (int): The context window to fit the messages in. Defaults to the model's context window.
+
+        reserve_tokens (int): Tokens of the context window to leave for the model's reply.
+
+        speculative_tool_calls (bool): Start tools marked `idempotent` as soon as their arguments finish streaming in,
+        while the model is still generating the rest of its response. Results are only used if the arguments don't
+        change by the end of the response.
+
+        observers (list): Called with the `TurnMetrics` at the end of every turn. Totals across turns are kept on
+        `chat.stats`.
+
+        store (ConversationStore): Where to persist the conversation. Messages are saved as they're added. Not
+        persisted by default. See `chatlab.stores` for stores.
+
+        session_id (str): The conversation to save to in the `store`. When the store already holds it, the chat
+        resumes it with as much of its end as fits in the context window, and `initial_context` is ignored. Defaults
+        to a new session.
+
     Examples:
         >>> from chatlab import Chat, narrate
 
@@ -57,7 +109,6 @@ class Chat:
 
     """
 
-    messages: List[ChatCompletionMessageParam]
     model: str
     function_registry: FunctionRegistry
     allow_hallucinated_python: bool
@@ -73,6 +124,22 @@ class Chat:
         allow_hallucinated_python: bool = False,
         python_hallucination_function: Optional[PythonHallucinationFunction] = None,
         legacy_function_calling: bool = False,
+        client_pool: Optional[ClientPool] = None,
+        max_concurrent_tool_calls: Optional[int] = None,
+        max_tool_rounds: Optional[int] = 20,
+        turn_timeout: Optional[float] = None,
+        rate_limiter: Optional[RateLimitGovernor] = None,
+        display: Union[bool, ViewSink] = True,
+        max_display_rate: Optional[float] = 20.0,
+        include_usage: bool = False,
+        response_cache: Optional[ResponseCache] = None,
+        context_policy: Optional[TrimPolicy] = drop_oldest,
+        max_context_tokens: Optional[int] = None,
+        reserve_tokens: int = 1024,
+        speculative_tool_calls: bool = False,
+        observers: Optional[List[Observer]] = None,
+        store: Optional[ConversationStore] = None,
+        session_id: Optional[str] = None,
     ):
         """Initialize a Chat with an optional initial context of messages.
 
@@ -98,16 +165,53 @@ class Chat:
 
         self.api_key = openai_api_key
         self.base_url = base_url
+        self.client_pool = client_pool if client_pool is not None else default_client_pool
 
         self.legacy_function_calling = legacy_function_calling
+        self.max_concurrent_tool_calls = max_concurrent_tool_calls
+        self.max_tool_rounds = max_tool_rounds
+        self.turn_timeout = turn_timeout
+        self.rate_limiter = rate_limiter if rate_limiter is not None else default_governor
+        if display is True:
+            self.view_sink: Optional[ViewSink] = None
+        elif display is False:
+            self.view_sink = null_sink
+        else:
+            self.view_sink = display
+        self.max_display_rate = max_display_rate
+        self.include_usage = include_usage
+        self.response_cache = response_cache
+        self.context_policy = context_policy
+        self.max_context_tokens = max_context_tokens
+        self.reserve_tokens = reserve_tokens
+        self.speculative_tool_calls = speculative_tool_calls
+
+        # Tool calls started before the response finished, keyed by tool call id, with the arguments they started with
+        self.__speculative_calls: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.__speculable: Dict[str, bool] = {}
+        self.__tool_semaphore: Optional[asyncio.Semaphore] = None
+
+        self.observers: List[Observer] = list(observers) if observers is not None else []
+        self.stats = ChatStats()
+        # Metrics for the turn in progress
+        self.__metrics: Optional[TurnMetrics] = None
 
         if initial_context is None:
             initial_context = []  # type: ignore
 
-        self.messages: List[ChatCompletionMessageParam] = []
-
-        self.append(*initial_context)
         self.model = model
+        self.token_counter = TokenCounter(model)
+
+        self.store = store
+        self.session_id = session_id if session_id is not None else uuid.uuid4().hex
+        self.messages = MessageHistory()
+
+        if store is not None and store.count(self.session_id) > 0:
+            # Resume with only the end of the conversation the model can see, rather than all of it
+            budget = context_budget(model, max_context_tokens=max_context_tokens, reserve_tokens=reserve_tokens)
+            self.messages = MessageHistory(load_tail(store, self.session_id, budget, self.token_counter))
+        else:
+            self.append(*initial_context)
 
         if function_registry is None:
             if allow_hallucinated_python and python_hallucination_function is None:
@@ -122,35 +226,51 @@ class Chat:
         if chat_functions is not None:
             self.function_registry.register_functions(chat_functions)
 
-    async def __call__(self, *messages: Union[ChatCompletionMessageParam, str], stream=True, **kwargs):
+    async def __call__(self, *messages: Union[ChatCompletionMessageParam, str], stream=True, **kwargs) -> TurnResult:
         """Send messages to the chat model and display the response."""
         return await self.submit(*messages, stream=stream, **kwargs)
 
     async def __process_stream(
-        self, resp: AsyncStream[ChatCompletionChunk]
+        self, resp: AsyncIterator[ChatCompletionChunk], turn: TurnResult, metrics: RequestMetrics, sent: float
     ) -> Tuple[str, Optional[ToolArguments], List[ToolArguments]]:
-        assistant_view: AssistantMessageView = AssistantMessageView()
+        assistant_view: AssistantMessageView = AssistantMessageView(sink=self.view_sink, max_rate=self.max_display_rate)
         function_view: Optional[ToolArguments] = None
         finish_reason = None
 
         tool_calls: list[ToolArguments] = []
 
         async for result in resp:  # Go through the results of the stream
+            if result.usage is not None:
+                turn.record_usage(result.usage)
+                metrics.completion_tokens = result.usage.completion_tokens
+
             choices = result.choices
 
             if len(choices) == 0:
-                logger.warning(f"Result has no choices: {result}")
+                if result.usage is None:
+                    logger.warning(f"Result has no choices: {result}")
                 continue
 
             choice = choices[0]
 
             # Is stream choice?
             if choice.delta is not None:
+                received = time.perf_counter()
+                if choice.delta.content or choice.delta.tool_calls or choice.delta.function_call:
+                    metrics.chunks += 1
+                    if metrics.time_to_first_token is None:
+                        metrics.time_to_first_token = received - sent
+
                 if choice.delta.content is not None and choice.delta.content != "":
+                    shown = time.perf_counter()
                     assistant_view.display_once()
                     assistant_view.append(choice.delta.content)
+                    metrics.display_seconds += time.perf_counter() - shown
                 elif choice.delta.tool_calls is not None:
                     if not assistant_view.finished:
+                        shown = time.perf_counter()
+                        assistant_view.flush()
+                        metrics.display_seconds += time.perf_counter() - shown
                         assistant_view.finished = True
 
                         if assistant_view.content != "":
@@ -165,28 +285,41 @@ class Chat:
                         if tool_call.index < len(tool_calls):
                             tool_argument = tool_calls[tool_call.index]
                             if tool_call.function.arguments is not None:
+                                shown = time.perf_counter()
                                 tool_argument.append_arguments(tool_call.function.arguments)
+                                metrics.display_seconds += time.perf_counter() - shown
+                                self.__speculate(tool_argument)
                         elif (
                             tool_call.function.name is not None
                             and tool_call.function.arguments is not None
                             and tool_call.id is not None
                         ):
                             tool_argument = ToolArguments(
-                                id=tool_call.id, name=tool_call.function.name, arguments=tool_call.function.arguments
+                                id=tool_call.id,
+                                name=tool_call.function.name,
+                                arguments=tool_call.function.arguments,
+                                sink=self.view_sink,
                             )
 
                             # If the user provided a custom renderer, set it on the tool argument object for displaying
-                            func = self.function_registry.get_chatlab_metadata(tool_call.function.name)
-                            if func is not None and func.render is not None:
-                                tool_argument.custom_render = func.render
+                            if self.view_sink is not null_sink:
+                                func = self.function_registry.get_chatlab_metadata(tool_call.function.name)
+                                if func is not None and func.render is not None:
+                                    tool_argument.custom_render = func.render
 
+                            shown = time.perf_counter()
                             tool_argument.display()
+                            metrics.display_seconds += time.perf_counter() - shown
                             tool_calls.append(tool_argument)
+                            self.__speculate(tool_argument)
 
                 elif choice.delta.function_call is not None:
                     function_call = choice.delta.function_call
                     if function_call.name is not None:
                         if not assistant_view.finished:
+                            shown = time.perf_counter()
+                            assistant_view.flush()
+                            metrics.display_seconds += time.perf_counter() - shown
                             assistant_view.finished = True
                             if assistant_view.content != "":
                                 # Flush out the finished assistant message
@@ -195,15 +328,24 @@ class Chat:
 
                         # IDs are for the tool calling apparatus from newer versions of the API
                         # Function call just uses the name. It's 1:1, whereas tools allow for multiple calls.
-                        function_view = ToolArguments(id="TBD", name=function_call.name)
+                        function_view = ToolArguments(id="TBD", name=function_call.name, sink=self.view_sink)
+                        shown = time.perf_counter()
                         function_view.display()
+                        metrics.display_seconds += time.perf_counter() - shown
                     if function_call.arguments is not None:
                         if function_view is None:
                             raise ValueError("Function arguments provided without function name")
+                        shown = time.perf_counter()
                         function_view.append_arguments(function_call.arguments)
+                        metrics.display_seconds += time.perf_counter() - shown
+
+                metrics.handling_seconds += time.perf_counter() - received
+
             if choice.finish_reason is not None:
                 finish_reason = choice.finish_reason
-                break
+                # When usage is requested, it arrives in one last chunk after the finish reason
+                if not self.include_usage:
+                    break
 
         # Wrap up the previous assistant
         # Note: This will also wrap up the assistant's message when it ran out of tokens
@@ -211,19 +353,28 @@ class Chat:
             message = assistant_view.get_message()
             self.append(message)
 
+        metrics.stream_seconds = time.perf_counter() - sent
+
         if finish_reason is None:
             raise ValueError("No finish reason provided by OpenAI")
 
         return (finish_reason, function_view, tool_calls)
 
     async def __process_full_completion(
-        self, resp: ChatCompletion
+        self, resp: ChatCompletion, turn: TurnResult, metrics: RequestMetrics, sent: float
     ) -> Tuple[str, Optional[ToolArguments], List[ToolArguments]]:
-        assistant_view: AssistantMessageView = AssistantMessageView()
+        assistant_view: AssistantMessageView = AssistantMessageView(sink=self.view_sink, max_rate=self.max_display_rate)
         function_view: Optional[ToolArguments] = None
 
         tool_calls: list[ToolArguments] = []
 
+        # The whole response arrives at once
+        metrics.time_to_first_token = metrics.stream_seconds = time.perf_counter() - sent
+
+        if resp.usage is not None:
+            turn.record_usage(resp.usage)
+            metrics.completion_tokens = resp.usage.completion_tokens
+
         if len(resp.choices) == 0:
             logger.warning(f"Result has no choices: {resp}")
             return ("stop", None, tool_calls)  # TODO
@@ -238,152 +389,394 @@ class Chat:
             self.append(assistant_view.get_message())
         if message.function_call is not None:
             function_call = message.function_call
-            function_view = ToolArguments(id="TBD", name=function_call.name, arguments=function_call.arguments)
+            function_view = ToolArguments(
+                id="TBD", name=function_call.name, arguments=function_call.arguments, sink=self.view_sink
+            )
             function_view.display()
         if message.tool_calls is not None:
             for tool_call in message.tool_calls:
                 tool_argument = ToolArguments(
-                    id=tool_call.id, name=tool_call.function.name, arguments=tool_call.function.arguments
+                    id=tool_call.id,
+                    name=tool_call.function.name,
+                    arguments=tool_call.function.arguments,
+                    sink=self.view_sink,
                 )
                 tool_argument.display()
                 tool_calls.append(tool_argument)
 
-                # TODO: self.append the big tools payload, verify this
-                self.append(message.model_dump())  # type: ignore
-
         return choice.finish_reason, function_view, tool_calls
 
-    async def submit(self, *messages: Union[ChatCompletionMessageParam, str], stream=True, **kwargs):
-        """Send messages to the chat model and display the response.
-
-        Side effects:
-            - Messages are sent to OpenAI Chat Models.
-            - Response(s) are displayed in the output area as a combination of Markdown and chat function calls.
-            - chat.messages are updated with response(s).
-
-        Args:
-            messages (str | ChatCompletionMessageParam): One or more messages to send to the chat, can be strings or
-            ChatCompletionMessageParam objects.
-
-            stream: Whether to stream chat into markdown or not. If False, the entire chat will be sent once.
+    async def __call_tools(
+        self, tool_arguments: List[ToolArguments], turn: TurnResult
+    ) -> List[Union[ToolCalled, BaseException]]:
+        """Call tools concurrently, bounded by `max_concurrent_tool_calls`.
 
+        Exceptions that bubble out of a tool are returned in place of its result so that one tool failing
+        does not cancel the others.
         """
 
-        full_messages: List[ChatCompletionMessageParam] = []
-        full_messages.extend(self.messages)
+        async def call_tool(tool_argument: ToolArguments) -> ToolCalled:
+            speculative = self.__speculative_calls.pop(tool_argument.id, None)
+            if speculative is not None:
+                started_with, task = speculative
+                if started_with == tool_argument.arguments:
+                    turn.speculative_tool_calls += 1
+                    return await task
+                # The arguments kept going after they looked complete, so the early call can't be used
+                task.cancel()
 
-        # TODO: Just keeping this aside while working on both stream and non-stream
-        tool_arguments: List[ToolArguments] = []
+            return await self.__call_tool(tool_argument)
 
-        for message in messages:
-            if isinstance(message, str):
-                full_messages.append(human(message))
-            else:
-                full_messages.append(message)
+        try:
+            return await asyncio.gather(*(call_tool(t) for t in tool_arguments), return_exceptions=True)
+        finally:
+            self.__cancel_speculative_calls()
 
+    async def __call_tool(self, tool_argument: ToolArguments, speculative: bool = False) -> ToolCalled:
+        start = time.perf_counter()
         try:
-            client = AsyncOpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url,
+            if self.__tool_semaphore is None:
+                return await tool_argument.call(self.function_registry)
+            async with self.__tool_semaphore:
+                return await tool_argument.call(self.function_registry)
+        finally:
+            if self.__metrics is not None:
+                self.__metrics.tools.append(
+                    ToolMetrics(name=tool_argument.name, seconds=time.perf_counter() - start, speculative=speculative)
+                )
+
+    def __speculate(self, tool_argument: ToolArguments):
+        """Start a tool marked idempotent as soon as its arguments are complete JSON."""
+        if not self.speculative_tool_calls or tool_argument.id in self.__speculative_calls:
+            return
+
+        speculable = self.__speculable.get(tool_argument.id)
+        if speculable is None:
+            speculable = (
+                tool_argument.name in self.function_registry
+                and self.function_registry.get_chatlab_metadata(tool_argument.name).idempotent
             )
+            self.__speculable[tool_argument.id] = speculable
 
-            chat_create_kwargs = {
-                "model": self.model,
-                "messages": full_messages,
-                "temperature": kwargs.get("temperature", 0),
-            }
+        if speculable and tool_argument.arguments_complete():
+            task = asyncio.ensure_future(self.__call_tool(tool_argument, speculative=True))
+            self.__speculative_calls[tool_argument.id] = (tool_argument.arguments, task)
 
-            if self.legacy_function_calling:
-                chat_create_kwargs.update(self.function_registry.api_manifest())
+    def __cancel_speculative_calls(self):
+        for _, task in self.__speculative_calls.values():
+            task.cancel()
+        self.__speculative_calls.clear()
+        self.__speculable.clear()
+
+    async def __request(
+        self, messages: Tuple[Union[ChatCompletionMessageParam, str], ...], turn: TurnResult, stream: bool, **kwargs
+    ) -> Tuple[str, Optional[ToolArguments], List[ToolArguments]]:
+        """Make a single request to the model with the history plus `messages`, processing the response."""
+        started = time.perf_counter()
+        metrics = RequestMetrics()
+
+        # The history is sent through a view rather than copied, with the new messages after it
+        pending = [MessageRecord.from_message(message) for message in messages]
+        full_messages: Sequence[ChatCompletionMessageParam] = self.messages.view(pending)  # type: ignore
+
+        chat_create_kwargs = {
+            "model": self.model,
+            "messages": full_messages,
+            "temperature": kwargs.get("temperature", 0),
+        }
+
+        manifest = self.function_registry.manifest
+        tools_param = "functions" if self.legacy_function_calling else "tools"
+
+        if self.legacy_function_calling:
+            chat_create_kwargs.update(self.function_registry.api_manifest())
+        else:
+            chat_create_kwargs["tools"] = manifest.tools or None
+
+        full_messages = self.__fit_to_context(full_messages, manifest.json if len(manifest) else None)
+        chat_create_kwargs["messages"] = full_messages
+
+        # Only deterministic requests are worth caching
+        cache_key = None
+        if self.response_cache is not None and chat_create_kwargs["temperature"] == 0:
+            # The manifest's hash stands in for the definitions so they aren't serialized again
+            key_kwargs = {**chat_create_kwargs, "stream": stream, "endpoint": self.__endpoint()}
+            if chat_create_kwargs.get(tools_param):
+                key_kwargs[tools_param] = manifest.hash
+            cache_key = request_key(key_kwargs)
+
+        metrics.build_seconds = time.perf_counter() - started
+
+        # Due to the strict response typing based on `Literal` typing on `stream`, we have to process these
+        # two cases separately
+        if stream:
+            sent = time.perf_counter()
+            streaming_response: Optional[AsyncIterator[ChatCompletionChunk]] = None
+            if self.response_cache is not None and cache_key is not None:
+                streaming_response = await self.response_cache.get_stream(cache_key)
+
+            if streaming_response is not None:
+                turn.cache_hits += 1
+                metrics.cached = True
             else:
-                chat_create_kwargs["tools"] = self.function_registry.tools or None
+                await self.__wait_for_rate_limit(full_messages, metrics)
+
+                if self.include_usage:
+                    chat_create_kwargs["stream_options"] = {"include_usage": True}
 
-            # Due to the strict response typing based on `Literal` typing on `stream`, we have to process these
-            # two cases separately
-            if stream:
+                client = self.client_pool.get(api_key=self.api_key, base_url=self.base_url)
+                sent = time.perf_counter()
                 streaming_response = await client.chat.completions.create(
                     **chat_create_kwargs,
                     stream=True,
                 )
 
-                self.append(*messages)
+                # Let the governor see how much of the rate limit is left
+                http_response = getattr(streaming_response, "response", None)
+                if http_response is not None:
+                    self.rate_limiter.observe(http_response.headers)
 
-                finish_reason, function_call_request, tool_arguments = await self.__process_stream(streaming_response)
-            else:
-                full_response = await client.chat.completions.create(
-                    **chat_create_kwargs,
-                    stream=False,
-                )
+                if self.response_cache is not None and cache_key is not None:
+                    streaming_response = self.response_cache.record_stream(cache_key, streaming_response)
 
-                self.append(*messages)
+            self.append(*pending)
+            if self.__metrics is not None:
+                self.__metrics.requests.append(metrics)
 
-                (finish_reason, function_call_request, tool_arguments) = await self.__process_full_completion(
-                    full_response
-                )
+            try:
+                return await self.__process_stream(streaming_response, turn, metrics, sent)
+            except BaseException:
+                self.__cancel_speculative_calls()
+                raise
 
-        except openai.RateLimitError as e:
-            logger.error(f"Rate limited: {e}. Waiting 5 seconds and trying again.")
-            await asyncio.sleep(5)
-            await self.submit(*messages, stream=stream, **kwargs)
+        full_response: Optional[ChatCompletion] = None
+        if self.response_cache is not None and cache_key is not None:
+            full_response = await self.response_cache.get_completion(cache_key)
 
-            return
+        sent = time.perf_counter()
+        if full_response is not None:
+            turn.cache_hits += 1
+            metrics.cached = True
+        else:
+            await self.__wait_for_rate_limit(full_messages, metrics)
 
-        if finish_reason == "function_call":
-            if function_call_request is None:
-                raise ValueError(
-                    "Function call was the stated function_call reason without having a complete function call. If you see this, report it as an issue to https://github.com/rgbkrk/chatlab/issues"  # noqa: E501
-                )
-            # Record the attempted call from the LLM
-            self.append(function_call_request.get_function_message())
+            client = self.client_pool.get(api_key=self.api_key, base_url=self.base_url)
+            sent = time.perf_counter()
+            full_response = await client.chat.completions.create(
+                **chat_create_kwargs,
+                stream=False,
+            )
 
-            function_called = await function_call_request.call(function_registry=self.function_registry)
+            if self.response_cache is not None and cache_key is not None:
+                await self.response_cache.set_completion(cache_key, full_response)
+
+        self.append(*pending)
+        if self.__metrics is not None:
+            self.__metrics.requests.append(metrics)
+
+        return await self.__process_full_completion(full_response, turn, metrics, sent)
+
+    def __fit_to_context(
+        self, messages: Sequence[ChatCompletionMessageParam], tools: Optional[str]
+    ) -> Sequence[ChatCompletionMessageParam]:
+        """Apply the context policy when the messages would overflow the model's context window."""
+        if self.token_counter.model != self.model:
+            self.token_counter = TokenCounter(self.model)
+        self.token_counter.prune(messages)
+
+        if self.context_policy is None:
+            return messages
+
+        budget = context_budget(
+            self.model,
+            max_context_tokens=self.max_context_tokens,
+            reserve_tokens=self.reserve_tokens,
+            tool_tokens=self.token_counter.count_tools(tools),
+        )
+        if budget is None or self.token_counter.count(messages) <= budget:
+            return messages
+
+        trimmed = self.context_policy(messages, budget, self.token_counter)
+        logger.info(f"Trimmed {len(messages) - len(trimmed)} messages to fit the context window of {self.model}.")
+        return trimmed
+
+    def __endpoint(self) -> str:
+        """The chat completions URL requests go to, resolved the same way the OpenAI client does."""
+        base_url = self.base_url or os.environ.get("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+        return f"{str(base_url).rstrip('/')}/chat/completions"
+
+    async def __wait_for_rate_limit(self, messages: Sequence[ChatCompletionMessageParam], metrics: RequestMetrics):
+        delay = self.rate_limiter.reserve(self.token_counter.count(messages))
+        if delay > 0:
+            metrics.wait_seconds += delay
+            await asyncio.sleep(delay)
+
+    async def submit(self, *messages: Union[ChatCompletionMessageParam, str], stream=True, **kwargs) -> TurnResult:
+        """Send messages to the chat model and display the response.
 
-            # Include the response (or error) for the model
-            self.append(function_called.get_function_called_message())
+        Side effects:
+            - Messages are sent to OpenAI Chat Models.
+            - Response(s) are displayed in the output area as a combination of Markdown and chat function calls.
+            - chat.messages are updated with response(s).
 
-            # Reply back to the LLM with the result of the function call, allow it to continue
-            await self.submit(stream=stream, **kwargs)
-            return
+        Args:
+            messages (str | ChatCompletionMessageParam): One or more messages to send to the chat, can be strings or
+            ChatCompletionMessageParam objects.
 
-        if finish_reason == "tool_calls":
-            self.append(assistant_tool_calls(tool_arguments))
-            for tool_argument in tool_arguments:
-                # Oh crap I need to append the big assistant call of it too. May have to assume we've done it by here.
-                function_called = await tool_argument.call(self.function_registry)
-                # TODO: Format the tool message
-                self.append(function_called.get_tool_called_message())
+            stream: Whether to stream chat into markdown or not. If False, the entire chat will be sent once.
 
-            await self.submit(stream=stream, **kwargs)
-            return
+        Returns:
+            TurnResult: How the turn went, including the finish reason and the number of tool rounds run.
 
-        # All other finish reasons are valid for regular assistant messages
-        if finish_reason == "stop":
-            return
+        """
+        turn = TurnResult()
+        metrics = self.__metrics = TurnMetrics()
+        started = time.perf_counter()
 
-        elif finish_reason == "max_tokens" or finish_reason == "length":
-            print("max tokens or overall length is too high...\n")
-        elif finish_reason == "content_filter":
-            print("Content omitted due to OpenAI content filters...\n")
-        else:
-            print(
-                f"UNKNOWN FINISH REASON: '{finish_reason}'. If you see this message, report it as an issue to https://github.com/rgbkrk/chatlab/issues"  # noqa: E501
-            )
+        try:
+            return await self.__submit(turn, messages, stream, **kwargs)
+        finally:
+            self.__metrics = None
+            metrics.retries = turn.retries
+            metrics.total_seconds = time.perf_counter() - started
+            turn.metrics = metrics
+
+            self.stats.record(metrics)
+            # A broken observer shouldn't hide how the turn went, including its own exception
+            for observer in self.observers:
+                try:
+                    observer(metrics)
+                except Exception as e:
+                    logger.warning(f"Observer {observer!r} failed: {e}", exc_info=True)
+
+    async def __submit(
+        self, turn: TurnResult, messages: Tuple[Union[ChatCompletionMessageParam, str], ...], stream: bool, **kwargs
+    ) -> TurnResult:
+        self.__tool_semaphore = None
+        if self.max_concurrent_tool_calls is not None:
+            self.__tool_semaphore = asyncio.Semaphore(self.max_concurrent_tool_calls)
+
+        deadline = None
+        if self.turn_timeout is not None:
+            deadline = time.monotonic() + self.turn_timeout
+
+        # New messages only go out with the first request; after that they're part of the history
+        pending_messages = messages
+
+        attempt = 0
+
+        while True:
+            try:
+                if deadline is None:
+                    finish_reason, function_call_request, tool_arguments = await self.__request(
+                        pending_messages, turn, stream, **kwargs
+                    )
+                else:
+                    finish_reason, function_call_request, tool_arguments = await asyncio.wait_for(
+                        self.__request(pending_messages, turn, stream, **kwargs), max(deadline - time.monotonic(), 0)
+                    )
+            except openai.RateLimitError as e:
+                attempt += 1
+                if attempt >= self.rate_limiter.max_attempts:
+                    raise
+
+                # The governor pauses every chat sharing it; the next request waits out the delay
+                delay = self.rate_limiter.backoff(attempt, e)
+                logger.warning(f"Rate limited: {e}. Retrying in {delay:.1f} seconds.")
+                turn.retries += 1
+
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    turn.stop_reason = "deadline"
+                    return turn
+
+                continue
+            except asyncio.TimeoutError:
+                logger.warning(f"Turn exceeded its timeout of {self.turn_timeout} seconds.")
+                turn.stop_reason = "deadline"
+                return turn
+
+            pending_messages = ()
+            attempt = 0
+            turn.requests += 1
+            turn.finish_reason = finish_reason
+
+            if finish_reason == "function_call":
+                if function_call_request is None:
+                    raise ValueError(
+                        "Function call was the stated function_call reason without having a complete function call. If you see this, report it as an issue to https://github.com/rgbkrk/chatlab/issues"  # noqa: E501
+                    )
+                # Record the attempted call from the LLM
+                self.append(function_call_request.get_function_message())
 
-    def append(self, *messages: Union[ChatCompletionMessageParam, str]):
+                function_called = await self.__call_tool(function_call_request)
+
+                # Include the response (or error) for the model
+                self.append(function_called.get_function_called_message())
+
+                turn.tool_calls += 1
+
+            elif finish_reason == "tool_calls":
+                self.append(assistant_tool_calls(tool_arguments))
+
+                # Run the tools concurrently, keeping the results in the order the model requested them
+                results = await self.__call_tools(tool_arguments, turn)
+
+                errors = []
+                for result in results:
+                    if isinstance(result, BaseException):
+                        errors.append(result)
+                        continue
+                    self.append(result.get_tool_called_message())
+
+                # Tools marked to bubble exceptions get raised once the other results are recorded
+                if errors:
+                    raise errors[0]
+
+                turn.tool_calls += len(tool_arguments)
+
+            else:
+                # Tools started early aren't needed when the model didn't finish by calling them
+                self.__cancel_speculative_calls()
+
+                # All other finish reasons are valid for regular assistant messages
+                if finish_reason == "max_tokens" or finish_reason == "length":
+                    print("max tokens or overall length is too high...\n")
+                elif finish_reason == "content_filter":
+                    print("Content omitted due to OpenAI content filters...\n")
+                elif finish_reason != "stop":
+                    print(
+                        f"UNKNOWN FINISH REASON: '{finish_reason}'. If you see this message, report it as an issue to https://github.com/rgbkrk/chatlab/issues"  # noqa: E501
+                    )
+
+                return turn
+
+            turn.tool_rounds += 1
+
+            # Reply back to the LLM with the result of the tool calls, allowing it to continue, within limits
+            if self.max_tool_rounds is not None and turn.tool_rounds >= self.max_tool_rounds:
+                logger.warning(f"Stopping after {turn.tool_rounds} rounds of tool calls (max_tool_rounds).")
+                turn.stop_reason = "max_tool_rounds"
+                return turn
+
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning(f"Turn exceeded its timeout of {self.turn_timeout} seconds.")
+                turn.stop_reason = "deadline"
+                return turn
+
+    def append(self, *messages: Union[MessageRecord, ChatCompletionMessageParam, str]):
         """Append messages to the conversation history.
 
         Note: this does not send the messages on until `chat` is called.
 
         Args:
-            messages (str | ChatCompletionMessageParam): One or more messages to append to the conversation.
+            messages (str | ChatCompletionMessageParam | MessageRecord): One or more messages to append.
 
         """
         # Messages are either a dict respecting the {role, content} format or a str that we convert to a human message
-        for message in messages:
-            if isinstance(message, str):
-                self.messages.append(human(message))
-            else:
-                self.messages.append(message)
+        records = [MessageRecord.from_message(message) for message in messages]
+        self.messages.extend(records)
+        if self.store is not None and records:
+            self.store.append(self.session_id, records)
 
     @overload
     def register(
@@ -435,12 +828,21 @@ class Chat:
 
         return full_schema
 
-    def get_history(self):
-        """Returns the conversation history as a list of messages."""
-        return self.messages
+    @property
+    def messages(self) -> MessageHistory:
+        """The conversation history, stored compactly. Works like a list of message dicts."""
+        return self.__messages
+
+    @messages.setter
+    def messages(self, messages: Union[MessageHistory, List[Union[ChatCompletionMessageParam, str]]]):
+        self.__messages = messages if isinstance(messages, MessageHistory) else MessageHistory(messages)
+
+    def get_history(self) -> List[ChatCompletionMessageParam]:
+        """Returns the conversation history as a list of plain message dicts."""
+        return self.messages.to_dicts()
 
     def clear_history(self):
-        """Clears the conversation history."""
+        """Clears the conversation history. Anything already saved to the `store` is kept."""
         self.messages = []
 
     def __repr__(self):
@@ -0,0 +1,139 @@
+"""Shared, pooled OpenAI clients for ChatLab.
+
+Creating an `AsyncOpenAI` client also creates a fresh HTTP connection pool, which means new TCP
+connections and TLS handshakes. ChatLab keeps one client per (api_key, base_url) pair so that
+every `Chat` (and every tool round within a chat) reuses warm, kept-alive connections.
+
+Example:
+    >>> from chatlab import Chat
+    >>> from chatlab.clients import ClientPool
+
+    >>> async with ClientPool(max_connections=20) as pool:
+    ...     chat = Chat(client_pool=pool)
+    ...     await chat("Hello!")
+
+"""
+
+import asyncio
+import importlib.util
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+ClientKey = Tuple[Optional[str], Optional[str]]
+
+
+def http2_available() -> bool:
+    """Check if the `h2` package is installed so that httpx can speak HTTP/2."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class ClientPool:
+    """A pool of `AsyncOpenAI` clients keyed by (api_key, base_url).
+
+    Args:
+        max_connections (int): The maximum number of concurrent connections per client.
+
+        max_keepalive_connections (int): The maximum number of idle connections kept alive per client.
+
+        keepalive_expiry (float): Seconds an idle connection is kept alive before being closed.
+
+        http2 (bool): Use HTTP/2 when the optional `h2` package is installed. Defaults to `True`.
+
+    Clients are bound to the event loop they were first used on. When a pool is used from a new
+    event loop (for example, a new `asyncio.run`), a fresh client is created for that loop, and the
+    old client is closed on its own loop, or by `aclose` when it's awaited there.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+    ):
+        """Initialize an empty ClientPool."""
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and http2_available()
+
+        self.__clients: Dict[ClientKey, Tuple[AsyncOpenAI, Optional[asyncio.AbstractEventLoop]]] = {}
+        # Clients replaced for a new event loop, kept until they can be closed on their own loop
+        self.__retired: List[Tuple[AsyncOpenAI, asyncio.AbstractEventLoop]] = []
+
+    def get(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> AsyncOpenAI:
+        """Get the client for an api_key and base_url, creating it if needed."""
+        key = (api_key, base_url)
+
+        try:
+            loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        existing = self.__clients.get(key)
+        if existing is not None:
+            client, client_loop = existing
+            if client_loop is None or loop is None or client_loop is loop:
+                return client
+
+            # The connections belong to another (possibly closed) event loop and can't be reused here.
+            if client_loop is not None:
+                self.__retire(client, client_loop)
+
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=DefaultAsyncHttpxClient(limits=self.limits, http2=self.http2),
+        )
+        self.__clients[key] = (client, loop)
+
+        return client
+
+    def __retire(self, client: AsyncOpenAI, loop: asyncio.AbstractEventLoop):
+        """Close a client that was replaced, on the event loop its connections belong to."""
+        if loop.is_closed():
+            # Nothing can run on a closed loop. Its connections are released along with the client.
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.close(), loop)
+            return
+        self.__retired.append((client, loop))
+
+    async def aclose(self):
+        """Close every client in the pool along with their connections."""
+        clients: List[Tuple[AsyncOpenAI, Optional[asyncio.AbstractEventLoop]]] = [
+            *self.__clients.values(),
+            *self.__retired,
+        ]
+        self.__clients.clear()
+        self.__retired = []
+
+        current = asyncio.get_running_loop()
+        for client, client_loop in clients:
+            if client_loop is None or client_loop is current:
+                await client.close()
+            # Connections made on another event loop can't be closed from this one, only on that loop
+            elif client_loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.close(), client_loop)
+            elif not client_loop.is_closed():
+                self.__retired.append((client, client_loop))
+
+    def __len__(self) -> int:
+        """Return the number of clients in the pool."""
+        return len(self.__clients)
+
+    async def __aenter__(self) -> "ClientPool":
+        """Use the pool as an async context manager, closing it on exit."""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Close all clients in the pool."""
+        await self.aclose()
+
+
+default_client_pool = ClientPool()
+"""The process-wide pool used by `Chat` when no `client_pool` is provided."""
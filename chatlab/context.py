@@ -0,0 +1,236 @@
+"""Fit conversation history into a model's context window.
+
+Before each request, `Chat` counts the tokens in the history and, when it would not fit in the
+model's context window (less room reserved for the reply), applies a trimming policy to the
+messages it sends. The full history stays on `chat.messages`.
+
+Token counts use `tiktoken` when it is installed and fall back to an estimate of about four
+characters per token otherwise. Counts are cached per message, so each message is only counted
+once no matter how long the conversation runs.
+
+Policies are functions that take the messages, the token budget and a `TokenCounter`, and return
+the messages to send:
+
+    - `drop_oldest`: drop the oldest messages (after any leading system messages) until it fits
+    - `keep_system_and_last(n)`: send the system messages plus the last `n` messages
+    - `elide_tool_outputs(keep_last=1)`: replace old tool outputs with a short note, then drop oldest
+
+Example:
+    >>> from chatlab import Chat, system
+    >>> from chatlab.context import keep_system_and_last
+
+    >>> chat = Chat(system("You are a helpful assistant"), context_policy=keep_system_and_last(20))
+
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from openai.types.chat import ChatCompletionMessageParam
+
+from .models import context_window
+
+# Every message carries a few tokens of overhead for its role and separators
+TOKENS_PER_MESSAGE = 3
+
+# Every reply is primed with a few tokens
+TOKENS_PER_REPLY = 3
+
+ELIDED_OUTPUT = "[Output elided to fit the context window]"
+
+
+def _load_encoding(model: str) -> Optional[Any]:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+class TokenCounter:
+    """Counts tokens for messages, caching the count for each message.
+
+    Args:
+        model (str): The model to count tokens for.
+    """
+
+    def __init__(self, model: str):
+        """Initialize a TokenCounter for a model."""
+        self.model = model
+        self.encoding = _load_encoding(model)
+
+        # Keyed by id, holding the message itself so that the id can't be reused while cached
+        self.__cache: Dict[int, Tuple[Any, int]] = {}
+        # The last tool definitions counted, which rarely change between requests
+        self.__tools: Tuple[Optional[str], int] = (None, 0)
+
+    def count_text(self, text: str) -> int:
+        """Count the tokens in a string."""
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def count_message(self, message: ChatCompletionMessageParam) -> int:
+        """Count the tokens in a single message, using the cache when possible."""
+        cached = self.__cache.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+
+        tokens = TOKENS_PER_MESSAGE
+        for key, value in message.items():  # type: ignore
+            if value is None:
+                continue
+            if isinstance(value, str):
+                tokens += self.count_text(value)
+            else:
+                # Tool calls, function calls and multi-part content
+                tokens += self.count_text(json.dumps(value, default=str))
+
+        self.__cache[id(message)] = (message, tokens)
+        return tokens
+
+    def count(self, messages: Sequence[ChatCompletionMessageParam]) -> int:
+        """Count the tokens for a full request's messages."""
+        return sum(self.count_message(message) for message in messages) + TOKENS_PER_REPLY
+
+    def prune(self, messages: Sequence[ChatCompletionMessageParam]):
+        """Forget the counts for messages that are no longer in the conversation.
+
+        Pass the full history. Trim policies count subsets of it, so pruning to those would throw
+        away the counts for the rest of the history and have it all recounted on the next request.
+        """
+        if len(self.__cache) > 2 * len(messages):
+            current = {id(message) for message in messages}
+            self.__cache = {key: entry for key, entry in self.__cache.items() if key in current}
+
+    def count_tools(self, tools: Optional[Any]) -> int:
+        """Count the tokens taken up by tool or function definitions, or their serialized JSON."""
+        if not tools:
+            return 0
+        if not isinstance(tools, str):
+            return self.count_text(json.dumps(tools, default=str))
+
+        if tools != self.__tools[0]:
+            self.__tools = (tools, self.count_text(tools))
+        return self.__tools[1]
+
+
+TrimPolicy = Callable[[Sequence[ChatCompletionMessageParam], int, TokenCounter], Sequence[ChatCompletionMessageParam]]
+
+
+def _is_result(message: ChatCompletionMessageParam) -> bool:
+    return message.get("role") in ("tool", "function")
+
+
+def group_messages(messages: Sequence[ChatCompletionMessageParam]) -> List[List[ChatCompletionMessageParam]]:
+    """Group messages so that tool calls stay together with their results.
+
+    The API rejects tool results that don't follow the assistant message that called them, so
+    trimming always keeps or drops a call and its results together.
+    """
+    groups: List[List[ChatCompletionMessageParam]] = []
+    for message in messages:
+        if _is_result(message) and groups:
+            groups[-1].append(message)
+        else:
+            groups.append([message])
+    return groups
+
+
+def _split_system(messages: Sequence[ChatCompletionMessageParam]):
+    index = 0
+    while index < len(messages) and messages[index].get("role") == "system":
+        index += 1
+    return messages[:index], messages[index:]
+
+
+def drop_oldest(
+    messages: Sequence[ChatCompletionMessageParam], budget: int, counter: TokenCounter
+) -> Sequence[ChatCompletionMessageParam]:
+    """Drop the oldest messages after any leading system messages until the rest fit in the budget.
+
+    The most recent message is always kept.
+    """
+    if counter.count(messages) <= budget:
+        return messages
+
+    system_messages, rest = _split_system(messages)
+    groups = group_messages(rest)
+
+    total = counter.count(messages)
+    while len(groups) > 1 and total > budget:
+        dropped = groups.pop(0)
+        total -= sum(counter.count_message(message) for message in dropped)
+
+    # Results without their call can't be sent
+    while len(groups) > 1 and _is_result(groups[0][0]):
+        groups.pop(0)
+
+    return list(system_messages) + [message for group in groups for message in group]
+
+
+def keep_system_and_last(n: int) -> TrimPolicy:
+    """Create a policy that sends the leading system messages plus the last `n` messages.
+
+    Fewer messages are sent if the last `n` still don't fit, and more if needed to keep tool calls with their results.
+    """
+
+    def policy(
+        messages: Sequence[ChatCompletionMessageParam], budget: int, counter: TokenCounter
+    ) -> Sequence[ChatCompletionMessageParam]:
+        system_messages, rest = _split_system(messages)
+
+        kept: List[ChatCompletionMessageParam] = []
+        for group in reversed(group_messages(rest)):
+            if kept and len(kept) + len(group) > n:
+                break
+            kept = group + kept
+
+        return drop_oldest(list(system_messages) + kept, budget, counter)
+
+    return policy
+
+
+def elide_tool_outputs(keep_last: int = 1) -> TrimPolicy:
+    """Create a policy that replaces the oldest tool outputs with a short note until the messages fit.
+
+    The last `keep_last` tool outputs are always sent in full. If eliding isn't enough, the oldest messages are dropped.
+    """
+
+    def policy(
+        messages: Sequence[ChatCompletionMessageParam], budget: int, counter: TokenCounter
+    ) -> Sequence[ChatCompletionMessageParam]:
+        total = counter.count(messages)
+        if total <= budget:
+            return messages
+
+        results = [index for index, message in enumerate(messages) if _is_result(message)]
+        elidable = results[: max(len(results) - keep_last, 0)]
+
+        trimmed = list(messages)
+        for index in elidable:
+            if total <= budget:
+                break
+
+            message = messages[index]
+            elided = {**message, "content": ELIDED_OUTPUT}
+            total += counter.count_message(elided) - counter.count_message(message)  # type: ignore
+            trimmed[index] = elided  # type: ignore
+
+        return drop_oldest(trimmed, budget, counter)
+
+    return policy
+
+
+def context_budget(
+    model: str, max_context_tokens: Optional[int] = None, reserve_tokens: int = 0, tool_tokens: int = 0
+) -> Optional[int]:
+    """Determine how many tokens of messages can be sent, if the context window is known."""
+    window = max_context_tokens if max_context_tokens is not None else context_window(model)
+    if window is None:
+        return None
+    return max(window - reserve_tokens - tool_tokens, 0)
@@ -29,10 +29,19 @@ Examples:
 
 """
 
-from typing import Callable, Optional
+import asyncio
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel
 
+from .cache import ResponseCache, request_key
+from .executors import ExecutorKind
+
 
 class ChatlabMetadata(BaseModel):
     """ChatLab metadata for a function."""
@@ -40,6 +49,10 @@ class ChatlabMetadata(BaseModel):
     expose_exception_to_llm: bool = True
     render: Optional[Callable] = None
     bubble_exceptions: bool = False
+    executor: Optional[ExecutorKind] = None
+    timeout: Optional[float] = None
+    max_output_chars: Optional[int] = None
+    idempotent: bool = False
 
 
 def bubble_exceptions(func):
@@ -124,3 +137,315 @@ def incremental_display(render_func: Callable):
         return func
 
     return decorator
+
+
+def idempotent(func):
+    """Mark a function as safe to call more than once with the same arguments, without side effects.
+
+    Chats created with `speculative_tool_calls=True` start idempotent functions as soon as their arguments have
+    streamed in, overlapping them with the rest of the model's response.
+
+    Args:
+        func (Callable): The function to annotate.
+
+    Examples:
+        >>> from chatlab.decorators import idempotent
+
+        >>> @idempotent
+        ... async def get_weather(city: str):
+        ...     '''Get the current weather for a city'''
+        ...     ...
+
+    """
+    if not hasattr(func, "chatlab_metadata"):
+        func.chatlab_metadata = ChatlabMetadata()
+
+    # Make sure that chatlab_metadata is an instance of ChatlabMetadata
+    if not isinstance(func.chatlab_metadata, ChatlabMetadata):
+        raise Exception("func.chatlab_metadata must be an instance of ChatlabMetadata")
+
+    func.chatlab_metadata.idempotent = True
+    return func
+
+
+def run_in(executor: ExecutorKind):
+    """Choose where a synchronous function runs when called by the model, overriding the registry's default.
+
+    Args:
+        executor (str): "inline" to run on the event loop, "thread" for a thread pool or "process" for a process pool.
+
+    Examples:
+        >>> from chatlab.decorators import run_in
+
+        >>> @run_in("process")
+        ... def count_primes(limit: int):
+        ...     '''Count the primes below a limit'''
+        ...     return sum(all(n % d for d in range(2, int(n**0.5) + 1)) for n in range(2, limit))
+
+    """
+
+    def decorator(func):
+        if not hasattr(func, "chatlab_metadata"):
+            func.chatlab_metadata = ChatlabMetadata()
+
+        # Make sure that chatlab_metadata is an instance of ChatlabMetadata
+        if not isinstance(func.chatlab_metadata, ChatlabMetadata):
+            raise Exception("func.chatlab_metadata must be an instance of ChatlabMetadata")
+
+        func.chatlab_metadata.executor = executor
+        return func
+
+    return decorator
+
+
+def timeout(seconds: float):
+    """Limit how long a function may run when called by the model, overriding the registry's default.
+
+    When the limit is hit, the call is cancelled and the model is told that the function timed out. Synchronous
+    functions can't be interrupted on the event loop, so they must run in a thread or process, not "inline".
+
+    Args:
+        seconds (float): The longest the function may run.
+
+    Examples:
+        >>> from chatlab.decorators import timeout
+
+        >>> @timeout(10)
+        ... async def fetch_page(url: str):
+        ...     '''Fetch a web page'''
+        ...     async with httpx.AsyncClient() as client:
+        ...         return (await client.get(url)).text
+
+    """
+
+    def decorator(func):
+        if not hasattr(func, "chatlab_metadata"):
+            func.chatlab_metadata = ChatlabMetadata()
+
+        # Make sure that chatlab_metadata is an instance of ChatlabMetadata
+        if not isinstance(func.chatlab_metadata, ChatlabMetadata):
+            raise Exception("func.chatlab_metadata must be an instance of ChatlabMetadata")
+
+        func.chatlab_metadata.timeout = seconds
+        return func
+
+    return decorator
+
+
+def limit_output(max_chars: int):
+    """Set the budget for a function's output as sent to the model, overriding the registry's default.
+
+    Larger output is summarized based on its type, e.g. the head and tail of text or the schema and a sample of JSON.
+
+    Args:
+        max_chars (int): The most characters of output to send.
+
+    Examples:
+        >>> from chatlab.decorators import limit_output
+
+        >>> @limit_output(2_000)
+        ... def list_files(directory: str):
+        ...     '''List every file under a directory'''
+        ...     return [str(path) for path in Path(directory).rglob("*")]
+
+    """
+
+    def decorator(func):
+        if not hasattr(func, "chatlab_metadata"):
+            func.chatlab_metadata = ChatlabMetadata()
+
+        # Make sure that chatlab_metadata is an instance of ChatlabMetadata
+        if not isinstance(func.chatlab_metadata, ChatlabMetadata):
+            raise Exception("func.chatlab_metadata must be an instance of ChatlabMetadata")
+
+        func.chatlab_metadata.max_output_chars = max_chars
+        return func
+
+    return decorator
+
+
+class ToolResultCache:
+    """An in-memory LRU of tool results, optionally backed by a `ResponseCache` on disk.
+
+    Only results that can be stored as JSON are written to disk. A disk cache can be shared, so
+    entries on disk are only cleared when the cache has a `namespace` that its keys start with.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        maxsize: int = 128,
+        disk_cache: Optional[ResponseCache] = None,
+        namespace: Optional[str] = None,
+    ):
+        """Create an empty cache."""
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.disk_cache = disk_cache
+        self.namespace = namespace
+
+        self.__entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Sync tools may run in threads
+        self.__lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Look up a result, returning whether it was found along with the result."""
+        now = time.time()
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                created_at, result = entry
+                if self.ttl is None or created_at + self.ttl >= now:
+                    self.__entries.move_to_end(key)
+                    return True, result
+                del self.__entries[key]
+
+        if self.disk_cache is not None:
+            payloads = self.disk_cache.get(key)
+            if payloads and (self.ttl is None or payloads[0]["created_at"] + self.ttl >= now):
+                self.__remember(key, payloads[0]["created_at"], payloads[0]["result"])
+                return True, payloads[0]["result"]
+
+        return False, None
+
+    def set(self, key: str, result: Any):
+        """Store a result."""
+        now = time.time()
+        self.__remember(key, now, result)
+
+        if self.disk_cache is not None:
+            try:
+                self.disk_cache.set(key, [{"created_at": now, "result": result}])
+            except (TypeError, ValueError):
+                # Not JSON serializable, so it only lives in memory
+                pass
+
+    def clear(self):
+        """Forget every result, in memory and in this cache's namespace on disk."""
+        with self.__lock:
+            self.__entries.clear()
+
+        if self.disk_cache is not None and self.namespace is not None:
+            self.disk_cache.delete_prefix(f"{self.namespace}:")
+
+    def __remember(self, key: str, created_at: float, result: Any):
+        with self.__lock:
+            self.__entries[key] = (created_at, result)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        """Return the number of results held in memory."""
+        return len(self.__entries)
+
+
+def cached_tool(ttl: Optional[float] = None, maxsize: int = 128, disk_cache: Optional[ResponseCache] = None):
+    """Memoize a tool's results, so repeated calls with the same arguments return right away.
+
+    Works with both sync and async functions, but not generator functions. Concurrent async calls with the same
+    arguments share a single call. Exceptions are never cached. `cache_clear()` on the decorated function forgets its
+    results in memory and on disk.
+
+    Args:
+        ttl (float): Seconds a result stays valid for. Results never expire by default.
+
+        maxsize (int): The most results to keep in memory. The least recently used results are evicted first.
+
+        disk_cache (ResponseCache): Also store results on disk, so they last across sessions. Only results that can
+        be stored as JSON are written to disk.
+
+    Examples:
+        >>> from chatlab.decorators import cached_tool
+
+        >>> @cached_tool(ttl=60 * 60)
+        ... async def get_docs(package: str):
+        ...     '''Fetch the README for a package from PyPI'''
+        ...     async with httpx.AsyncClient() as client:
+        ...         response = await client.get(f"https://pypi.org/pypi/{package}/json")
+        ...         return response.json()["info"]["description"]
+
+    """
+
+    def decorator(func):
+        if inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func):
+            # A generator is used up by whoever reads it first, so there's no result to hand to later calls
+            raise TypeError(f"cached_tool can't cache {func.__qualname__} since it's a generator function")
+
+        name = f"{func.__module__}.{func.__qualname__}"
+        cache = ToolResultCache(ttl=ttl, maxsize=maxsize, disk_cache=disk_cache, namespace=name)
+        signature = inspect.signature(func)
+
+        def make_key(args, kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            # Prefixed with the function's name so that clearing it only removes its own results from disk
+            return f"{name}:{request_key({'function': name, 'arguments': bound.arguments})}"
+
+        if asyncio.iscoroutinefunction(func):
+            # Calls in flight, with the number of callers waiting on each
+            in_flight: Dict[str, List[Any]] = {}
+
+            async def call_and_store(key, args, kwargs):
+                result = await func(*args, **kwargs)
+                if cache.disk_cache is not None:
+                    await asyncio.to_thread(cache.set, key, result)
+                else:
+                    cache.set(key, result)
+                return result
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+
+                if cache.disk_cache is not None:
+                    found, result = await asyncio.to_thread(cache.get, key)
+                else:
+                    found, result = cache.get(key)
+                if found:
+                    return result
+
+                entry = in_flight.get(key)
+                if entry is None:
+                    entry = [asyncio.ensure_future(call_and_store(key, args, kwargs)), 0]
+                    in_flight[key] = entry
+                task = entry[0]
+
+                entry[1] += 1
+                try:
+                    result = await asyncio.shield(task)
+                except asyncio.CancelledError:
+                    # Only stop the call when nobody else is waiting on it
+                    if entry[1] == 1 and not task.done():
+                        task.cancel()
+                    raise
+                finally:
+                    entry[1] -= 1
+                    if in_flight.get(key) is entry and (task.done() or entry[1] == 0):
+                        del in_flight[key]
+
+                return result
+
+            wrapper = async_wrapper
+        else:
+
+            @functools.wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+
+                found, result = cache.get(key)
+                if found:
+                    return result
+
+                result = func(*args, **kwargs)
+                cache.set(key, result)
+                return result
+
+            wrapper = sync_wrapper
+
+        wrapper.cache = cache  # type: ignore
+        wrapper.cache_clear = cache.clear  # type: ignore
+        return wrapper
+
+    return decorator
@@ -0,0 +1,80 @@
+"""Where synchronous tools run.
+
+Calling a blocking function directly on the event loop freezes every chat and stream sharing
+that loop until it returns, so synchronous tools run elsewhere:
+
+    - "thread": in a thread pool, for blocking I/O. The default.
+    - "inline": on the event loop, for quick functions or ones that must stay on the main thread
+    - "process": in a process pool, for heavy compute. The function and its arguments must be picklable.
+
+Coroutine functions always run on the event loop.
+
+Example:
+    >>> from chatlab import FunctionRegistry
+    >>> from chatlab.decorators import run_in
+
+    >>> @run_in("process")
+    ... def factorize(n: int):
+    ...     '''Find the prime factors of a number'''
+    ...     ...
+
+    >>> registry = FunctionRegistry()
+    >>> registry.register(factorize)
+
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Literal, Optional
+
+ExecutorKind = Literal["inline", "thread", "process"]
+
+__process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def default_process_pool() -> ProcessPoolExecutor:
+    """Get the process pool shared by every registry, starting it on first use."""
+    global __process_pool
+
+    if __process_pool is None:
+        __process_pool = ProcessPoolExecutor()
+    return __process_pool
+
+
+async def run_sync(
+    function: Callable,
+    kwargs: dict,
+    executor: ExecutorKind = "thread",
+    thread_pool: Optional[Executor] = None,
+    process_pool: Optional[Executor] = None,
+) -> Any:
+    """Run a synchronous function with `executor`, without blocking the event loop unless it's "inline".
+
+    Args:
+        function (Callable): The function to run.
+
+        kwargs (dict): Keyword arguments for the function.
+
+        executor (str): One of "inline", "thread" or "process".
+
+        thread_pool (Executor): The pool for "thread". Defaults to the event loop's default executor.
+
+        process_pool (Executor): The pool for "process". Defaults to a process pool shared by all registries.
+    """
+    if executor == "inline":
+        return function(**kwargs)
+
+    loop = asyncio.get_running_loop()
+
+    if executor == "thread":
+        # Carry context variables over to the thread, like `asyncio.to_thread`
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(thread_pool, functools.partial(context.run, function, **kwargs))
+
+    if executor == "process":
+        pool = process_pool if process_pool is not None else default_process_pool()
+        return await loop.run_in_executor(pool, functools.partial(function, **kwargs))
+
+    raise ValueError(f"Unknown executor {executor!r}. Use 'inline', 'thread' or 'process'.")
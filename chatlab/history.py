@@ -0,0 +1,280 @@
+"""Compact storage for conversation history.
+
+Long-running processes can hold thousands of conversations, and a plain dict per message costs
+several times more than the handful of fields it holds. `Chat.messages` instead stores each
+message as a `MessageRecord`: a mapping backed by `__slots__`, with roles and names interned so
+every message shares the same few strings.
+
+Records behave like the message dicts they replace. They compare equal to dicts, support
+`message["content"]` and `message.get("name")`, and are converted to plain dicts with `to_dict()`
+(or `dict(message)`) when needed, such as by the OpenAI client as it sends them. For plain data,
+like for `json.dumps`, use `history.to_dicts()`, `history.to_json()` or `Chat.get_history()`.
+Adding a list to a history gives a plain list of dicts, just as adding two lists would.
+
+Example:
+    >>> from chatlab.history import MessageHistory
+
+    >>> history = MessageHistory([{"role": "user", "content": "Hi"}])
+    >>> history[0] == {"role": "user", "content": "Hi"}
+    True
+    >>> history.to_dicts()
+    [{'role': 'user', 'content': 'Hi'}]
+
+"""
+
+import json
+import sys
+from collections.abc import Mapping, MutableMapping, MutableSequence, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union, overload
+
+from openai.types.chat import ChatCompletionMessageParam
+
+from .messaging import human
+
+# The fields that get a slot. Anything else a message carries is kept in `extra`.
+FIELDS = ("role", "content", "name", "tool_call_id", "tool_calls", "function_call")
+
+# Fields whose values repeat across many messages, so they're worth interning
+INTERNED = frozenset(("role", "name"))
+
+
+class MessageRecord(MutableMapping):
+    """A single message, stored compactly.
+
+    Unset fields take up no space beyond their slot, and are missing from the mapping just like
+    absent keys in a dict.
+    """
+
+    __slots__ = FIELDS + ("extra",)
+
+    extra: Dict[str, Any]
+
+    def __init__(self, message: Optional[Mapping] = None, **fields: Any):
+        """Create a record from a message dict and/or fields."""
+        if message is not None:
+            for key, value in message.items():
+                self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_message(cls, message: Union["MessageRecord", ChatCompletionMessageParam, str]) -> "MessageRecord":
+        """Get a record for a message, which can be a record already, a message dict or a string from the user."""
+        if isinstance(message, MessageRecord):
+            return message
+        if isinstance(message, str):
+            return cls(human(message))
+        return cls(message)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+
+        try:
+            return self.extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any):
+        if key in FIELDS:
+            if key in INTERNED and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+            return
+
+        try:
+            extra = self.extra
+        except AttributeError:
+            extra = self.extra = {}
+        extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+
+        try:
+            del self.extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        for key in FIELDS:
+            if hasattr(self, key):
+                yield key
+        yield from getattr(self, "extra", ())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key: object) -> bool:
+        if key in FIELDS:
+            return hasattr(self, key)  # type: ignore
+        return key in getattr(self, "extra", ())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a field, or `default` when it isn't set."""
+        if key in FIELDS:
+            return getattr(self, key, default)
+        return getattr(self, "extra", {}).get(key, default)
+
+    def to_dict(self) -> ChatCompletionMessageParam:
+        """Convert to a plain message dict, as sent to the API."""
+        message: Dict[str, Any] = {}
+        for key in FIELDS:
+            value = getattr(self, key, self)
+            if value is not self:
+                message[key] = value
+        message.update(getattr(self, "extra", ()))
+        return message  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"MessageRecord({self.to_dict()!r})"
+
+
+class MessageHistory(MutableSequence):
+    """A conversation's messages, stored as `MessageRecord`s.
+
+    Works like a list of message dicts. Anything added is converted to a record, and strings are
+    taken as messages from the user.
+    """
+
+    __slots__ = ("_records",)
+
+    def __init__(self, messages: Iterable[Union[MessageRecord, ChatCompletionMessageParam, str]] = ()):
+        """Create a history holding `messages`."""
+        self._records: List[MessageRecord] = [MessageRecord.from_message(message) for message in messages]
+
+    @overload
+    def __getitem__(self, index: int) -> MessageRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[MessageRecord]: ...
+
+    def __getitem__(self, index):
+        return self._records[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._records[index] = [MessageRecord.from_message(message) for message in value]
+        else:
+            self._records[index] = MessageRecord.from_message(value)
+
+    def __delitem__(self, index):
+        del self._records[index]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[MessageRecord]:
+        return iter(self._records)
+
+    def insert(self, index: int, value: Union[MessageRecord, ChatCompletionMessageParam, str]):
+        """Insert a message before `index`."""
+        self._records.insert(index, MessageRecord.from_message(value))
+
+    def append(self, value: Union[MessageRecord, ChatCompletionMessageParam, str]):
+        """Add a message to the end."""
+        self._records.append(MessageRecord.from_message(value))
+
+    def extend(self, values: Iterable[Union[MessageRecord, ChatCompletionMessageParam, str]]):
+        """Add messages to the end."""
+        self._records.extend(MessageRecord.from_message(value) for value in values)
+
+    def clear(self):
+        """Remove every message."""
+        self._records.clear()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, MessageHistory):
+            return self._records == other._records
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self._records, other))
+        return NotImplemented
+
+    def __add__(self, other: Iterable[Union[MessageRecord, ChatCompletionMessageParam, str]]) -> List[Any]:
+        if isinstance(other, str) or not isinstance(other, Iterable):
+            return NotImplemented
+        return self.to_dicts() + [_plain(message) for message in other]
+
+    def __radd__(self, other: Iterable[Union[MessageRecord, ChatCompletionMessageParam, str]]) -> List[Any]:
+        if isinstance(other, str) or not isinstance(other, Iterable):
+            return NotImplemented
+        return [_plain(message) for message in other] + self.to_dicts()
+
+    def view(self, pending: Sequence[MessageRecord] = ()) -> "HistoryView":
+        """Get the history as it stands, followed by `pending` messages, without copying it."""
+        return HistoryView(self._records, len(self._records), pending)
+
+    def to_dicts(self) -> List[ChatCompletionMessageParam]:
+        """Convert every message to a plain message dict."""
+        return [record.to_dict() for record in self._records]
+
+    def to_json(self, **kwargs: Any) -> str:
+        """Serialize the messages as a JSON array. Keyword arguments are passed to `json.dumps`."""
+        return json.dumps(self.to_dicts(), **kwargs)
+
+    def __repr__(self) -> str:
+        return f"MessageHistory({self.to_dicts()!r})"
+
+
+def _plain(message: Any) -> Any:
+    """Convert a record to a plain dict, leaving anything else as it is."""
+    return message.to_dict() if isinstance(message, MessageRecord) else message
+
+
+class HistoryView(Sequence):
+    """A read-only view of the history at a point in time, plus messages not yet added to it.
+
+    Messages appended to the history after the view was taken aren't part of the view.
+    """
+
+    __slots__ = ("_records", "_stop", "_pending")
+
+    def __init__(self, records: List[MessageRecord], stop: int, pending: Sequence[MessageRecord] = ()):
+        """Create a view of the first `stop` records followed by `pending`."""
+        self._records = records
+        self._stop = stop
+        self._pending = pending
+
+    def __len__(self) -> int:
+        return self._stop + len(self._pending)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            split = self._stop
+            return self._records[start : min(stop, split)] + list(
+                self._pending[max(start - split, 0) : max(stop - split, 0)]
+            )
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("message index out of range")
+        if index < self._stop:
+            return self._records[index]
+        return self._pending[index - self._stop]
+
+    def __iter__(self) -> Iterator[MessageRecord]:
+        records = self._records
+        for index in range(self._stop):
+            yield records[index]
+        yield from self._pending
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def to_dicts(self) -> List[ChatCompletionMessageParam]:
+        """Convert every message to a plain message dict."""
+        return [record.to_dict() for record in self]
@@ -0,0 +1,205 @@
+"""Timing for each turn of conversation, to find where slow turns spend their time.
+
+Every turn records how long it took to build each request, how long the model took to send its
+first token, how fast it streamed, how long each tool ran, how much time went to handling the
+streamed chunks, and how much of that was spent displaying them in views. The metrics are
+attached to the `TurnResult`, added to the chat's running `stats`, and passed to any observers.
+
+Example:
+    >>> from chatlab import Chat
+
+    >>> chat = Chat(observers=[lambda metrics: print(metrics.summary())])
+    >>> await chat("Tell me a joke")
+    1 request, first token 0.41s, 38.2 tokens/s, tools 0.00s, handling 0.01s, display 0.01s, total 1.35s
+
+    >>> chat.stats.mean_time_to_first_token
+    0.41
+
+"""
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+# Updated on every chunk of a stream, so it's a plain slotted class rather than a pydantic model
+@dataclass(slots=True)
+class RequestMetrics:
+    """Timing for a single request to the model."""
+
+    build_seconds: float = 0.0
+    """Time spent preparing the request, like fitting the context window and hashing for the response cache."""
+
+    wait_seconds: float = 0.0
+    """Time spent waiting on the rate limiter before sending the request."""
+
+    time_to_first_token: Optional[float] = None
+    """Seconds from sending the request to the first content or tool call arriving."""
+
+    stream_seconds: float = 0.0
+    """Seconds from sending the request to the end of the response."""
+
+    handling_seconds: float = 0.0
+    """Time spent handling the response's chunks: parsing them, updating the history and store, and displaying them."""
+
+    display_seconds: float = 0.0
+    """The part of `handling_seconds` spent in views and the view sink, displaying the response as it streams."""
+
+    chunks: int = 0
+    """Chunks of content, tool call or function call arguments received."""
+
+    completion_tokens: Optional[int] = None
+    """Completion tokens for the response, when reported by the API."""
+
+    cached: bool = False
+    """Whether the response was replayed from the response cache."""
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Output speed after the first token. Uses chunks as tokens when the API doesn't report usage."""
+        if self.time_to_first_token is None:
+            return None
+
+        generating = self.stream_seconds - self.time_to_first_token
+        if generating <= 0:
+            return None
+
+        tokens = self.completion_tokens if self.completion_tokens is not None else self.chunks
+        return tokens / generating
+
+
+class ToolMetrics(BaseModel):
+    """Timing for a single tool or function call."""
+
+    name: str
+    """The name of the function called."""
+
+    seconds: float
+    """How long the call took, including waiting for a concurrency slot."""
+
+    speculative: bool = False
+    """Whether the call was started before the response finished."""
+
+
+class TurnMetrics(BaseModel):
+    """Timing for a whole turn: every request and tool call made for one `Chat.submit`."""
+
+    requests: List[RequestMetrics] = Field(default_factory=list)
+    """Each request made to the model during the turn, in order."""
+
+    tools: List[ToolMetrics] = Field(default_factory=list)
+    """Each tool or function call made during the turn, in the order they finished."""
+
+    retries: int = 0
+    """The number of requests retried after being rate limited."""
+
+    total_seconds: float = 0.0
+    """Seconds from submitting to the end of the turn."""
+
+    @property
+    def request_build_seconds(self) -> float:
+        """Time spent building requests across the turn."""
+        return sum(request.build_seconds for request in self.requests)
+
+    @property
+    def wait_seconds(self) -> float:
+        """Time spent waiting on the rate limiter across the turn."""
+        return sum(request.wait_seconds for request in self.requests)
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds until the first token of the turn's first response arrived."""
+        return self.requests[0].time_to_first_token if self.requests else None
+
+    @property
+    def stream_seconds(self) -> float:
+        """Time spent waiting on the model across the turn."""
+        return sum(request.stream_seconds for request in self.requests)
+
+    @property
+    def tool_seconds(self) -> float:
+        """Time spent in tool calls across the turn. Concurrent calls overlap, so this can exceed the turn's length."""
+        return sum(tool.seconds for tool in self.tools)
+
+    @property
+    def handling_seconds(self) -> float:
+        """Time spent handling response chunks across the turn."""
+        return sum(request.handling_seconds for request in self.requests)
+
+    @property
+    def display_seconds(self) -> float:
+        """Time spent displaying response chunks across the turn."""
+        return sum(request.display_seconds for request in self.requests)
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Output speed across every response in the turn."""
+        rates: List[float] = [rate for request in self.requests if (rate := request.tokens_per_second) is not None]
+        return sum(rates) / len(rates) if rates else None
+
+    def summary(self) -> str:
+        """Summarize the turn on one line."""
+        parts = [f"{len(self.requests)} request{'s' if len(self.requests) != 1 else ''}"]
+        if self.time_to_first_token is not None:
+            parts.append(f"first token {self.time_to_first_token:.2f}s")
+        if self.tokens_per_second is not None:
+            parts.append(f"{self.tokens_per_second:.1f} tokens/s")
+        parts.append(f"tools {self.tool_seconds:.2f}s")
+        parts.append(f"handling {self.handling_seconds:.2f}s")
+        parts.append(f"display {self.display_seconds:.2f}s")
+        if self.retries:
+            parts.append(f"{self.retries} retries")
+        parts.append(f"total {self.total_seconds:.2f}s")
+        return ", ".join(parts)
+
+
+Observer = Callable[[TurnMetrics], None]
+"""Called with the metrics at the end of every turn."""
+
+
+class ChatStats(BaseModel):
+    """Running totals of the metrics for every turn of a chat."""
+
+    turns: int = 0
+    requests: int = 0
+    tool_calls: int = 0
+    retries: int = 0
+
+    total_seconds: float = 0.0
+    request_build_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    stream_seconds: float = 0.0
+    tool_seconds: float = 0.0
+    handling_seconds: float = 0.0
+    display_seconds: float = 0.0
+
+    time_to_first_token_total: float = 0.0
+    time_to_first_token_count: int = 0
+
+    @property
+    def mean_time_to_first_token(self) -> Optional[float]:
+        """The average time to first token across every request that streamed a token."""
+        if not self.time_to_first_token_count:
+            return None
+        return self.time_to_first_token_total / self.time_to_first_token_count
+
+    def record(self, metrics: TurnMetrics):
+        """Add a turn's metrics to the totals."""
+        self.turns += 1
+        self.requests += len(metrics.requests)
+        self.tool_calls += len(metrics.tools)
+        self.retries += metrics.retries
+
+        self.total_seconds += metrics.total_seconds
+        self.request_build_seconds += metrics.request_build_seconds
+        self.wait_seconds += metrics.wait_seconds
+        self.stream_seconds += metrics.stream_seconds
+        self.tool_seconds += metrics.tool_seconds
+        self.handling_seconds += metrics.handling_seconds
+        self.display_seconds += metrics.display_seconds
+
+        for request in metrics.requests:
+            if request.time_to_first_token is not None:
+                self.time_to_first_token_total += request.time_to_first_token
+                self.time_to_first_token_count += 1
@@ -1,6 +1,7 @@
 """Determine which models are available for use in chatlab."""
 
 from enum import Enum
+from typing import Dict, Optional
 
 
 class ChatModel(Enum):
@@ -21,6 +22,34 @@ class ChatModel(Enum):
     GPT_3_5_TURBO_16K_0613 = "gpt-3.5-turbo-16k-0613"
     GPT_3_5_TURBO_0125 = "gpt-3.5-turbo-0125"
 
+    @property
+    def context_window(self) -> int:
+        """The most tokens the model can consider at once, across the prompt and completion."""
+        return CONTEXT_WINDOWS[self.value]
+
+
+# Context window sizes, in tokens
+CONTEXT_WINDOWS: Dict[str, int] = {
+    ChatModel.GPT_4_TURBO_PREVIEW.value: 128_000,
+    ChatModel.GPT_4_0125_PREVIEW.value: 128_000,
+    ChatModel.GPT_4_1106_PREVIEW.value: 128_000,
+    ChatModel.GPT_4_VISION_PREVIEW.value: 128_000,
+    ChatModel.GPT_4.value: 8_192,
+    ChatModel.GPT_4_0613.value: 8_192,
+    ChatModel.GPT_4_32K.value: 32_768,
+    ChatModel.GPT_4_32K_0613.value: 32_768,
+    ChatModel.GPT_3_5_TURBO.value: 16_385,
+    ChatModel.GPT_3_5_TURBO_0613.value: 4_096,
+    ChatModel.GPT_3_5_TURBO_16K.value: 16_385,
+    ChatModel.GPT_3_5_TURBO_16K_0613.value: 16_385,
+    ChatModel.GPT_3_5_TURBO_0125.value: 16_385,
+}
+
+
+def context_window(model: str) -> Optional[int]:
+    """Get the context window for a model by name, if known."""
+    return CONTEXT_WINDOWS.get(model)
+
 
 # Exporting for the convenience of typing e.g. models.GPT_4_0613
 GPT_4 = ChatModel.GPT_4.value
@@ -0,0 +1,373 @@
+"""Incremental parsing of partial JSON, as it streams in from the model.
+
+Tool call arguments arrive a few characters at a time. Re-parsing the whole argument string on
+every chunk makes streaming quadratic in the size of the arguments. `PartialJSONParser` instead
+only looks at each new chunk once, building up the parsed object as it goes.
+
+At any point, `value` holds what has been parsed so far, matching `jiter`'s
+`partial_mode="trailing-strings"`: unfinished strings are included, unfinished keys and literals
+are left out, and unfinished numbers are included once they are valid numbers.
+
+Example:
+    >>> from chatlab.partial_json import PartialJSONParser
+    >>> parser = PartialJSONParser()
+    >>> parser.feed('{"name": "Pika')
+    >>> parser.value
+    {'name': 'Pika'}
+    >>> parser.feed('chu", "level": 12}')
+    >>> parser.value, parser.complete
+    ({'name': 'Pikachu', 'level': 12}, True)
+
+"""
+
+import json
+import re
+from typing import Any, List, Optional
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+_LITERAL_CHARS = frozenset("truefalsn")
+_LITERALS = {"true": True, "false": False, "null": None}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_WHITESPACE = " \t\n\r"
+
+# What the parser expects next
+_VALUE = 0
+_STRING = 1
+_NUMBER = 2
+_LITERAL = 3
+_AFTER_VALUE = 4
+_KEY = 5
+_COLON = 6
+_DONE = 7
+
+
+class PartialJSONError(ValueError):
+    """Raised when the JSON being fed in can't be valid."""
+
+    pass
+
+
+class _Frame:
+    """An object or array that is still being parsed."""
+
+    __slots__ = ("container", "key", "provisional")
+
+    def __init__(self, container):
+        self.container = container
+        # The key that the next value in an object belongs to
+        self.key: Optional[str] = None
+        # Whether the last element of an array is a placeholder for an unfinished value
+        self.provisional = False
+
+
+class PartialJSONParser:
+    """Parses JSON incrementally, one chunk at a time."""
+
+    def __init__(self):
+        """Create a parser waiting for its first chunk."""
+        self.__stack: List[_Frame] = []
+        self.__state = _VALUE
+        self.__root: Any = None
+
+        # Text of the token currently being read (strings, numbers and literals)
+        self.__pieces: List[str] = []
+        self.__string_is_key = False
+        # Escape sequences can be split across chunks
+        self.__escape = ""
+        # Characters outside the basic plane are escaped as surrogate pairs, which have to be recombined
+        self.__surrogates = False
+
+        self.error: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        """Whether a whole JSON value has been parsed."""
+        return self.__state == _DONE
+
+    @property
+    def value(self) -> Any:
+        """The value parsed so far. Objects and arrays are updated in place as more chunks are fed."""
+        if self.__state == _STRING and not self.__string_is_key:
+            self.__place_partial(self.__string_text(partial=True))
+        elif self.__state == _NUMBER:
+            number = self.__parse_number("".join(self.__pieces))
+            if number is not None:
+                self.__place_partial(number)
+            else:
+                # e.g. "1.5e" isn't a number yet
+                self.__remove_partial()
+        elif self.__state == _LITERAL:
+            literal = "".join(self.__pieces)
+            if literal in _LITERALS:
+                self.__place_partial(_LITERALS[literal])
+
+        return self.__root
+
+    def feed(self, chunk: str):
+        """Parse the next chunk of JSON."""
+        if self.error is not None:
+            raise PartialJSONError(self.error)
+
+        try:
+            self.__feed(chunk)
+        except PartialJSONError as e:
+            self.error = str(e)
+            raise
+
+    def __feed(self, chunk: str):
+        i = 0
+        n = len(chunk)
+
+        while i < n:
+            state = self.__state
+
+            if state == _STRING:
+                i = self.__read_string(chunk, i)
+                continue
+
+            char = chunk[i]
+
+            if state == _NUMBER:
+                if char in _NUMBER_CHARS:
+                    self.__pieces.append(char)
+                    i += 1
+                    continue
+                number = self.__parse_number("".join(self.__pieces))
+                if number is None:
+                    raise PartialJSONError(f"Invalid number {''.join(self.__pieces)!r}")
+                self.__pieces = []
+                self.__add_value(number)
+                # Reprocess the delimiter
+                continue
+
+            if state == _LITERAL:
+                if char in _LITERAL_CHARS:
+                    self.__pieces.append(char)
+                    i += 1
+                    continue
+                literal = "".join(self.__pieces)
+                if literal not in _LITERALS:
+                    raise PartialJSONError(f"Invalid literal {literal!r}")
+                self.__pieces = []
+                self.__add_value(_LITERALS[literal])
+                continue
+
+            if char in _WHITESPACE:
+                i += 1
+                continue
+
+            if state == _VALUE:
+                if char == '"':
+                    self.__state = _STRING
+                    self.__string_is_key = False
+                    self.__pieces = []
+                elif char == "{":
+                    self.__open({})
+                    self.__state = _KEY
+                elif char == "[":
+                    self.__open([])
+                    self.__state = _VALUE
+                elif char == "]" and self.__stack and isinstance(self.__stack[-1].container, list):
+                    # An empty array (or a trailing comma, which we tolerate)
+                    self.__close()
+                elif char in _NUMBER_CHARS:
+                    self.__state = _NUMBER
+                    self.__pieces = [char]
+                elif char in _LITERAL_CHARS:
+                    self.__state = _LITERAL
+                    self.__pieces = [char]
+                else:
+                    raise PartialJSONError(f"Unexpected {char!r} when expecting a value")
+            elif state == _KEY:
+                if char == '"':
+                    self.__state = _STRING
+                    self.__string_is_key = True
+                    self.__pieces = []
+                elif char == "}":
+                    self.__close()
+                else:
+                    raise PartialJSONError(f"Unexpected {char!r} when expecting a key")
+            elif state == _COLON:
+                if char != ":":
+                    raise PartialJSONError(f"Unexpected {char!r} when expecting ':'")
+                self.__state = _VALUE
+            elif state == _AFTER_VALUE:
+                frame = self.__stack[-1]
+                if char == ",":
+                    self.__state = _KEY if isinstance(frame.container, dict) else _VALUE
+                elif char == "}" and isinstance(frame.container, dict):
+                    self.__close()
+                elif char == "]" and isinstance(frame.container, list):
+                    self.__close()
+                else:
+                    raise PartialJSONError(f"Unexpected {char!r} after a value")
+            elif state == _DONE:
+                raise PartialJSONError(f"Unexpected {char!r} after the end of the JSON value")
+
+            i += 1
+
+    def __read_string(self, chunk: str, i: int) -> int:
+        """Read string content from `chunk` starting at `i`, returning where reading stopped."""
+        n = len(chunk)
+
+        if self.__escape:
+            # Finish an escape sequence that started in a previous chunk
+            while i < n and not self.__escape_complete():
+                self.__escape += chunk[i]
+                i += 1
+            if not self.__escape_complete():
+                return i
+            self.__pieces.append(self.__decode_escape())
+            self.__escape = ""
+
+        while i < n:
+            match = _STRING_SPECIAL.search(chunk, i)
+            if match is None:
+                self.__pieces.append(chunk[i:])
+                return n
+
+            j = match.start()
+            if j > i:
+                self.__pieces.append(chunk[i:j])
+
+            if chunk[j] == '"':
+                self.__finish_string()
+                return j + 1
+
+            # Backslash escape
+            self.__escape = "\\"
+            i = j + 1
+            while i < n and not self.__escape_complete():
+                self.__escape += chunk[i]
+                i += 1
+            if not self.__escape_complete():
+                return i
+            self.__pieces.append(self.__decode_escape())
+            self.__escape = ""
+
+        return i
+
+    def __escape_complete(self) -> bool:
+        escape = self.__escape
+        if len(escape) < 2:
+            return False
+        if escape[1] == "u":
+            return len(escape) == 6
+        return True
+
+    def __decode_escape(self) -> str:
+        escape = self.__escape
+        if escape[1] == "u":
+            try:
+                code = int(escape[2:], 16)
+            except ValueError:
+                raise PartialJSONError(f"Invalid unicode escape {escape!r}")
+            if 0xD800 <= code <= 0xDFFF:
+                self.__surrogates = True
+            return chr(code)
+        if escape[1] not in _ESCAPES:
+            raise PartialJSONError(f"Invalid escape {escape!r}")
+        return _ESCAPES[escape[1]]
+
+    def __string_text(self, partial: bool = False) -> str:
+        text = "".join(self.__pieces)
+        # Keep the pieces collapsed so the next snapshot only has to copy, not walk every chunk
+        self.__pieces = [text]
+        if not self.__surrogates:
+            return text
+
+        if partial and text and 0xD800 <= ord(text[-1]) <= 0xDBFF:
+            # The other half of the pair hasn't arrived yet
+            text = text[:-1]
+        return text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+
+    def __finish_string(self):
+        text = self.__string_text()
+        self.__pieces = []
+        self.__surrogates = False
+
+        if self.__string_is_key:
+            self.__stack[-1].key = text
+            self.__state = _COLON
+        else:
+            self.__add_value(text)
+
+    @staticmethod
+    def __parse_number(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    def __place_partial(self, value: Any):
+        """Put an unfinished value where it will end up, to be replaced once it's finished."""
+        if not self.__stack:
+            self.__root = value
+            return
+
+        frame = self.__stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        elif frame.provisional:
+            frame.container[-1] = value
+        else:
+            frame.container.append(value)
+            frame.provisional = True
+
+    def __remove_partial(self):
+        if not self.__stack:
+            self.__root = None
+            return
+
+        frame = self.__stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container.pop(frame.key, None)
+        elif frame.provisional:
+            frame.container.pop()
+            frame.provisional = False
+
+    def __add_value(self, value: Any):
+        if not self.__stack:
+            self.__root = value
+            self.__state = _DONE
+            return
+
+        frame = self.__stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+            frame.key = None
+        elif frame.provisional:
+            frame.container[-1] = value
+            frame.provisional = False
+        else:
+            frame.container.append(value)
+
+        self.__state = _AFTER_VALUE
+
+    def __open(self, container):
+        # Attach the new container to its parent right away so partial values show up
+        if not self.__stack:
+            self.__root = container
+        else:
+            frame = self.__stack[-1]
+            if isinstance(frame.container, dict):
+                frame.container[frame.key] = container
+            else:
+                frame.container.append(container)
+
+        self.__stack.append(_Frame(container))
+
+    def __close(self):
+        frame = self.__stack.pop()
+        if frame.key is not None and isinstance(frame.container, dict):
+            raise PartialJSONError("Object closed while expecting a value")
+
+        if not self.__stack:
+            self.__state = _DONE
+            return
+
+        parent = self.__stack[-1]
+        if isinstance(parent.container, dict):
+            parent.key = None
+        self.__state = _AFTER_VALUE
@@ -0,0 +1,221 @@
+"""Rate limit governance shared across every Chat in a process.
+
+When many chats run at once, a fixed sleep-and-retry on rate limits makes them all retry in
+lock-step. The `RateLimitGovernor` instead:
+
+    - honors `Retry-After` (and `retry-after-ms`) headers from the API
+    - pauses every chat sharing the governor when `x-ratelimit-remaining-*` hits zero
+    - falls back to exponential backoff with full jitter, capped at `max_attempts`
+    - optionally paces requests and tokens per minute ahead of time with token buckets
+
+Example:
+    >>> from chatlab import Chat
+    >>> from chatlab.ratelimit import RateLimitGovernor
+
+    >>> governor = RateLimitGovernor(requests_per_minute=500, tokens_per_minute=80_000)
+    >>> chats = [Chat(rate_limiter=governor) for _ in range(100)]
+
+"""
+
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import List, Mapping, Optional
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse a duration like "20ms", "1s" or "6m0s" from `x-ratelimit-reset-*` headers into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+def retry_after_from_headers(headers: Mapping[str, str]) -> Optional[float]:
+    """Determine how many seconds the API asked us to wait before retrying, if it said."""
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+        try:
+            return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            pass
+
+    # Only wait for the limits that ran out. Waiting on the token window after running out of
+    # requests (or the other way around) would pause every chat for longer than needed.
+    exhausted: List[float] = []
+    unknown: List[float] = []
+    known: List[float] = []
+    for limit in ("requests", "tokens"):
+        value = headers.get(f"x-ratelimit-reset-{limit}")
+        reset = parse_duration(value) if value is not None else None
+        if reset is None:
+            continue
+        known.append(reset)
+
+        remaining = _parse_remaining(headers.get(f"x-ratelimit-remaining-{limit}"))
+        if remaining is None:
+            unknown.append(reset)
+        elif remaining <= 0:
+            exhausted.append(reset)
+
+    for resets in (exhausted, unknown, known):
+        if resets:
+            return max(resets)
+
+    return None
+
+
+def _parse_remaining(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """A token bucket that refills continuously up to `per_minute` tokens.
+
+    Callers reserve tokens up front and are told how long to wait for them. Reservations are made
+    in order, so waiters are served first come, first served without needing a lock.
+    """
+
+    def __init__(self, per_minute: float):
+        """Create a full bucket."""
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take `amount` tokens from the bucket, returning the seconds to wait until they are available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+
+        return -self.tokens / self.rate
+
+
+class RateLimitGovernor:
+    """Paces requests and decides how long to back off when rate limited.
+
+    Args:
+        requests_per_minute (int): Pace requests to this rate. Unpaced by default.
+
+        tokens_per_minute (int): Pace estimated prompt tokens to this rate. Unpaced by default.
+
+        max_attempts (int): How many times a single request may be attempted before giving up.
+
+        base_delay (float): Seconds for the first backoff when the API doesn't say how long to wait.
+
+        max_delay (float): The longest any single backoff may be.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_attempts: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        """Initialize a RateLimitGovernor."""
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        # Shared by all chats using this governor: nobody sends requests before this time
+        self.paused_until = 0.0
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve capacity for a request, returning the seconds to wait before sending it."""
+        delay = 0.0
+
+        if self.request_bucket is not None:
+            delay = max(delay, self.request_bucket.reserve(1))
+        if self.token_bucket is not None and tokens > 0:
+            delay = max(delay, self.token_bucket.reserve(tokens))
+
+        pause = self.paused_until - time.monotonic()
+        if pause > 0:
+            # Spread out everyone waiting on the same pause so they don't all retry at once
+            delay = max(delay, pause + random.uniform(0, min(pause, self.base_delay)))
+
+        return delay
+
+    def pause(self, seconds: float):
+        """Hold off every request sharing this governor for `seconds`."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Determine how long to wait before retry number `attempt` (starting at 1) after a rate limit error.
+
+        The wait is shared with every other chat using this governor.
+        """
+        delay = None
+
+        response = getattr(error, "response", None)
+        if response is not None:
+            delay = retry_after_from_headers(response.headers)
+
+        if delay is None:
+            # Exponential backoff with full jitter
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+        delay = min(delay, self.max_delay)
+        self.pause(delay)
+
+        return delay
+
+    def observe(self, headers: Mapping[str, str]):
+        """Pause ahead of time when the API reports that the remaining requests or tokens are used up."""
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            reset = headers.get(f"x-ratelimit-reset-{kind}")
+
+            if remaining is None or reset is None:
+                continue
+
+            try:
+                exhausted = int(remaining) <= 0
+            except ValueError:
+                continue
+
+            reset_seconds = parse_duration(reset)
+            if exhausted and reset_seconds is not None:
+                self.pause(reset_seconds)
+
+
+default_governor = RateLimitGovernor()
+"""The process-wide governor used by `Chat` when no `rate_limiter` is provided."""
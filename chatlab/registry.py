@@ -40,10 +40,14 @@ Example usage:
 """
 
 import asyncio
+import functools
+import hashlib
 import inspect
 import json
+from concurrent.futures import Executor
 from typing import (
     Any,
+    Awaitable,
     Callable,
     Dict,
     Iterable,
@@ -60,12 +64,15 @@ from typing import (
 
 from openai.types import FunctionDefinition, FunctionParameters
 from openai.types.chat.completion_create_params import Function, FunctionCall
-from pydantic import BaseModel, Field, create_model
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, create_model
+from typing_extensions import NotRequired, Required, TypedDict as ValidatedDict
 
 from openai.types.chat import ChatCompletionToolParam
 
 from .decorators import ChatlabMetadata
 from .errors import ChatLabError
+from .executors import ExecutorKind, run_sync
+from .shaping import DEFAULT_MAX_OUTPUT_CHARS, OutputAssembler, shape_output
 
 
 class APIManifest(TypedDict, total=False):
@@ -81,6 +88,34 @@ class APIManifest(TypedDict, total=False):
     """
 
 
+class ToolManifest:
+    """The tool and function definitions for a registry, built once and reused for every request.
+
+    Attributes:
+        tools (list): The definitions in the `tools` format. Shared between requests, so don't modify it.
+
+        functions (list): The definitions in the legacy `functions` format.
+
+        json (str): The `tools` serialized as canonical JSON.
+
+        hash (str): A SHA-256 of `json` that stays the same as long as the definitions do.
+    """
+
+    def __init__(self, schemas: Iterable[FunctionDefinition]):
+        """Build the manifest from function definitions."""
+        self.functions: List[Function] = [adapt_function_definition(schema) for schema in schemas]
+        self.tools: List[ChatCompletionToolParam] = [
+            ChatCompletionToolParam(type="function", function=function)  # type: ignore
+            for function in self.functions
+        ]
+        self.json = json.dumps(self.tools, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        self.hash = hashlib.sha256(self.json.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        """Return the number of definitions."""
+        return len(self.tools)
+
+
 class FunctionArgumentError(ChatLabError):
     """Exception raised when a function is called with invalid arguments."""
 
@@ -93,6 +128,16 @@ class UnknownFunctionError(ChatLabError):
     pass
 
 
+class ToolTimeoutError(ChatLabError):
+    """Exception raised when a function takes longer than its timeout."""
+
+    def __init__(self, name: str, timeout: float):
+        """Initialize a ToolTimeoutError for the function `name`."""
+        self.name = name
+        self.timeout = timeout
+        super().__init__(f"{name} timed out after {timeout:g} seconds")
+
+
 # Allowed types for auto-inferred schemas
 ALLOWED_TYPES = [int, str, bool, float, list, dict, List, Dict]
 
@@ -210,6 +255,84 @@ def generate_function_schema(
     return schema
 
 
+class CallPlan:
+    """Everything needed to call a registered function, worked out once at registration.
+
+    The function's parameters are compiled into a single validator, so raw argument JSON is parsed
+    and validated in one pass. Only the arguments the model sent are passed along, leaving the
+    function's own defaults in place for the rest.
+
+    Functions whose parameters can't be passed by keyword fall back to `extract_arguments`.
+    """
+
+    def __init__(self, name: str, function: Callable):
+        """Compile a call plan for a function."""
+        self.name = name
+        self.function = function
+        self.is_coroutine = asyncio.iscoroutinefunction(function)
+        self.is_generator = inspect.isgeneratorfunction(function)
+        self.is_async_generator = inspect.isasyncgenfunction(function)
+        metadata = getattr(function, "chatlab_metadata", ChatlabMetadata())
+        # Where to run it when it's synchronous and how long it may take, if not the registry's defaults
+        self.executor: Optional[ExecutorKind] = metadata.executor
+        self.timeout: Optional[float] = metadata.timeout
+        self.max_output_chars: Optional[int] = metadata.max_output_chars
+        self.parameters: List[str] = []
+
+        if (
+            self.executor == "inline"
+            and self.timeout is not None
+            and not (self.is_coroutine or self.is_async_generator)
+        ):
+            raise ValueError(
+                f"{name} runs inline, where it blocks the event loop and can't be timed out. "
+                "Run it in a thread or drop its timeout."
+            )
+        self.adapter: Optional[TypeAdapter] = None
+
+        try:
+            signature = inspect.signature(function)
+        except (TypeError, ValueError):
+            return
+
+        fields: Dict[str, Any] = {}
+        for param_name, param in signature.parameters.items():
+            if param.kind not in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY):
+                return
+
+            annotation = Any if param.annotation is inspect.Parameter.empty else param.annotation
+            if param.default is inspect.Parameter.empty:
+                fields[param_name] = Required[annotation]  # type: ignore
+            else:
+                fields[param_name] = NotRequired[annotation]  # type: ignore
+            self.parameters.append(param_name)
+
+        try:
+            arguments_type = ValidatedDict(f"{name}_arguments", fields)  # type: ignore
+            arguments_type.__pydantic_config__ = ConfigDict(arbitrary_types_allowed=True)  # type: ignore
+            self.adapter = TypeAdapter(arguments_type)
+        except Exception:
+            # Annotations pydantic can't validate are passed through as before
+            self.adapter = None
+
+    def bind(self, arguments: Optional[str]) -> dict:
+        """Parse and validate the raw JSON arguments into keyword arguments for the function."""
+        if self.adapter is None:
+            return extract_arguments(self.name, self.function, arguments)
+
+        if arguments is None or arguments == "":
+            arguments = "{}"
+
+        try:
+            return self.adapter.validate_json(arguments)
+        except ValidationError as e:
+            if any(error["type"] == "json_invalid" for error in e.errors()):
+                raise FunctionArgumentError(
+                    f"Invalid Function call on {self.name}. Arguments must be a valid JSON object"
+                ) from e
+            raise FunctionArgumentError(f"Invalid arguments for {self.name}: {e}") from e
+
+
 # Declare the type for the python hallucination
 PythonHallucinationFunction = Callable[[str], Any]
 
@@ -261,19 +384,55 @@ class FunctionRegistry:
 
     __functions: dict[str, Callable]
     __schemas: dict[str, FunctionDefinition]
+    __plans: dict[str, CallPlan]
+    __manifest: Optional[ToolManifest]
 
     # Allow passing in a callable that accepts a single string for the python
     # hallucination function. This is useful for testing.
     def __init__(
         self,
         python_hallucination_function: Optional[PythonHallucinationFunction] = None,
+        default_executor: ExecutorKind = "thread",
+        thread_pool: Optional[Executor] = None,
+        process_pool: Optional[Executor] = None,
+        default_timeout: Optional[float] = None,
+        default_max_output_chars: Optional[int] = DEFAULT_MAX_OUTPUT_CHARS,
     ):
-        """Initialize a FunctionRegistry object."""
+        """Initialize a FunctionRegistry object.
+
+        Args:
+            python_hallucination_function (Callable): Called with the raw code when the model calls a `python`
+            function that isn't registered.
+
+            default_executor (str): Where synchronous functions run unless their `ChatlabMetadata` says otherwise.
+            One of "inline" (on the event loop), "thread" (the default) or "process". Tools that need the main
+            thread, like `run_python` with IPython, are marked `@run_in("inline")`.
+
+            thread_pool (Executor): The pool for "thread". Defaults to the event loop's default executor.
+
+            process_pool (Executor): The pool for "process". Defaults to a process pool shared by all registries.
+
+            default_timeout (float): Seconds a function may run unless its `ChatlabMetadata` says otherwise. Functions
+            that run over are cancelled and `ToolTimeoutError` is raised. No timeout by default. Synchronous functions
+            with a timeout run in a thread when the default executor is "inline", since a function blocking the event
+            loop can't be timed out. Functions marked `@run_in("inline")` are never timed out.
+
+            default_max_output_chars (int): The budget for each function's output as sent to the model, unless its
+            `ChatlabMetadata` says otherwise. Larger output is summarized. `None` to send output in full.
+        """
         self.__functions = {}
         self.__schemas = {}
+        self.__plans = {}
+        self.__manifest = None
 
         self.python_hallucination_function = python_hallucination_function
 
+        self.default_executor: ExecutorKind = default_executor
+        self.thread_pool = thread_pool
+        self.process_pool = process_pool
+        self.default_timeout = default_timeout
+        self.default_max_output_chars = default_max_output_chars
+
     def decorator(self, parameter_schema: Optional[Union[Type["BaseModel"], dict]] = None) -> Callable:
         """Create a decorator for registering functions with a schema."""
 
@@ -338,6 +497,8 @@ class FunctionRegistry:
 
         self.__functions[function.__name__] = function
         self.__schemas[function.__name__] = final_schema
+        self.__plans[function.__name__] = CallPlan(function.__name__, function)
+        self.__manifest = None
 
         return final_schema
 
@@ -423,29 +584,36 @@ class FunctionRegistry:
                     stream=True,
                 )
         """
-        function_definitions = [adapt_function_definition(f) for f in self.__schemas.values()]
+        manifest = self.manifest
 
-        if len(function_definitions) == 0:
+        if len(manifest) == 0:
             # When there are no functions, we can't send an empty functions array to OpenAI
             return {}
 
         return {
-            "functions": function_definitions,
+            "functions": manifest.functions,
             "function_call": function_call_option,
         }
 
+    @property
+    def manifest(self) -> ToolManifest:
+        """Get the tool manifest, rebuilding it only after functions have been registered."""
+        if self.__manifest is None:
+            self.__manifest = ToolManifest(self.__schemas.values())
+        return self.__manifest
+
     @property
     def tools(self) -> Iterable[ChatCompletionToolParam]:
-        return [
-            ChatCompletionToolParam(
-                type="function",
-                function=adapt_function_definition(f),  # type: ignore
-            )
-            for f in self.__schemas.values()
-        ]
+        return self.manifest.tools
+
+    async def call(
+        self, name: str, arguments: Optional[str] = None, on_chunk: Optional[Callable[[str], None]] = None
+    ) -> Any:
+        """Call a function by name with the given parameters.
 
-    async def call(self, name: str, arguments: Optional[str] = None) -> Any:
-        """Call a function by name with the given parameters."""
+        Functions can also be sync or async generators. Their chunks are passed to `on_chunk` as they arrive, and the
+        result is all of the output assembled within the function's output budget.
+        """
         if name is None:
             raise UnknownFunctionError("Function name must be provided")
 
@@ -457,25 +625,124 @@ class FunctionRegistry:
 
             # The "hallucinated" python function takes raw plaintext
             # instead of a JSON object. We can just pass it through.
+            metadata = getattr(function, "chatlab_metadata", ChatlabMetadata())
             if asyncio.iscoroutinefunction(function):
-                return await function(arguments)
-            return function(arguments)
+                return await self.__with_timeout(name, function(arguments), metadata.timeout)
+            executor = self.__sync_executor(metadata.executor, metadata.timeout)
+            return await self.__with_timeout(
+                name, self.__run_sync(functools.partial(function, arguments), {}, executor), metadata.timeout
+            )
 
-        possible_function = self.get(name)
+        plan = self.__plans.get(name)
 
-        if possible_function is None:
+        if plan is None:
             raise UnknownFunctionError(f"Function {name} is not registered")
 
-        function = possible_function
+        prepared_arguments = plan.bind(arguments)
+
+        if plan.is_async_generator or plan.is_generator:
+            return await self.__with_timeout(name, self.__stream(plan, prepared_arguments, on_chunk), plan.timeout)
+        if plan.is_coroutine:
+            return await self.__with_timeout(name, plan.function(**prepared_arguments), plan.timeout)
+        executor = self.__sync_executor(plan.executor, plan.timeout)
+        return await self.__with_timeout(
+            name, self.__run_sync(plan.function, prepared_arguments, executor), plan.timeout
+        )
+
+    async def __stream(self, plan: CallPlan, kwargs: dict, on_chunk: Optional[Callable[[str], None]]) -> str:
+        max_output_chars = plan.max_output_chars if plan.max_output_chars is not None else self.default_max_output_chars
+        assembler = OutputAssembler(max_output_chars)
+
+        def receive(chunk: Any):
+            assembler.add(chunk)
+            if on_chunk is not None:
+                on_chunk(assembler.text())
+
+        if plan.is_async_generator:
+            generator = plan.function(**kwargs)
+            try:
+                async for chunk in generator:
+                    receive(chunk)
+            finally:
+                await generator.aclose()
+            return assembler.text()
+
+        executor = self.__sync_executor(plan.executor, plan.timeout)
+        if executor == "process":
+            # Generators can't be sent to another process, so they're stepped through in a thread instead
+            executor = "thread"
+
+        generator = plan.function(**kwargs)
+        done = object()
+        try:
+            while True:
+                chunk = await self.__run_sync(functools.partial(next, generator, done), {}, executor)
+                if chunk is done:
+                    break
+                receive(chunk)
+        finally:
+            try:
+                generator.close()
+            except ValueError:
+                # Still running in a thread after being cancelled. It's closed when collected.
+                pass
 
-        # TODO: Use the model extractor here
-        prepared_arguments = extract_arguments(name, function, arguments)
+        return assembler.text()
 
-        if asyncio.iscoroutinefunction(function):
-            result = await function(**prepared_arguments)
+    async def __with_timeout(self, name: str, call: Awaitable, timeout: Optional[float]) -> Any:
+        if timeout is None:
+            timeout = self.default_timeout
+        if timeout is None:
+            return await call
+
+        # Not `asyncio.wait_for`, so that a TimeoutError raised by the function itself isn't mistaken for ours
+        task = asyncio.ensure_future(call)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+
+        if not done:
+            # Coroutines get to clean up (e.g. kill subprocesses). Threads and processes can't be interrupted, so
+            # their results are dropped when they finish.
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise ToolTimeoutError(name, timeout)
+
+        return task.result()
+
+    def __sync_executor(self, executor: Optional[ExecutorKind], timeout: Optional[float]) -> ExecutorKind:
+        """Work out where a synchronous function runs, given its own executor and timeout."""
+        if executor is not None:
+            return executor
+        if self.default_executor == "inline" and (timeout is not None or self.default_timeout is not None):
+            # A function blocking the event loop can't be timed out, so timed functions run in a thread
+            return "thread"
+        return self.default_executor
+
+    async def __run_sync(self, function: Callable, kwargs: dict, executor: ExecutorKind) -> Any:
+        return await run_sync(
+            function,
+            kwargs,
+            executor=executor,
+            thread_pool=self.thread_pool,
+            process_pool=self.process_pool,
+        )
+
+    def format_output(self, name: str, output: Any) -> str:
+        """Turn a function's output into text for the model, summarizing it when it's over the function's budget."""
+        plan = self.__plans.get(name)
+        if plan is not None:
+            max_output_chars = plan.max_output_chars
         else:
-            result = function(**prepared_arguments)
-        return result
+            function = self.get(name)
+            max_output_chars = getattr(function, "chatlab_metadata", ChatlabMetadata()).max_output_chars
+
+        if max_output_chars is None:
+            max_output_chars = self.default_max_output_chars
+
+        return shape_output(output, max_output_chars)
 
     def __contains__(self, name) -> bool:
         """Check if a function is registered by name."""
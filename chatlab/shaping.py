@@ -0,0 +1,238 @@
+"""Shape tool output to fit a budget before it goes into the conversation.
+
+Tool results are sent back to the model on every following request, so one oversized result
+makes every request after it bigger and slower. Results over the budget are summarized based on
+their type, marking what was left out:
+
+    - text keeps its head and tail
+    - JSON becomes its schema plus a small sample
+    - DataFrames become their shape, column types and first rows
+
+Example:
+    >>> from chatlab.shaping import shape_output
+    >>> print(shape_output("a" * 50 + "b" * 50, max_chars=60))
+    aaaaaaaaaaaaaaa
+    ...[71 characters elided]...
+    bbbbbbbbbbbbbb
+
+"""
+
+import json
+from collections import deque
+from typing import Any, Deque, List, Optional
+
+DEFAULT_MAX_OUTPUT_CHARS = 16_000
+"""The default budget for a single tool result, roughly 4,000 tokens."""
+
+# Items kept from each list in a JSON sample, and characters kept from each string
+SAMPLE_ITEMS = 3
+SAMPLE_STRING_CHARS = 200
+
+
+def elided_marker(count: int, unit: str = "characters") -> str:
+    """Describe what was left out."""
+    return f"...[{count} {unit} elided]..."
+
+
+def shape_text(text: str, max_chars: Optional[int] = DEFAULT_MAX_OUTPUT_CHARS) -> str:
+    """Keep the head and tail of text that's over `max_chars`, noting how much was elided from the middle."""
+    if max_chars is None or len(text) <= max_chars:
+        return text
+
+    # Leave room for the marker, which is at most this long
+    marker_room = len(elided_marker(len(text))) + 2
+    keep = max(max_chars - marker_room, 0)
+    head = text[: (keep + 1) // 2]
+    tail = text[len(text) - keep // 2 :] if keep // 2 else ""
+
+    return f"{head}\n{elided_marker(len(text) - len(head) - len(tail))}\n{tail}"
+
+
+def json_schema_of(value: Any) -> Any:
+    """Describe the structure of a JSON value, merging the shapes of list items."""
+    if isinstance(value, dict):
+        return {key: json_schema_of(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if not value:
+            return []
+        # Describe the first item, noting how many there are
+        return [json_schema_of(value[0]), f"{len(value)} items"]
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    return "string"
+
+
+def json_sample(value: Any, items: int = SAMPLE_ITEMS, string_chars: int = SAMPLE_STRING_CHARS) -> Any:
+    """Take a small sample of a JSON value, keeping the first few items of lists and the start of strings."""
+    if isinstance(value, dict):
+        return {key: json_sample(item, items, string_chars) for key, item in value.items()}
+    if isinstance(value, list):
+        sample = [json_sample(item, items, string_chars) for item in value[:items]]
+        if len(value) > items:
+            sample.append(elided_marker(len(value) - items, "items"))
+        return sample
+    if isinstance(value, str) and len(value) > string_chars:
+        return value[:string_chars] + elided_marker(len(value) - string_chars)
+    return value
+
+
+def shape_json(value: Any, max_chars: Optional[int] = DEFAULT_MAX_OUTPUT_CHARS, indent: Optional[int] = None) -> str:
+    """Serialize a JSON value, falling back to its schema plus a sample when it's over `max_chars`."""
+    text = json.dumps(value, indent=indent, default=str)
+    if max_chars is None or len(text) <= max_chars:
+        return text
+
+    # Shrink the sample until it fits
+    items, string_chars = SAMPLE_ITEMS, SAMPLE_STRING_CHARS
+    while True:
+        summary = json.dumps(
+            {
+                "note": f"Output was {len(text)} characters, over the limit of {max_chars}. "
+                "Showing its schema and a sample.",
+                "schema": json_schema_of(value),
+                "sample": json_sample(value, items, string_chars),
+            },
+            indent=indent,
+            default=str,
+        )
+        if len(summary) <= max_chars or (items <= 1 and string_chars <= 20):
+            return shape_text(summary, max_chars)
+        items, string_chars = max(items - 1, 1), max(string_chars // 2, 20)
+
+
+def is_dataframe(value: Any) -> bool:
+    """Check for a pandas DataFrame without importing pandas."""
+    return type(value).__name__ == "DataFrame" and hasattr(value, "shape") and hasattr(value, "head")
+
+
+def shape_dataframe(df: Any, max_chars: Optional[int] = DEFAULT_MAX_OUTPUT_CHARS) -> str:
+    """Render a DataFrame, falling back to its shape, column types and first rows when it's over `max_chars`."""
+    # pandas already truncates long frames in its repr, so this stays cheap
+    text = repr(df)
+    if max_chars is None or len(text) <= max_chars:
+        return text
+
+    rows, columns = df.shape
+    dtypes = "\n".join(f"  {column}: {dtype}" for column, dtype in df.dtypes.items())
+    header = f"DataFrame with {rows} rows and {columns} columns\nColumns:\n{dtypes}\n"
+
+    # Show as many of the first rows as fit
+    head = 10
+    while True:
+        shown = df.head(head).to_string()
+        summary = f"{header}First {min(head, rows)} rows:\n{shown}\n{elided_marker(max(rows - head, 0), 'rows')}"
+        if len(summary) <= max_chars or head <= 1:
+            return shape_text(summary, max_chars)
+        head //= 2
+
+
+def shape_output(output: Any, max_chars: Optional[int] = DEFAULT_MAX_OUTPUT_CHARS) -> str:
+    """Turn a tool's return value into text for the model, summarizing it when it's over `max_chars`.
+
+    Args:
+        output (Any): What the tool returned.
+
+        max_chars (int): The budget for the result. `None` for no limit.
+    """
+    if isinstance(output, str):
+        text = output
+        if max_chars is not None and len(text) > max_chars and text.lstrip()[:1] in ("{", "["):
+            # Strings of JSON are summarized as JSON
+            try:
+                return shape_json(json.loads(text), max_chars)
+            except ValueError:
+                pass
+        return shape_text(text, max_chars)
+
+    if getattr(output, "_repr_llm_", None) is not None:
+        return shape_text(output._repr_llm_(), max_chars)
+
+    if is_dataframe(output):
+        return shape_dataframe(output, max_chars)
+
+    text = repr(output)
+    if max_chars is not None and len(text) > max_chars and isinstance(output, (dict, list)):
+        try:
+            return shape_json(output, max_chars)
+        except (TypeError, ValueError):
+            pass
+
+    return shape_text(text, max_chars)
+
+
+def chunk_text(chunk: Any) -> str:
+    """Turn a chunk yielded by a streaming tool into text. Anything but a string gets its own line."""
+    if isinstance(chunk, str):
+        return chunk
+    return shape_output(chunk, None) + "\n"
+
+
+class OutputAssembler:
+    """Assembles streamed tool output, keeping only the head and tail when it's over `max_chars`.
+
+    Memory stays bounded by the budget no matter how much is streamed.
+    """
+
+    def __init__(self, max_chars: Optional[int] = DEFAULT_MAX_OUTPUT_CHARS):
+        """Start with no output."""
+        self.max_chars = max_chars
+        self.head: List[str] = []
+        self.head_chars = 0
+        self.tail: Deque[str] = deque()
+        self.tail_chars = 0
+        self.elided_chars = 0
+
+    def add(self, chunk: Any):
+        """Add a chunk of output."""
+        text = chunk_text(chunk)
+
+        if self.max_chars is None:
+            self.head.append(text)
+            return
+
+        # Fill the head first, then keep a rolling tail
+        head_room = (self.max_chars + 1) // 2 - self.head_chars
+        if head_room > 0 and not self.tail:
+            self.head.append(text[:head_room])
+            self.head_chars += len(text[:head_room])
+            text = text[head_room:]
+            if not text:
+                return
+
+        self.tail.append(text)
+        self.tail_chars += len(text)
+
+        tail_budget = self.max_chars // 2
+        while self.tail_chars > tail_budget:
+            overflow = self.tail_chars - tail_budget
+            first = self.tail[0]
+            if len(first) <= overflow:
+                self.tail.popleft()
+                self.tail_chars -= len(first)
+                self.elided_chars += len(first)
+            else:
+                self.tail[0] = first[overflow:]
+                self.tail_chars -= overflow
+                self.elided_chars += overflow
+
+    def text(self) -> str:
+        """Get the output so far, marking what was elided."""
+        head = "".join(self.head)
+        self.head[:] = [head] if head else []
+
+        tail = "".join(self.tail)
+
+        if not self.elided_chars or self.max_chars is None:
+            return head + tail
+
+        # Trim the head and tail to leave room for one marker, which is at most this long
+        total = len(head) + self.elided_chars + len(tail)
+        keep = max(self.max_chars - len(elided_marker(total)) - 2, 0)
+        head = head[: (keep + 1) // 2]
+        tail = tail[len(tail) - keep // 2 :] if keep // 2 else ""
+
+        return f"{head}\n{elided_marker(total - len(head) - len(tail))}\n{tail}"
@@ -0,0 +1,34 @@
+"""Persistent conversation stores.
+
+A store keeps every message of a conversation as it's added, so a `Chat` can pick up where it
+left off after a restart. Stores are append-only: each new message is written on its own, and
+nothing already stored is rewritten. Resuming reads only the end of the conversation that fits in
+the model's context window, however long the conversation has grown.
+
+Example:
+    >>> from chatlab import Chat
+    >>> from chatlab.stores import SQLiteStore
+
+    >>> store = SQLiteStore()
+    >>> chat = Chat(store=store, session_id="birds")
+    >>> await chat("What are you?")
+
+    Later, in a new process:
+
+    >>> chat = Chat(store=SQLiteStore(), session_id="birds")
+    >>> await chat("What did I ask you?")
+
+"""
+
+from .base import ConversationStore, decode_message, encode_message, load_tail
+from .jsonl import JSONLStore
+from .sqlite import SQLiteStore
+
+__all__ = [
+    "ConversationStore",
+    "JSONLStore",
+    "SQLiteStore",
+    "decode_message",
+    "encode_message",
+    "load_tail",
+]
@@ -0,0 +1,155 @@
+"""The interface for conversation stores, and what every backend shares."""
+
+import json
+import os
+import zlib
+from collections.abc import Mapping
+from typing import Any, Iterable, List, Optional, Protocol, Tuple
+
+from openai.types.chat import ChatCompletionMessageParam
+
+from ..cache import _to_json
+from ..context import TokenCounter
+
+# Messages whose JSON is at least this many bytes are compressed
+COMPRESS_MIN_BYTES = 1024
+
+# How a stored message is encoded
+RAW = 0
+ZLIB = 1
+
+# Messages read at a time when walking back from the end of a conversation
+DEFAULT_PAGE_SIZE = 100
+
+
+class ConversationStore(Protocol):
+    """Stores the messages of many conversations, each identified by a session id.
+
+    Stores are append-only: messages are added to the end of a session and never rewritten.
+    """
+
+    def append(self, session_id: str, messages: Iterable[Mapping[str, Any]]) -> None:
+        """Add messages to the end of a session, creating it if needed."""
+        ...
+
+    def count(self, session_id: str) -> int:
+        """Count the messages in a session. Sessions that don't exist have none."""
+        ...
+
+    def load(self, session_id: str, offset: int = 0, limit: Optional[int] = None) -> List[ChatCompletionMessageParam]:
+        """Load up to `limit` messages of a session, starting from the message at `offset`."""
+        ...
+
+    def sessions(self) -> List[str]:
+        """List the ids of every stored session."""
+        ...
+
+    def delete(self, session_id: str) -> None:
+        """Remove a session and all of its messages."""
+        ...
+
+
+def default_store_path(name: str) -> str:
+    """Get the default location for stored conversations, following XDG conventions."""
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(data_home, "chatlab", name)
+
+
+def encode_message(
+    message: Mapping[str, Any], compress_min_bytes: Optional[int] = COMPRESS_MIN_BYTES
+) -> Tuple[int, bytes]:
+    """Serialize a message, compressing it when it's large. Returns the encoding and the bytes."""
+    data = json.dumps(dict(message), separators=(",", ":"), ensure_ascii=False, default=_to_json).encode("utf-8")
+    if compress_min_bytes is not None and len(data) >= compress_min_bytes:
+        compressed = zlib.compress(data)
+        # Some content (like base64 images) doesn't get any smaller
+        if len(compressed) < len(data):
+            return ZLIB, compressed
+    return RAW, data
+
+
+def decode_message(encoding: int, data: bytes) -> ChatCompletionMessageParam:
+    """Deserialize a message stored by `encode_message`."""
+    if encoding == ZLIB:
+        data = zlib.decompress(data)
+    elif encoding != RAW:
+        raise ValueError(f"Unknown message encoding {encoding}")
+    return json.loads(data)
+
+
+def _is_result(message: Mapping[str, Any]) -> bool:
+    return message.get("role") in ("tool", "function")
+
+
+def load_tail(
+    store: ConversationStore,
+    session_id: str,
+    budget: Optional[int] = None,
+    counter: Optional[TokenCounter] = None,
+    max_messages: Optional[int] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> List[ChatCompletionMessageParam]:
+    """Load the end of a session: its leading system messages, plus as many of its last messages as fit.
+
+    Only the pages needed are read, so resuming a long conversation doesn't read all of it.
+
+    Args:
+        store (ConversationStore): Where the session is stored.
+
+        session_id (str): The session to load.
+
+        budget (int): The most tokens of messages to load. No limit by default.
+
+        counter (TokenCounter): Counts tokens against the budget. Required with a `budget`.
+
+        max_messages (int): The most messages to load after the system messages. No limit by default.
+
+        page_size (int): Messages to read at a time.
+    """
+    if budget is not None and counter is None:
+        raise ValueError("A token counter is needed to load within a budget")
+
+    total = store.count(session_id)
+
+    # Leading system messages are always kept
+    system_messages: List[ChatCompletionMessageParam] = []
+    while len(system_messages) < total:
+        page = store.load(session_id, len(system_messages), page_size)
+        leading = 0
+        while leading < len(page) and page[leading].get("role") == "system":
+            leading += 1
+        system_messages.extend(page[:leading])
+        if leading < len(page):
+            break
+
+    tokens = sum(counter.count_message(message) for message in system_messages) if counter is not None else 0
+
+    # Walk back from the end a page at a time until the budget is spent
+    tail: List[ChatCompletionMessageParam] = []
+    end = total
+    full = False
+    while end > len(system_messages) and not full:
+        start = max(len(system_messages), end - page_size)
+        page = store.load(session_id, start, end - start)
+        end = start
+
+        for message in reversed(page):
+            if max_messages is not None and len(tail) >= max_messages:
+                full = True
+                break
+            if budget is not None and counter is not None:
+                cost = counter.count_message(message)
+                # The most recent message is always kept
+                if tail and tokens + cost > budget:
+                    full = True
+                    break
+                tokens += cost
+            tail.append(message)
+
+    tail.reverse()
+
+    # Results without their call can't be sent
+    while len(tail) > 1 and _is_result(tail[0]):
+        tail.pop(0)
+
+    return system_messages + tail
@@ -0,0 +1,158 @@
+"""Conversations stored as JSON Lines files, one per session."""
+
+import base64
+import json
+import os
+import re
+import struct
+import threading
+from collections.abc import Mapping
+from typing import Any, Iterable, List, Optional
+
+from openai.types.chat import ChatCompletionMessageParam
+
+from .base import COMPRESS_MIN_BYTES, ZLIB, decode_message, default_store_path, encode_message
+
+# Session ids become file names, so they're limited to characters that are safe in one
+SESSION_ID = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+# Each index entry is the byte offset of a line, as an unsigned 64-bit integer
+OFFSET = struct.Struct("<Q")
+
+# The key for compressed messages, which are stored as base64 since JSON can't hold bytes
+COMPRESSED_KEY = "$zlib"
+
+
+class JSONLStore:
+    """A conversation store backed by a directory of JSON Lines files.
+
+    Each session is a `<session_id>.jsonl` file holding one message per line, alongside a
+    `<session_id>.idx` file holding the byte offset of each line. Appending writes to the end of
+    both files, and loading a page seeks straight to its first line, so neither depends on how long
+    the conversation is. Large messages are compressed and stored as `{"$zlib": "<base64>"}`.
+
+    Args:
+        directory (str): Where to store the files. Defaults to `~/.local/share/chatlab/conversations`.
+
+        compress_min_bytes (int): Messages at least this large are compressed. `None` never compresses.
+    """
+
+    def __init__(self, directory: Optional[str] = None, compress_min_bytes: Optional[int] = COMPRESS_MIN_BYTES):
+        """Open (or create) the store."""
+        self.directory = directory if directory is not None else default_store_path("conversations")
+        self.compress_min_bytes = compress_min_bytes
+        self.__lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __paths(self, session_id: str):
+        if not SESSION_ID.match(session_id) or session_id.startswith("."):
+            raise ValueError(f"Invalid session id {session_id!r}. Use letters, digits, '_', '-' and '.'.")
+        base = os.path.join(self.directory, session_id)
+        return base + ".jsonl", base + ".idx"
+
+    def __ensure_index(self, data_path: str, index_path: str):
+        """Rebuild a missing index, such as for a conversation file written by hand."""
+        if os.path.exists(index_path) or not os.path.exists(data_path):
+            return
+
+        offsets = bytearray()
+        position = 0
+        with open(data_path, "rb") as data:
+            for line in data:
+                if line.strip():
+                    offsets += OFFSET.pack(position)
+                position += len(line)
+        with open(index_path, "wb") as index:
+            index.write(offsets)
+
+    def append(self, session_id: str, messages: Iterable[Mapping[str, Any]]):
+        """Add messages to the end of a session, creating it if needed."""
+        lines = []
+        for message in messages:
+            encoding, data = encode_message(message, self.compress_min_bytes)
+            if encoding == ZLIB:
+                data = json.dumps({COMPRESSED_KEY: base64.b64encode(data).decode("ascii")}).encode("ascii")
+            lines.append(data + b"\n")
+        if not lines:
+            return
+
+        data_path, index_path = self.__paths(session_id)
+        with self.__lock:
+            self.__ensure_index(data_path, index_path)
+            offsets = bytearray()
+            with open(data_path, "ab") as handle:
+                position = handle.tell()
+                for line in lines:
+                    offsets += OFFSET.pack(position)
+                    position += len(line)
+                handle.write(b"".join(lines))
+            # Lines are written before they're indexed, so an interrupted append leaves them unindexed
+            # rather than indexing lines that were never written
+            with open(index_path, "ab") as index:
+                index.write(offsets)
+
+    def count(self, session_id: str) -> int:
+        """Count the messages in a session."""
+        data_path, index_path = self.__paths(session_id)
+        with self.__lock:
+            self.__ensure_index(data_path, index_path)
+            try:
+                return os.path.getsize(index_path) // OFFSET.size
+            except FileNotFoundError:
+                return 0
+
+    def load(self, session_id: str, offset: int = 0, limit: Optional[int] = None) -> List[ChatCompletionMessageParam]:
+        """Load up to `limit` messages of a session, starting from the message at `offset`."""
+        data_path, index_path = self.__paths(session_id)
+        with self.__lock:
+            self.__ensure_index(data_path, index_path)
+            try:
+                with open(index_path, "rb") as index:
+                    index.seek(offset * OFFSET.size)
+                    # Read one offset past the page, to know where its last line ends
+                    entries = index.read(None if limit is None else (limit + 1) * OFFSET.size)
+            except FileNotFoundError:
+                return []
+
+            count = len(entries) // OFFSET.size
+            if count == 0:
+                return []
+            offsets = [OFFSET.unpack_from(entries, i * OFFSET.size)[0] for i in range(count)]
+            if limit is not None and count > limit:
+                end: Optional[int] = offsets.pop()
+            else:
+                end = None
+
+            with open(data_path, "rb") as data:
+                data.seek(offsets[0])
+                chunk = data.read(None if end is None else end - offsets[0])
+
+        start = offsets[0]
+        messages = []
+        for position in offsets:
+            # Each line ends at its newline. Anything after that, such as lines left unindexed by an
+            # interrupted append, is skipped.
+            begin = position - start
+            newline = chunk.find(b"\n", begin)
+            messages.append(self.__decode(chunk[begin : newline if newline != -1 else len(chunk)]))
+        return messages
+
+    @staticmethod
+    def __decode(line: bytes) -> ChatCompletionMessageParam:
+        message = json.loads(line)
+        if isinstance(message, dict) and len(message) == 1 and COMPRESSED_KEY in message:
+            return decode_message(ZLIB, base64.b64decode(message[COMPRESSED_KEY]))
+        return message
+
+    def sessions(self) -> List[str]:
+        """List the ids of every stored session."""
+        return sorted(name[: -len(".jsonl")] for name in os.listdir(self.directory) if name.endswith(".jsonl"))
+
+    def delete(self, session_id: str):
+        """Remove a session and all of its messages."""
+        with self.__lock:
+            for path in self.__paths(session_id):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
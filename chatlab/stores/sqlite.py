@@ -0,0 +1,97 @@
+"""Conversations stored in a local SQLite database."""
+
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Iterable, List, Optional
+
+from openai.types.chat import ChatCompletionMessageParam
+
+from .base import COMPRESS_MIN_BYTES, decode_message, default_store_path, encode_message
+
+
+class SQLiteStore:
+    """A conversation store backed by SQLite.
+
+    Each message is a row keyed by its session and position, so appending a message writes just
+    that row and loading a page reads just those rows.
+
+    Args:
+        path (str): Where to store the database. Defaults to `~/.local/share/chatlab/conversations.sqlite3`. Use
+        ":memory:" for a store that only lasts as long as the process.
+
+        compress_min_bytes (int): Messages at least this large are compressed. `None` never compresses.
+    """
+
+    def __init__(self, path: Optional[str] = None, compress_min_bytes: Optional[int] = COMPRESS_MIN_BYTES):
+        """Open (or create) the store."""
+        self.path = path if path is not None else default_store_path("conversations.sqlite3")
+        self.compress_min_bytes = compress_min_bytes
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.__lock, self.__connection:
+            if self.path != ":memory:":
+                # Appends commit often. The write-ahead log keeps each commit cheap.
+                self.__connection.execute("PRAGMA journal_mode=WAL")
+                self.__connection.execute("PRAGMA synchronous=NORMAL")
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "session_id TEXT NOT NULL, position INTEGER NOT NULL, encoding INTEGER NOT NULL, data BLOB NOT NULL, "
+                "created_at REAL NOT NULL, PRIMARY KEY (session_id, position)) WITHOUT ROWID"
+            )
+
+    def __next_position(self, session_id: str) -> int:
+        row = self.__connection.execute(
+            "SELECT MAX(position) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def append(self, session_id: str, messages: Iterable[Mapping[str, Any]]):
+        """Add messages to the end of a session, creating it if needed."""
+        encoded = [encode_message(message, self.compress_min_bytes) for message in messages]
+        if not encoded:
+            return
+
+        now = time.time()
+        with self.__lock, self.__connection:
+            start = self.__next_position(session_id)
+            self.__connection.executemany(
+                "INSERT INTO messages (session_id, position, encoding, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, start + index, encoding, data, now) for index, (encoding, data) in enumerate(encoded)],
+            )
+
+    def count(self, session_id: str) -> int:
+        """Count the messages in a session."""
+        # Positions run from 0 without gaps, so this only has to look at the last row
+        with self.__lock:
+            return self.__next_position(session_id)
+
+    def load(self, session_id: str, offset: int = 0, limit: Optional[int] = None) -> List[ChatCompletionMessageParam]:
+        """Load up to `limit` messages of a session, starting from the message at `offset`."""
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT encoding, data FROM messages WHERE session_id = ? AND position >= ? ORDER BY position LIMIT ?",
+                (session_id, offset, -1 if limit is None else limit),
+            ).fetchall()
+        return [decode_message(encoding, data) for encoding, data in rows]
+
+    def sessions(self) -> List[str]:
+        """List the ids of every stored session."""
+        with self.__lock:
+            rows = self.__connection.execute("SELECT DISTINCT session_id FROM messages ORDER BY session_id").fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, session_id: str):
+        """Remove a session and all of its messages."""
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        """Close the underlying database."""
+        self.__connection.close()
@@ -1,11 +1,12 @@
 """Media types for rich output for LLMs and in-notebook."""
 
-import json
 from typing import Optional
 
 from IPython.display import display
 from IPython.utils.capture import RichOutput
 
+from ..shaping import DEFAULT_MAX_OUTPUT_CHARS, shape_json, shape_text
+
 # Prioritized formats to show to large language models
 formats_for_llm = [
     # Repr LLM is the richest text
@@ -74,8 +75,8 @@ def redisplay_superrich(output: RichOutput):
             data["text/llm+plain"] = f"<Displayed {richest_format}>"
 
 
-def pluck_richest_text(output: RichOutput):
-    """Format an object as rich text."""
+def pluck_richest_text(output: RichOutput, max_chars: Optional[int] = DEFAULT_MAX_OUTPUT_CHARS):
+    """Format an object as rich text, summarizing it when it's over `max_chars`."""
     data = output.data
     metadata = output.metadata
 
@@ -85,10 +86,12 @@ def pluck_richest_text(output: RichOutput):
         d = data.pop(richest_format, None)
         m = metadata.pop(richest_format, None)
 
-        if isinstance(d, dict):
-            d = json.dumps(d, indent=2)
+        # Reduce the size of the data if it's too big for LLMs
+        if isinstance(d, (dict, list)):
+            d = shape_json(d, max_chars, indent=2)
+        elif isinstance(d, str):
+            d = shape_text(d, max_chars)
 
-        # TODO: Reduce the size of the data if it's too big for LLMs.
         return d, m
 
     return None, {}
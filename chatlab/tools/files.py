@@ -11,8 +11,6 @@ You've been warned. Have fun and be safe!
 import asyncio
 import os
 
-import aiofiles
-
 from ..decorators import expose_exception_to_llm
 
 
@@ -71,6 +69,8 @@ async def write_file(file_path: str, content: str, mode: str = "w") -> None:
     Returns:
     - None
     """
+    import aiofiles
+
     async with aiofiles.open(file_path, mode) as file:  # type: ignore
         await file.write(content)
 
@@ -86,6 +86,8 @@ async def read_file(file_path: str, mode: str = "r") -> str:
     Returns:
     - str: The content of the file
     """
+    import aiofiles
+
     async with aiofiles.open(file_path, mode) as file:  # type: ignore
         content = await file.read()
     return content
@@ -17,7 +17,13 @@ async def run_shell_command(command: str):
     - str: the output of the shell command
     """
     process = await asyncio.create_subprocess_shell(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    stdout, stderr = await process.communicate()
+    try:
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        # Don't leave the command running when the call times out or the chat is cancelled
+        if process.returncode is None:
+            process.kill()
+        raise
 
     resp = f"Return Code: {process.returncode}\n"
     resp += f"stdout: ```\n{stdout.decode().strip()}\n```\n"
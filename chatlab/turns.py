@@ -0,0 +1,77 @@
+"""Structured results for a turn of conversation with a Chat.
+
+A turn is everything that happens for one call to `Chat.submit`: the initial request, plus every
+round of tool (or function) calls the model makes before it finishes responding.
+
+Example:
+    >>> from chatlab import Chat
+    >>> chat = Chat(max_tool_rounds=5)
+    >>> turn = await chat("What time is it?")
+    >>> turn.finish_reason, turn.stop_reason, turn.tool_rounds
+    ('stop', 'finished', 1)
+
+"""
+
+from typing import Literal, Optional
+
+from openai.types import CompletionUsage
+from pydantic import BaseModel
+
+from .metrics import TurnMetrics
+
+StopReason = Literal["finished", "max_tool_rounds", "deadline"]
+
+
+class TurnResult(BaseModel):
+    """The outcome of a single turn of conversation."""
+
+    finish_reason: Optional[str] = None
+    """The finish reason reported by the model on the last response."""
+
+    stop_reason: StopReason = "finished"
+    """Why the turn stopped.
+
+    One of "finished" (the model stopped on its own), "max_tool_rounds" (the limit on tool rounds was reached)
+    or "deadline" (the turn ran past its timeout).
+    """
+
+    requests: int = 0
+    """The number of completed requests made to the model during the turn."""
+
+    tool_rounds: int = 0
+    """The number of rounds of tool or function calls run during the turn."""
+
+    tool_calls: int = 0
+    """The total number of tool or function calls run during the turn."""
+
+    speculative_tool_calls: int = 0
+    """The number of tool calls whose results came from starting them before the response finished."""
+
+    retries: int = 0
+    """The number of requests retried after being rate limited."""
+
+    cache_hits: int = 0
+    """The number of responses replayed from the response cache."""
+
+    prompt_tokens: int = 0
+    """Prompt tokens used across the turn, when reported by the API."""
+
+    completion_tokens: int = 0
+    """Completion tokens used across the turn, when reported by the API."""
+
+    metrics: Optional[TurnMetrics] = None
+    """Timing for the turn's requests and tool calls."""
+
+    @property
+    def total_tokens(self) -> int:
+        """All tokens used across the turn, when reported by the API."""
+        return self.prompt_tokens + self.completion_tokens
+
+    def record_usage(self, usage: CompletionUsage):
+        """Add the token usage from a response to the turn."""
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+
+    def _ipython_display_(self):
+        # The chat already displays its messages; a bare `await chat(...)` shouldn't add a repr to the output
+        pass
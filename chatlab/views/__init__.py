@@ -1,6 +1,7 @@
 """Views for ChatLab."""
 
 from .assistant import AssistantMessageView
+from .sinks import NullSink, ViewSink, null_sink
 from .tools import ToolArguments, ToolCalled
 
-__all__ = ["AssistantMessageView", "ToolArguments", "ToolCalled"]
+__all__ = ["AssistantMessageView", "ToolArguments", "ToolCalled", "ViewSink", "NullSink", "null_sink"]
@@ -1,20 +1,87 @@
+import asyncio
+import time
+from typing import Any, List, Optional
+
+from pydantic import Field, PrivateAttr
 from spork import Markdown
 
 from ..messaging import assistant
 
 
+class PendingUpdates:
+    """Deltas received since the display was last updated."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.last_flush = 0.0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
 class AssistantMessageView(Markdown):
     content: str = ""
     finished: bool = False
     has_displayed: bool = False
+    # When set, output goes to the sink instead of the notebook
+    sink: Optional[Any] = Field(default=None, exclude=True)
+    # Most display updates per second while streaming. `None` updates on every delta.
+    max_rate: Optional[float] = Field(default=20.0, exclude=True)
+
+    # Kept out of pydantic's fields so that buffering deltas doesn't trigger display updates
+    _pending: PendingUpdates = PrivateAttr(default_factory=PendingUpdates)
 
     def get_message(self):
+        self.flush()
         return assistant(content=self.content)
 
+    def append(self, content: str):
+        """Add a delta to the message, updating the display at most `max_rate` times a second."""
+        pending = self._pending
+        pending.chunks.append(content)
+
+        if not self.max_rate:
+            self.flush()
+            return
+
+        wait = pending.last_flush + 1 / self.max_rate - time.monotonic()
+        if wait <= 0:
+            self.flush()
+        elif pending.timer is None:
+            # Make sure the last deltas show up even if the stream stalls
+            try:
+                pending.timer = asyncio.get_running_loop().call_later(wait, self.flush)
+            except RuntimeError:
+                pass
+
+    def flush(self):
+        """Update the display with every delta received so far."""
+        pending = self._pending
+
+        if pending.timer is not None:
+            pending.timer.cancel()
+            pending.timer = None
+
+        if not pending.chunks:
+            return
+
+        delta = "".join(pending.chunks)
+        pending.chunks.clear()
+        pending.last_flush = time.monotonic()
+
+        self.content += delta
+
     def display(self):
-        super().display()
+        if self.sink is not None:
+            self.sink.display(self)
+        else:
+            super().display()
         self.has_displayed = True
 
+    def update(self):
+        if self.sink is not None:
+            self.sink.update(self)
+            return
+        super().update()
+
     def display_once(self):
         if not self.has_displayed:
             self.display()
@@ -0,0 +1,36 @@
+"""Sinks decide where views send their output.
+
+By default, views display themselves in the notebook through IPython. A sink replaces that: the
+view hands itself to the sink whenever it would display or update, and the sink does whatever it
+likes with it, such as forwarding `view.content` over a websocket. `NullSink` throws everything
+away for chats running without any frontend.
+"""
+
+from typing import Any, Protocol
+
+
+class ViewSink(Protocol):
+    """Receives views instead of the IPython display."""
+
+    def display(self, view: Any) -> None:
+        """Called when a view is first shown."""
+        ...
+
+    def update(self, view: Any) -> None:
+        """Called each time a view changes."""
+        ...
+
+
+class NullSink:
+    """A sink that discards all output, for running without a frontend."""
+
+    def display(self, view: Any) -> None:
+        """Discard the view."""
+        pass
+
+    def update(self, view: Any) -> None:
+        """Discard the update."""
+        pass
+
+
+null_sink = NullSink()
@@ -1,12 +1,21 @@
-from typing import Callable, Optional
-from pydantic import ValidationError
+from typing import Any, Callable, List, Optional, Type
+from weakref import WeakKeyDictionary
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError, computed_field
 from spork import AutoUpdate
 
+import json
+import time
 import warnings
 
 from ..components.function_details import ChatFunctionComponent
 
-from ..registry import FunctionRegistry, FunctionArgumentError, UnknownFunctionError, extract_model_from_function
+from ..registry import (
+    FunctionRegistry,
+    FunctionArgumentError,
+    ToolTimeoutError,
+    UnknownFunctionError,
+    extract_model_from_function,
+)
 
 from ..messaging import assistant_function_call, function_result, tool_result
 
@@ -15,18 +24,108 @@ from openai.types.chat import ChatCompletionMessageToolCallParam
 from IPython.display import display
 from IPython.core.getipython import get_ipython
 
-from jiter import from_json
+from ..partial_json import PartialJSONError, PartialJSONParser
+
+# Seconds between display updates while a streaming tool is running
+STREAM_UPDATE_INTERVAL = 0.1
+
+# Argument models for custom renderers, built once per renderer and dropped along with it
+_render_models: "WeakKeyDictionary[Callable, Type[BaseModel]]" = WeakKeyDictionary()
+
+
+def render_model(name: str, custom_render: Callable) -> Type[BaseModel]:
+    """Get the pydantic model for a custom renderer's arguments, building it on first use."""
+    try:
+        return _render_models[custom_render]
+    except KeyError:
+        pass
+    except TypeError:
+        # Not weak referenceable, so it can't be cached
+        return extract_model_from_function(name, custom_render)
+
+    model = extract_model_from_function(name, custom_render)
+    _render_models[custom_render] = model
+    return model
+
+
+class ArgumentBuffer:
+    """Tool call arguments as they stream in.
+
+    Chunks are only joined when the full string is needed, and are parsed incrementally once a
+    custom renderer asks for the partial arguments.
+    """
+
+    def __init__(self, arguments: str = ""):
+        self.chunks: List[str] = [arguments] if arguments else []
+        self.parser: Optional[PartialJSONParser] = None
+
+    @property
+    def text(self) -> str:
+        if len(self.chunks) > 1:
+            self.chunks[:] = ["".join(self.chunks)]
+        return self.chunks[0] if self.chunks else ""
+
+    def append(self, chunk: str):
+        self.chunks.append(chunk)
+
+        if self.parser is not None and self.parser.error is None:
+            try:
+                self.parser.feed(chunk)
+            except PartialJSONError:
+                pass
+
+    def parse(self) -> Any:
+        """Get the arguments parsed so far, raising `PartialJSONError` if they can't be valid JSON."""
+        if self.parser is None:
+            self.parser = PartialJSONParser()
+            try:
+                self.parser.feed(self.text)
+            except PartialJSONError:
+                pass
+
+        if self.parser.error is not None:
+            raise PartialJSONError(self.parser.error)
+
+        return self.parser.value
 
 
 class ToolArguments(AutoUpdate):
     id: str
     name: str
-    arguments: str = ""
     verbage: str = "Receiving arguments for"
     finished: bool = False
 
     custom_render: Optional[Callable] = None
 
+    # When set, output goes to the sink instead of the notebook
+    sink: Optional[Any] = Field(default=None, exclude=True)
+
+    # Kept out of pydantic's fields so that appending arguments is cheap and doesn't copy the whole string
+    _arguments: ArgumentBuffer = PrivateAttr(default_factory=ArgumentBuffer)
+
+    def __init__(self, arguments: str = "", **data):
+        super().__init__(**data)
+        if arguments:
+            self._arguments.append(arguments)
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def arguments(self) -> str:
+        return self._arguments.text
+
+    @arguments.setter
+    def arguments(self, arguments: str):
+        self._arguments.chunks[:] = [arguments]
+        self._arguments.parser = None
+
+    def arguments_complete(self) -> bool:
+        """Whether the arguments streamed in so far are a complete JSON value."""
+        try:
+            self._arguments.parse()
+        except PartialJSONError:
+            return False
+        return self._arguments.parser is not None and self._arguments.parser.complete
+
     # TODO: This is only here for legacy function calling
     def get_function_message(self):
         return assistant_function_call(self.name, self.arguments)
@@ -49,6 +148,10 @@ class ToolArguments(AutoUpdate):
         return data
 
     def display(self) -> None:
+        if self.sink is not None:
+            self.sink.display(self)
+            return
+
         raw_format = self.format_as_raw()
 
         if raw_format is None:
@@ -65,6 +168,10 @@ class ToolArguments(AutoUpdate):
         This method is intended to be called after modifications to the object
         to refresh the display in the notebook environment.
         """
+        if self.sink is not None:
+            self.sink.update(self)
+            return
+
         raw_format = self.format_as_raw()
 
         if raw_format is None:
@@ -72,50 +179,62 @@ class ToolArguments(AutoUpdate):
 
         display(raw_format, raw=True, update=True, display_id=self.display_id)
 
-    def render(self):
-        if self.custom_render is not None:
-            try:
-                possible_args = from_json(self.arguments.encode("utf-8"), partial_mode="trailing-strings")
-            except Exception:
-                return None
-            try:
-                Model = extract_model_from_function(self.name, self.custom_render)
-                # model = Model.model_validate(possible_args)
-                model = Model(**possible_args)
+    def render_custom(self):
+        """Render the arguments parsed so far with the custom renderer, or None if they aren't usable yet."""
+        assert self.custom_render is not None
 
-                # Pluck the kwargs out from the crafted model, as we can't pass the pydantic model as the arguments
-                # However any "inner" models should retain their pydantic Model nature
-                kwargs = {k: getattr(model, k) for k in model.__dict__.keys()}
+        try:
+            possible_args = self._arguments.parse()
+        except PartialJSONError:
+            return None
+        if not isinstance(possible_args, dict):
+            return None
 
-            except FunctionArgumentError:
-                return None
-            except ValidationError:
-                return None
+        try:
+            Model = render_model(self.name, self.custom_render)
+            model = Model(**possible_args)
 
-            try:
-                return self.custom_render(**kwargs)
-            except Exception as e:
-                # Exception in userland code
-                # Would be preferable to bubble up, however
-                # it might be due to us passing a not-quite model
-                warnings.warn_explicit(f"Exception in userland code: {e}", UserWarning, "chatlab", 0)
-                raise
+            # Pluck the kwargs out from the crafted model, as we can't pass the pydantic model as the arguments
+            # However any "inner" models should retain their pydantic Model nature
+            kwargs = {k: getattr(model, k) for k in model.__dict__.keys()}
+
+        except FunctionArgumentError:
+            return None
+        except ValidationError:
+            return None
+
+        try:
+            return self.custom_render(**kwargs)
+        except Exception as e:
+            # Exception in userland code
+            # Would be preferable to bubble up, however
+            # it might be due to us passing a not-quite model
+            warnings.warn_explicit(f"Exception in userland code: {e}", UserWarning, "chatlab", 0)
+            raise
+
+    def render(self):
+        if self.custom_render is not None:
+            return self.render_custom()
 
         return ChatFunctionComponent(name=self.name, verbage=self.verbage, input=self.arguments)
 
     def append_arguments(self, arguments: str):
-        self.arguments += arguments
+        self._arguments.append(arguments)
+        self.update()
 
-    def apply_result(self, result: str):
+    def apply_result(self, result: str, verbage: Optional[str] = None):
         """Replaces the existing display with a new one that shows the result of the tool being called."""
         tc = ToolCalled(
             id=self.id,
             name=self.name,
-            arguments=self.arguments,
             result=result,
+            verbage=verbage if verbage is not None else "Called",
             display_id=self.display_id,
             custom_render=self.custom_render,
+            sink=self.sink,
         )
+        # `arguments` is computed from the buffer rather than a field, so it's set once the view exists
+        tc.arguments = self.arguments
         tc.update()
         return tc
 
@@ -126,9 +245,25 @@ class ToolArguments(AutoUpdate):
 
         self.verbage = "Running"
 
+        # Output from streaming tools is shown as it arrives, at a limited rate
+        streaming_view: Optional[ToolCalled] = None
+        last_update = 0.0
+
+        def on_chunk(text: str):
+            nonlocal streaming_view, last_update
+
+            now = time.monotonic()
+            if streaming_view is None:
+                streaming_view = self.apply_result(text, verbage="Streaming")
+            elif now - last_update >= STREAM_UPDATE_INTERVAL:
+                streaming_view.result = text
+            else:
+                return
+            last_update = now
+
         # Execute the function and get the result
         try:
-            output = await function_registry.call(function_name, function_args)
+            output = await function_registry.call(function_name, function_args, on_chunk=on_chunk)
         except FunctionArgumentError as e:
             self.finished = True
             self.verbage = "Errored"
@@ -136,6 +271,21 @@ class ToolArguments(AutoUpdate):
             result = f"Function arguments for {function_name} were invalid: {repr(e)}"
             return self.apply_result(result)
 
+        except ToolTimeoutError as e:
+            self.finished = True
+            self.verbage = "Timed out"
+
+            # Structured so the model can tell a timeout apart from the function's own output and try something else
+            result = json.dumps(
+                {
+                    "error": "timeout",
+                    "function": function_name,
+                    "timeout_seconds": e.timeout,
+                    "message": f"{function_name} did not finish within {e.timeout:g} seconds and was cancelled.",
+                }
+            )
+            return self.apply_result(result, verbage=self.verbage)
+
         except UnknownFunctionError as e:
             self.finished = True
             self.verbage = "No function named"
@@ -160,13 +310,8 @@ class ToolArguments(AutoUpdate):
 
             return self.apply_result(result)
 
-        repr_llm = ""
-        if isinstance(output, str):
-            repr_llm = output
-        elif getattr(output, "_repr_llm_", None) is not None:
-            repr_llm = output._repr_llm_()
-        else:
-            repr_llm = repr(output)
+        # Oversized output is summarized to fit the function's budget
+        repr_llm = function_registry.format_output(function_name, output)
 
         self.finished = True
         self.verbage = "Ran"
@@ -179,7 +324,6 @@ class ToolCalled(ToolArguments):
 
     id: str
     name: str
-    arguments: str = ""
     verbage: str = "Called"
     result: str = ""
     finished: bool = True
@@ -187,33 +331,7 @@ class ToolCalled(ToolArguments):
     def render(self):
         if self.custom_render is not None:
             # We use the same definition as was in the original function
-            try:
-                possible_args = from_json(self.arguments.encode("utf-8"), partial_mode="trailing-strings")
-            except Exception:
-                return None
-
-            try:
-                Model = extract_model_from_function(self.name, self.custom_render)
-                # model = Model.model_validate(possible_args)
-                model = Model(**possible_args)
-
-                # Pluck the kwargs out from the crafted model, as we can't pass the pydantic model as the arguments
-                # However any "inner" models should retain their pydantic Model nature
-                kwargs = {k: getattr(model, k) for k in model.__dict__.keys()}
-
-            except FunctionArgumentError:
-                return None
-            except ValidationError:
-                return None
-
-            try:
-                return self.custom_render(**kwargs)
-            except Exception as e:
-                # Exception in userland code
-                # Would be preferable to bubble up, however
-                # it might be due to us passing a not-quite model
-                warnings.warn_explicit(f"Exception in userland code: {e}", UserWarning, "chatlab", 0)
-                raise
+            return self.render_custom()
 
         return ChatFunctionComponent(name=self.name, verbage=self.verbage, input=self.arguments, output=self.result)
 
@@ -0,0 +1,126 @@
+# flake8: noqa
+"""Microbenchmarks for ChatLab's hot paths.
+
+These run at realistic scales and take a while, so they only run when asked for by path:
+
+    pytest tests/benchmarks
+
+With pytest-benchmark installed, these use its `benchmark` fixture, so its options apply:
+
+    pytest tests/benchmarks --benchmark-autosave
+    pytest tests/benchmarks --benchmark-compare
+
+Without it, a small stand-in fixture times a few rounds of each benchmark and reports them in
+the same format as `python -m chatlab.benchmarks`, which can be saved and compared:
+
+    pytest tests/benchmarks --bench-save before.json
+    pytest tests/benchmarks --bench-baseline before.json
+"""
+
+import importlib.util
+import time
+from pathlib import Path
+
+import pytest
+
+from chatlab.benchmarks.report import BenchmarkReport, BenchmarkResult, compare, comparison_table, regressions
+
+HAS_PYTEST_BENCHMARK = importlib.util.find_spec("pytest_benchmark") is not None
+
+DEFAULT_ROUNDS = 3
+
+HERE = Path(__file__).parent.resolve()
+
+
+def benchmarks_requested(config) -> bool:
+    """Whether the benchmarks, or some of them, were named on the command line."""
+    for arg in config.args:
+        path = Path(arg.split("::")[0]).resolve()
+        if path == HERE or HERE in path.parents:
+            return True
+    return False
+
+
+def pytest_ignore_collect(collection_path, config):
+    if collection_path.parent == HERE and not benchmarks_requested(config):
+        return True
+    return None
+
+
+class FallbackBenchmark:
+    """The parts of pytest-benchmark's `benchmark` fixture these benchmarks use."""
+
+    def __init__(self, name: str, rounds: int = DEFAULT_ROUNDS):
+        self.name = name
+        self.rounds = rounds
+        self.samples = []
+
+    def __call__(self, function, *args, **kwargs):
+        return self.pedantic(function, args, kwargs, rounds=self.rounds, warmup_rounds=1)
+
+    def pedantic(self, target, args=(), kwargs=None, setup=None, rounds=1, iterations=1, warmup_rounds=0):
+        kwargs = kwargs or {}
+
+        for _ in range(warmup_rounds):
+            if setup is not None:
+                args, kwargs = setup() or (args, kwargs)
+            target(*args, **kwargs)
+
+        result = None
+        for _ in range(rounds):
+            if setup is not None:
+                args, kwargs = setup() or (args, kwargs)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                result = target(*args, **kwargs)
+            self.samples.append((time.perf_counter() - started) / iterations)
+        return result
+
+
+if not HAS_PYTEST_BENCHMARK:
+    REPORT = BenchmarkReport()
+
+    def pytest_addoption(parser):
+        group = parser.getgroup("chatlab benchmarks")
+        group.addoption("--bench-save", type=Path, help="Save the microbenchmark report as JSON")
+        group.addoption("--bench-baseline", type=Path, help="A saved microbenchmark report to compare against")
+        group.addoption("--bench-tolerance", type=float, default=0.25, help="Slowdown allowed before failing")
+        group.addoption("--bench-rounds", type=int, default=DEFAULT_ROUNDS, help="Rounds per benchmark")
+
+    @pytest.fixture
+    def benchmark(request):
+        bench = FallbackBenchmark(request.node.name, request.config.getoption("--bench-rounds", DEFAULT_ROUNDS))
+        yield bench
+        if bench.samples:
+            REPORT.results.append(BenchmarkResult(name=bench.name, samples=bench.samples))
+
+    def pytest_sessionfinish(session, exitstatus):
+        config = session.config
+        if not REPORT.results:
+            return
+
+        save = config.getoption("--bench-save", None)
+        if save is not None:
+            save.write_text(REPORT.model_dump_json(indent=2))
+
+        baseline = config.getoption("--bench-baseline", None)
+        if baseline is None:
+            return
+
+        tolerance = config.getoption("--bench-tolerance")
+        comparisons = compare(BenchmarkReport.model_validate_json(baseline.read_text()), REPORT)
+        config._bench_comparison = comparison_table(comparisons, tolerance)
+        if regressions(comparisons, tolerance) and exitstatus == 0:
+            session.exitstatus = 1
+
+    def pytest_terminal_summary(terminalreporter, config):
+        if not REPORT.results:
+            return
+
+        terminalreporter.section("chatlab microbenchmarks")
+        terminalreporter.write_line(REPORT.table())
+
+        comparison = getattr(config, "_bench_comparison", None)
+        if comparison is not None:
+            terminalreporter.write_line("")
+            terminalreporter.write_line(comparison)
@@ -0,0 +1,45 @@
+# flake8: noqa
+from chatlab.cache import request_key
+from chatlab.context import TokenCounter, drop_oldest
+from chatlab.messaging import assistant, system, user
+
+MESSAGES = 10_000
+
+
+def history():
+    messages = [system("You are a helpful assistant.")]
+    for index in range(MESSAGES // 2):
+        messages.append(user(f"Question {index}: what happened on day {index}?"))
+        messages.append(assistant(f"On day {index}, several things happened. " * 4))
+    return messages
+
+
+HISTORY = history()
+
+
+def test_count_tokens_cold(benchmark):
+    tokens = benchmark.pedantic(
+        lambda counter: counter.count(HISTORY), setup=lambda: ((TokenCounter("gpt-4o"),), {}), rounds=3
+    )
+    assert tokens > MESSAGES
+
+
+def test_count_tokens_warm(benchmark):
+    counter = TokenCounter("gpt-4o")
+    counter.count(HISTORY)
+
+    tokens = benchmark(counter.count, HISTORY)
+    assert tokens > MESSAGES
+
+
+def test_drop_oldest(benchmark):
+    counter = TokenCounter("gpt-4o")
+
+    trimmed = benchmark(drop_oldest, HISTORY, 8_000, counter)
+    assert trimmed[0] == HISTORY[0]
+    assert len(trimmed) < MESSAGES
+
+
+def test_request_key(benchmark):
+    key = benchmark(request_key, {"model": "gpt-4o", "messages": HISTORY, "stream": True})
+    assert len(key) == 64
@@ -0,0 +1,106 @@
+# flake8: noqa
+import asyncio
+import json
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from chatlab.registry import FunctionRegistry, extract_arguments, extract_model_from_function, generate_function_schema
+
+TOOLS = 1_000
+ARGUMENT_BYTES = 100_000
+
+
+class Filters(BaseModel):
+    tags: List[str] = []
+    since: Optional[str] = None
+
+
+def search(query: str, filters: Filters, limit: int = 10, exact: bool = False, fields: Optional[List[str]] = None):
+    """Search the documents.
+
+    Args:
+        query: What to search for.
+        filters: Which documents to include.
+        limit: The most results to return.
+        exact: Only match the exact query.
+        fields: Fields to include in each result.
+    """
+    return len(query)
+
+
+def make_tool(index: int):
+    def tool(query: str, limit: int = 10, exact: bool = False) -> str:
+        """Look something up."""
+        return query
+
+    tool.__name__ = tool.__qualname__ = f"tool_{index}"
+    return tool
+
+
+MANY_TOOLS = [make_tool(index) for index in range(TOOLS)]
+
+LARGE_ARGUMENTS = json.dumps(
+    {"query": "q" * ARGUMENT_BYTES, "filters": {"tags": ["a", "b"], "since": "2024-01-01"}, "limit": 5}
+)
+
+
+@pytest.fixture(scope="module")
+def many_tools():
+    registry = FunctionRegistry(default_executor="inline")
+    registry.register_functions(MANY_TOOLS)
+    return registry
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def test_generate_function_schema(benchmark):
+    schema = benchmark(generate_function_schema, search)
+    assert schema.name == "search"
+
+
+def test_extract_model_from_function(benchmark):
+    model = benchmark(extract_model_from_function, "search", search)
+    assert "filters" in model.model_fields
+
+
+def test_extract_arguments_large(benchmark):
+    arguments = benchmark(extract_arguments, "search", search, LARGE_ARGUMENTS)
+    assert len(arguments["query"]) == ARGUMENT_BYTES
+
+
+def test_registry_call_large_arguments(benchmark, loop):
+    registry = FunctionRegistry(default_executor="inline")
+    registry.register(search)
+
+    result = benchmark(lambda: loop.run_until_complete(registry.call("search", LARGE_ARGUMENTS)))
+    assert result == ARGUMENT_BYTES
+
+
+def test_register_many_tools(benchmark):
+    def register():
+        registry = FunctionRegistry()
+        registry.register_functions(MANY_TOOLS)
+        return registry.tools
+
+    # Registering a thousand tools takes seconds, so time it just once
+    tools = benchmark.pedantic(register, rounds=1)
+    assert len(tools) == TOOLS
+
+
+def test_registry_tools_many(benchmark, many_tools):
+    tools = benchmark(lambda: many_tools.tools)
+    assert len(tools) == TOOLS
+
+
+def test_registry_call_many_tools(benchmark, many_tools, loop):
+    arguments = json.dumps({"query": "last"})
+
+    result = benchmark(lambda: loop.run_until_complete(many_tools.call(f"tool_{TOOLS - 1}", arguments)))
+    assert result == "last"
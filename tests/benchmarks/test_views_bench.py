@@ -0,0 +1,44 @@
+# flake8: noqa
+import json
+
+from chatlab.components.function_details import ChatFunctionComponent
+from chatlab.views.sinks import null_sink
+from chatlab.views.tools import ToolArguments
+
+ARGUMENT_BYTES = 100_000
+CHUNK_BYTES = 1_000
+
+LARGE_ARGUMENTS = json.dumps({"name": "big", "body": "x" * ARGUMENT_BYTES, "tags": ["a", "b"]})
+CHUNKS = [LARGE_ARGUMENTS[i : i + CHUNK_BYTES] for i in range(0, len(LARGE_ARGUMENTS), CHUNK_BYTES)]
+
+
+def render_document(name: str, body: str = ""):
+    return f"{name}: {len(body)} characters"
+
+
+def stream_and_render(custom_render=None):
+    view = ToolArguments(id="call_0", name="document", custom_render=custom_render, sink=null_sink)
+    rendered = None
+    for chunk in CHUNKS:
+        view.append_arguments(chunk)
+        rendered = view.render()
+    return rendered
+
+
+def test_render_growing_arguments(benchmark):
+    rendered = benchmark(stream_and_render)
+    assert rendered is not None
+
+
+def test_custom_render_growing_arguments(benchmark):
+    rendered = benchmark(stream_and_render, render_document)
+    assert rendered == f"big: {ARGUMENT_BYTES} characters"
+
+
+def test_chat_function_component_large(benchmark):
+    output = "y" * ARGUMENT_BYTES
+
+    component = benchmark(
+        ChatFunctionComponent, name="document", verbage="Ran", input=LARGE_ARGUMENTS, output=output, finished=True
+    )
+    assert component.to_dict()["tagName"] == "div"
@@ -0,0 +1,54 @@
+# flake8: noqa
+import pytest
+
+from chatlab import run_many, system
+
+from .test_chat import FakeClientPool, content_chunk
+
+
+@pytest.mark.asyncio
+async def test_run_many_yields_every_result(capsys):
+    scripts = [[content_chunk(f"Answer", finish_reason="stop")] for _ in range(5)]
+    pool = FakeClientPool(*scripts)
+
+    results = [
+        result
+        async for result in run_many(
+            [f"Question {i}" for i in range(5)],
+            initial_context=[system("Be brief.")],
+            concurrency=2,
+            api_key="sk-test",
+            client_pool=pool,
+        )
+    ]
+
+    assert sorted(result.index for result in results) == [0, 1, 2, 3, 4]
+    for result in results:
+        assert result.error is None
+        assert result.turn is not None and result.turn.finish_reason == "stop"
+        assert result.latency >= 0
+        assert result.chat.messages[0] == system("Be brief.")
+        assert result.chat.messages[1] == {"role": "user", "content": f"Question {result.index}"}
+
+    # Nothing is displayed for batch runs
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.asyncio
+async def test_run_many_captures_errors():
+    pool = FakeClientPool(ValueError("boom"))
+
+    results = [result async for result in run_many(["Hi"], api_key="sk-test", client_pool=pool)]
+
+    assert len(results) == 1
+    assert isinstance(results[0].error, ValueError)
+    assert results[0].turn is None
+
+
+@pytest.mark.asyncio
+async def test_run_many_captures_errors_creating_chats():
+    results = [result async for result in run_many(["Hi", "Hello"], api_key="sk-test", not_an_option=True)]
+
+    assert len(results) == 2
+    assert all(isinstance(result.error, TypeError) for result in results)
+    assert all(result.chat is None for result in results)
@@ -0,0 +1,130 @@
+# flake8: noqa
+import json
+
+import pytest
+
+from chatlab import Chat, FunctionRegistry
+from chatlab.benchmarks import (
+    BenchmarkReport,
+    BenchmarkResult,
+    ScriptedToolCall,
+    StreamScript,
+    StubServer,
+    SuiteConfig,
+    after_tools,
+    compare,
+    regressions,
+    run_suite,
+)
+from chatlab.clients import ClientPool
+
+
+def double(x: int) -> int:
+    """Double a number."""
+    return x * 2
+
+
+def make_chat(server, pool, **kwargs):
+    registry = FunctionRegistry()
+    registry.register(double)
+    return Chat(
+        base_url=server.url, api_key="stub", client_pool=pool, function_registry=registry, display=False, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_stub_server_streams_content():
+    async with ClientPool(http2=False) as pool:
+        with StubServer(StreamScript(content="Hello from the stub!", chunk_size=3)) as server:
+            chat = make_chat(server, pool)
+            turn = await chat.submit("Hi")
+
+            assert server.requests == 1
+            assert server.last_request["messages"][-1] == {"role": "user", "content": "Hi"}
+
+    assert turn.finish_reason == "stop"
+    assert chat.messages[-1] == {"role": "assistant", "content": "Hello from the stub!"}
+    # One chunk per three characters
+    assert turn.metrics.requests[0].chunks == 7
+
+
+@pytest.mark.asyncio
+async def test_stub_server_non_streaming():
+    async with ClientPool(http2=False) as pool:
+        with StubServer(StreamScript(content="All at once")) as server:
+            chat = make_chat(server, pool)
+            await chat.submit("Hi", stream=False)
+
+    assert chat.messages[-1] == {"role": "assistant", "content": "All at once"}
+
+
+@pytest.mark.asyncio
+async def test_stub_server_tool_calls():
+    calls = StreamScript(tool_calls=[ScriptedToolCall(name="double", arguments='{"x": 21}')] * 2)
+    answer = StreamScript(content="Both are 42")
+
+    async with ClientPool(http2=False) as pool:
+        with StubServer(after_tools(calls, answer)) as server:
+            chat = make_chat(server, pool)
+            turn = await chat.submit("Double 21 twice")
+
+            assert server.requests == 2
+
+    assert turn.tool_calls == 2
+    tool_results = [message for message in chat.messages if message["role"] == "tool"]
+    assert [message["content"] for message in tool_results] == ["42", "42"]
+    assert chat.messages[-1] == {"role": "assistant", "content": "Both are 42"}
+
+
+@pytest.mark.asyncio
+async def test_stub_server_function_call():
+    calls = StreamScript(function_call=ScriptedToolCall(name="double", arguments='{"x": 4}'))
+    answer = StreamScript(content="It's 8")
+
+    async with ClientPool(http2=False) as pool:
+        with StubServer(after_tools(calls, answer)) as server:
+            chat = make_chat(server, pool, legacy_function_calling=True)
+            await chat.submit("Double 4")
+
+    assert chat.messages[-2] == {"role": "function", "name": "double", "content": "8"}
+    assert chat.messages[-1] == {"role": "assistant", "content": "It's 8"}
+
+
+@pytest.mark.asyncio
+async def test_run_suite():
+    config = SuiteConfig(iterations=2, warmup=0, content_chars=40, tool_calls=2, argument_chars=20)
+    report = await run_suite(config, only=["raw_content", "submit_content", "submit_tool_calls"])
+
+    assert [result.name for result in report.results] == ["raw_content", "submit_content", "submit_tool_calls"]
+    submit = report.get("submit_content")
+    assert len(submit.samples) == 2
+    assert submit.units == 10
+    assert report.overhead(submit) is not None
+    # The baseline for tool calls didn't run
+    assert report.overhead(report.get("submit_tool_calls")) is None
+    assert "submit_content" in report.table()
+
+    # Reports survive a round trip through JSON
+    assert BenchmarkReport.model_validate_json(report.model_dump_json()) == report
+
+
+def test_compare_reports():
+    baseline = BenchmarkReport(
+        results=[
+            BenchmarkResult(name="fast", samples=[1.0, 1.0], units=10),
+            BenchmarkResult(name="removed", samples=[1.0]),
+        ]
+    )
+    current = BenchmarkReport(
+        results=[
+            BenchmarkResult(name="fast", samples=[1.5, 1.5], units=10),
+            BenchmarkResult(name="new", samples=[1.0]),
+        ]
+    )
+
+    comparisons = compare(baseline, current)
+
+    assert [comparison.name for comparison in comparisons] == ["fast"]
+    assert comparisons[0].change == pytest.approx(0.5)
+    assert regressions(comparisons, tolerance=0.1) == comparisons
+    assert regressions(comparisons, tolerance=0.6) == []
@@ -0,0 +1,89 @@
+# flake8: noqa
+import time
+
+import pytest
+
+from chatlab import Chat
+from chatlab.cache import ResponseCache, request_key
+
+from .test_chat import FakeClientPool, content_chunk
+
+
+def test_request_key_ignores_key_order():
+    a = {"model": "gpt-test", "messages": [{"role": "user", "content": "Hi"}], "temperature": 0}
+    b = {"temperature": 0, "messages": [{"content": "Hi", "role": "user"}], "model": "gpt-test"}
+
+    assert request_key(a) == request_key(b)
+    assert request_key(a) != request_key({**a, "model": "gpt-other"})
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"), max_entries=2)
+
+    cache.set("a", [{"n": 1}])
+    time.sleep(0.01)
+    cache.set("b", [{"n": 2}])
+    time.sleep(0.01)
+    # Touch "a" so that "b" is the least recently used
+    assert cache.get("a") == [{"n": 1}]
+    time.sleep(0.01)
+    cache.set("c", [{"n": 3}])
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == [{"n": 1}]
+
+
+def test_response_cache_expires_entries():
+    cache = ResponseCache(path=":memory:", ttl=0.01)
+
+    cache.set("a", [{"n": 1}])
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_replays_cached_streams():
+    cache = ResponseCache(path=":memory:")
+
+    pool = FakeClientPool([content_chunk("Hello"), content_chunk(" there", finish_reason="stop")])
+    first = Chat(api_key="sk-test", client_pool=pool, response_cache=cache)
+    await first.submit("Hi")
+
+    # No more scripted responses: the second chat can only be answered by the cache
+    second = Chat(api_key="sk-test", client_pool=pool, response_cache=cache)
+    turn = await second.submit("Hi")
+
+    assert turn.cache_hits == 1
+    assert len(pool.completions.requests) == 1
+    assert second.messages == first.messages
+
+
+@pytest.mark.asyncio
+async def test_chat_cache_is_keyed_by_server():
+    cache = ResponseCache(path=":memory:")
+
+    pool = FakeClientPool([content_chunk("One", finish_reason="stop")], [content_chunk("Two", finish_reason="stop")])
+    first = Chat(api_key="sk-test", client_pool=pool, response_cache=cache, base_url="http://localhost:8000/v1")
+    await first.submit("Hi")
+    # The same request to another server isn't answered from the first server's responses
+    second = Chat(api_key="sk-test", client_pool=pool, response_cache=cache, base_url="http://localhost:9000/v1")
+    turn = await second.submit("Hi")
+
+    assert turn.cache_hits == 0
+    assert len(pool.completions.requests) == 2
+    assert second.messages[-1]["content"] == "Two"
+
+
+@pytest.mark.asyncio
+async def test_chat_skips_cache_when_not_deterministic():
+    cache = ResponseCache(path=":memory:")
+
+    pool = FakeClientPool([content_chunk("One", finish_reason="stop")], [content_chunk("Two", finish_reason="stop")])
+    await Chat(api_key="sk-test", client_pool=pool, response_cache=cache).submit("Hi", temperature=0.7)
+    await Chat(api_key="sk-test", client_pool=pool, response_cache=cache).submit("Hi", temperature=0.7)
+
+    assert len(pool.completions.requests) == 2
+    assert len(cache) == 0
@@ -0,0 +1,388 @@
+# flake8: noqa
+import asyncio
+import json
+import time
+from typing import List
+
+import httpx
+import openai
+import pytest
+from openai.types.chat import ChatCompletionChunk
+
+from chatlab import Chat
+from chatlab.clients import ClientPool
+from chatlab.ratelimit import RateLimitGovernor
+
+
+def content_chunk(content: str, finish_reason=None) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-test",
+            "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": finish_reason}],
+        }
+    )
+
+
+def tool_call_chunk(index: int, id: str, name: str, arguments: str) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-test",
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {
+                        "tool_calls": [
+                            {
+                                "index": index,
+                                "id": id,
+                                "type": "function",
+                                "function": {"name": name, "arguments": arguments},
+                            }
+                        ]
+                    },
+                    "finish_reason": None,
+                }
+            ],
+        }
+    )
+
+
+def finish_chunk(finish_reason: str) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-test",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+        }
+    )
+
+
+class FakeCompletions:
+    """Replays scripted streams, one per request."""
+
+    def __init__(self, scripts: List[List[ChatCompletionChunk]], delay: float = 0):
+        self.scripts = list(scripts)
+        self.requests: List[dict] = []
+        # Seconds to wait before each chunk, like a model generating tokens
+        self.delay = delay
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        chunks = self.scripts.pop(0)
+        if isinstance(chunks, Exception):
+            raise chunks
+
+        async def stream():
+            for chunk in chunks:
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                yield chunk
+
+        return stream()
+
+
+class FakeClient:
+    def __init__(self, completions: FakeCompletions):
+        self.chat = self
+        self.completions = completions
+
+
+class FakeClientPool(ClientPool):
+    def __init__(self, *scripts: List[ChatCompletionChunk]):
+        super().__init__()
+        self.completions = FakeCompletions(list(scripts))
+
+    def get(self, api_key=None, base_url=None):
+        return FakeClient(self.completions)
+
+
+@pytest.mark.asyncio
+async def test_submit_streams_assistant_message():
+    pool = FakeClientPool([content_chunk("Hello"), content_chunk(" there"), finish_chunk("stop")])
+    chat = Chat(api_key="sk-test", client_pool=pool)
+
+    await chat.submit("Hi")
+
+    assert chat.messages == [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hello there"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_submit_runs_parallel_tool_calls_concurrently():
+    pool = FakeClientPool(
+        [
+            tool_call_chunk(0, "call_a", "slow_echo", json.dumps({"text": "a", "delay": 0.2})),
+            tool_call_chunk(1, "call_b", "slow_echo", json.dumps({"text": "b", "delay": 0.1})),
+            finish_chunk("tool_calls"),
+        ],
+        [content_chunk("Done", finish_reason="stop")],
+    )
+    chat = Chat(api_key="sk-test", client_pool=pool)
+
+    @chat.register
+    async def slow_echo(text: str, delay: float):
+        """Echo text back after a delay"""
+        await asyncio.sleep(delay)
+        return text
+
+    start = time.monotonic()
+    await chat.submit("Echo a and b")
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.3
+
+    tool_messages = [m for m in chat.messages if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["call_a", "call_b"]
+    assert [m["content"] for m in tool_messages] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_submit_returns_turn_result():
+    pool = FakeClientPool(
+        [tool_call_chunk(0, "call_a", "add", json.dumps({"x": 1, "y": 2})), finish_chunk("tool_calls")],
+        [content_chunk("3", finish_reason="stop")],
+    )
+    chat = Chat(api_key="sk-test", client_pool=pool)
+
+    @chat.register
+    def add(x: int, y: int):
+        """Add two numbers"""
+        return x + y
+
+    turn = await chat.submit("What is 1 + 2?")
+
+    assert turn.finish_reason == "stop"
+    assert turn.stop_reason == "finished"
+    assert turn.requests == 2
+    assert turn.tool_rounds == 1
+    assert turn.tool_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_submit_stops_at_max_tool_rounds():
+    loop_script = [tool_call_chunk(0, "call_a", "add", json.dumps({"x": 1, "y": 2})), finish_chunk("tool_calls")]
+    pool = FakeClientPool(loop_script, loop_script, loop_script)
+    chat = Chat(api_key="sk-test", client_pool=pool, max_tool_rounds=2)
+
+    @chat.register
+    def add(x: int, y: int):
+        """Add two numbers"""
+        return x + y
+
+    turn = await chat.submit("Keep adding")
+
+    assert turn.stop_reason == "max_tool_rounds"
+    assert turn.requests == 2
+    assert len(pool.completions.requests) == 2
+    # The history ends with the last tool result so the conversation can continue
+    assert chat.messages[-1]["role"] == "tool"
+
+
+@pytest.mark.asyncio
+async def test_submit_retries_rate_limits_with_governor():
+    response = httpx.Response(
+        429, headers={"retry-after-ms": "10"}, request=httpx.Request("POST", "https://api.openai.com/v1")
+    )
+    error = openai.RateLimitError("Rate limited", response=response, body=None)
+
+    pool = FakeClientPool(error, [content_chunk("Hello", finish_reason="stop")])
+    chat = Chat(api_key="sk-test", client_pool=pool, rate_limiter=RateLimitGovernor())
+
+    turn = await chat.submit("Hi")
+
+    assert turn.retries == 1
+    assert turn.requests == 1
+    assert chat.messages == [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+
+
+@pytest.mark.asyncio
+async def test_submit_gives_up_after_max_attempts():
+    response = httpx.Response(
+        429, headers={"retry-after-ms": "1"}, request=httpx.Request("POST", "https://api.openai.com/v1")
+    )
+    error = openai.RateLimitError("Rate limited", response=response, body=None)
+
+    pool = FakeClientPool(error, error)
+    chat = Chat(api_key="sk-test", client_pool=pool, rate_limiter=RateLimitGovernor(max_attempts=2))
+
+    with pytest.raises(openai.RateLimitError):
+        await chat.submit("Hi")
+
+
+@pytest.mark.asyncio
+async def test_submit_records_streamed_usage():
+    usage_chunk = ChatCompletionChunk.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-test",
+            "choices": [],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15},
+        }
+    )
+    pool = FakeClientPool([content_chunk("Hello", finish_reason="stop"), usage_chunk])
+    chat = Chat(api_key="sk-test", client_pool=pool, include_usage=True, display=False)
+
+    turn = await chat.submit("Hi")
+
+    assert pool.completions.requests[0]["stream_options"] == {"include_usage": True}
+    assert turn.prompt_tokens == 12
+    assert turn.completion_tokens == 3
+    assert chat.messages[-1] == {"role": "assistant", "content": "Hello"}
+
+
+@pytest.mark.asyncio
+async def test_speculative_tool_calls_overlap_with_generation():
+    from chatlab.decorators import idempotent
+
+    @idempotent
+    async def lookup(term: str):
+        """Look something up"""
+        await asyncio.sleep(0.2)
+        return f"found {term}"
+
+    async def record(note: str):
+        """Not safe to start early"""
+        return "recorded"
+
+    pool = FakeClientPool(
+        [
+            tool_call_chunk(0, "call_a", "lookup", '{"term": '),
+            tool_call_chunk(0, "call_a", "lookup", '"tea"}'),
+            tool_call_chunk(1, "call_b", "record", '{"note": '),
+            tool_call_chunk(1, "call_b", "record", '"x"'),
+            tool_call_chunk(1, "call_b", "record", "}"),
+            finish_chunk("tool_calls"),
+        ],
+        [content_chunk("Done", finish_reason="stop")],
+    )
+    pool.completions.delay = 0.05
+
+    chat = Chat(
+        api_key="sk-test", client_pool=pool, chat_functions=[lookup, record], speculative_tool_calls=True, display=False
+    )
+
+    start = time.monotonic()
+    turn = await chat.submit("Look up tea")
+    elapsed = time.monotonic() - start
+
+    assert turn.speculative_tool_calls == 1
+    assert turn.tool_calls == 2
+    assert [m["content"] for m in chat.messages if m["role"] == "tool"] == ["found tea", "recorded"]
+    # The lookup ran while the rest of the response streamed in, rather than after it (0.55s)
+    assert elapsed < 0.45
+
+
+@pytest.mark.asyncio
+async def test_speculative_tool_calls_are_opt_in():
+    from chatlab.decorators import idempotent
+
+    calls = []
+
+    @idempotent
+    def lookup(term: str):
+        """Look something up"""
+        calls.append(term)
+        return term
+
+    pool = FakeClientPool(
+        [tool_call_chunk(0, "call_a", "lookup", '{"term": "tea"}'), finish_chunk("tool_calls")],
+        [content_chunk("Done", finish_reason="stop")],
+    )
+    chat = Chat(api_key="sk-test", client_pool=pool, chat_functions=[lookup], display=False)
+
+    turn = await chat.submit("Look up tea")
+
+    assert turn.speculative_tool_calls == 0
+    assert calls == ["tea"]
+
+
+@pytest.mark.asyncio
+async def test_submit_records_metrics():
+    async def lookup(term: str):
+        """Look something up"""
+        await asyncio.sleep(0.05)
+        return term
+
+    pool = FakeClientPool(
+        [tool_call_chunk(0, "call_a", "lookup", '{"term": "tea"}'), finish_chunk("tool_calls")],
+        [content_chunk("Found"), content_chunk(" tea"), finish_chunk("stop")],
+    )
+    pool.completions.delay = 0.01
+    observed = []
+
+    chat = Chat(
+        api_key="sk-test", client_pool=pool, chat_functions=[lookup], display=False, observers=[observed.append]
+    )
+    turn = await chat.submit("Look up tea")
+
+    metrics = turn.metrics
+    assert observed == [metrics]
+    assert len(metrics.requests) == 2
+    assert [tool.name for tool in metrics.tools] == ["lookup"]
+    assert metrics.tools[0].seconds >= 0.05
+    assert metrics.time_to_first_token >= 0.01
+    assert metrics.requests[1].chunks == 2
+    assert metrics.requests[1].stream_seconds >= metrics.requests[1].time_to_first_token
+    assert metrics.total_seconds >= metrics.stream_seconds + metrics.tool_seconds
+
+    assert chat.stats.turns == 1
+    assert chat.stats.requests == 2
+    assert chat.stats.tool_calls == 1
+    assert chat.stats.mean_time_to_first_token is not None
+
+    # Request metrics are updated on every chunk, so they're kept cheap to update, yet still serialize
+    assert not hasattr(metrics.requests[0], "__dict__")
+    assert metrics.model_dump()["requests"][1]["chunks"] == 2
+    assert "handling" in metrics.summary()
+
+
+@pytest.mark.asyncio
+async def test_submit_times_display_separately():
+    class SlowSink:
+        def display(self, view):
+            time.sleep(0.01)
+
+        def update(self, view):
+            time.sleep(0.01)
+
+    pool = FakeClientPool([content_chunk("Hello"), content_chunk(" there"), finish_chunk("stop")])
+    chat = Chat(api_key="sk-test", client_pool=pool, display=SlowSink(), max_display_rate=None)
+
+    metrics = (await chat.submit("Hi")).metrics
+
+    assert metrics.display_seconds >= 0.03
+    assert metrics.handling_seconds >= metrics.display_seconds
+    assert chat.stats.display_seconds == metrics.display_seconds
+    assert "display" in metrics.summary()
+
+
+@pytest.mark.asyncio
+async def test_failing_observers_dont_hide_the_turn(caplog):
+    def broken(metrics):
+        raise ValueError("observer broke")
+
+    observed = []
+    pool = FakeClientPool([content_chunk("Hello"), finish_chunk("stop")], RuntimeError("model broke"))
+    chat = Chat(api_key="sk-test", client_pool=pool, display=False, observers=[broken, observed.append])
+
+    # The turn still finishes, and later observers are still called
+    turn = await chat.submit("Hi")
+    assert observed == [turn.metrics]
+    assert "observer broke" in caplog.text
+
+    # The turn's own exception is the one raised
+    with pytest.raises(RuntimeError, match="model broke"):
+        await chat.submit("Again")
+    assert len(observed) == 2
@@ -0,0 +1,53 @@
+# flake8: noqa
+import asyncio
+
+import pytest
+
+from chatlab.clients import ClientPool
+
+
+@pytest.mark.asyncio
+async def test_client_pool_reuses_clients():
+    async with ClientPool() as pool:
+        client = pool.get(api_key="sk-test", base_url="http://localhost:8000/v1")
+
+        assert pool.get(api_key="sk-test", base_url="http://localhost:8000/v1") is client
+        assert pool.get(api_key="sk-other", base_url="http://localhost:8000/v1") is not client
+        assert len(pool) == 2
+
+    assert len(pool) == 0
+
+
+def test_client_pool_new_event_loop():
+    pool = ClientPool()
+
+    async def get_client():
+        return pool.get(api_key="sk-test")
+
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+
+    # Connections can't be shared across event loops
+    assert first is not second
+    assert len(pool) == 1
+
+
+def test_client_pool_closes_clients_replaced_for_a_new_event_loop():
+    pool = ClientPool()
+
+    async def get_client():
+        return pool.get(api_key="sk-test")
+
+    old_loop = asyncio.new_event_loop()
+    try:
+        first = old_loop.run_until_complete(get_client())
+        second = asyncio.run(get_client())
+
+        assert first is not second
+        assert not first.is_closed()
+
+        # The replaced client is kept until the pool is closed on its loop
+        old_loop.run_until_complete(pool.aclose())
+        assert first.is_closed()
+    finally:
+        old_loop.close()
@@ -0,0 +1,140 @@
+# flake8: noqa
+import pytest
+
+from chatlab import Chat, assistant, human, system, tool_result
+from chatlab.context import (
+    ELIDED_OUTPUT,
+    TokenCounter,
+    drop_oldest,
+    elide_tool_outputs,
+    group_messages,
+    keep_system_and_last,
+)
+from chatlab.models import ChatModel, context_window
+
+from .test_chat import FakeClientPool, content_chunk
+
+
+def tool_call(id: str):
+    return {
+        "role": "assistant",
+        "tool_calls": [{"id": id, "type": "function", "function": {"name": "lookup", "arguments": "{}"}}],
+    }
+
+
+def conversation():
+    return [
+        system("You are a helpful assistant"),
+        human("First question " * 20),
+        assistant("First answer " * 20),
+        tool_call("call_1"),
+        tool_result("call_1", "A very long tool output " * 50, "lookup"),
+        human("Second question"),
+        assistant("Second answer"),
+    ]
+
+
+def test_models_have_context_windows():
+    assert ChatModel.GPT_4.context_window == 8192
+    assert context_window("gpt-4-turbo-preview") == 128_000
+    assert context_window("some-local-model") is None
+
+
+def test_token_counter_caches_per_message():
+    counter = TokenCounter("gpt-test")
+    message = human("Hello there, how are you?")
+
+    first = counter.count_message(message)
+    assert counter.count_message(message) == first
+    assert counter.count([message, message]) == 2 * first + 3
+
+
+def test_token_counter_keeps_counts_when_counting_subsets():
+    counter = TokenCounter("gpt-test")
+    messages = [human(f"Message {i}") for i in range(100)]
+    total = counter.count(messages)
+
+    # Trim policies count small parts of the history
+    counter.count(messages[-2:])
+    counter.prune(messages)
+
+    def recount(text):
+        raise AssertionError("recounted a cached message")
+
+    counter.count_text = recount
+    assert counter.count(messages) == total
+
+
+def test_token_counter_prunes_messages_no_longer_in_the_history():
+    counter = TokenCounter("gpt-test")
+    old = [human(f"Old {i}") for i in range(10)]
+    counter.count(old)
+
+    current = [human("New")]
+    counter.prune(current)
+    counter.count(current)
+
+    counts = []
+    counter.count_text = lambda text: counts.append(text) or 1
+    counter.count(old)
+    assert len(counts) == 20
+
+
+def test_group_messages_keeps_tool_results_with_calls():
+    groups = group_messages(conversation())
+
+    assert [len(group) for group in groups] == [1, 1, 1, 2, 1, 1]
+
+
+def test_drop_oldest_keeps_system_and_pairs():
+    messages = conversation()
+    counter = TokenCounter("gpt-test")
+
+    trimmed = drop_oldest(messages, 60, counter)
+
+    assert trimmed[0] == messages[0]
+    assert trimmed[-1] == messages[-1]
+    assert counter.count(trimmed) <= 60
+    # Never a tool result without its call
+    assert trimmed[1]["role"] != "tool"
+
+
+def test_drop_oldest_noop_when_fits():
+    messages = conversation()
+    assert drop_oldest(messages, 100_000, TokenCounter("gpt-test")) is messages
+
+
+def test_keep_system_and_last():
+    messages = conversation()
+
+    trimmed = keep_system_and_last(2)(messages, 100_000, TokenCounter("gpt-test"))
+
+    assert trimmed == [messages[0], messages[-2], messages[-1]]
+
+
+def test_elide_tool_outputs():
+    messages = conversation()
+    counter = TokenCounter("gpt-test")
+    budget = counter.count(messages) - 100
+
+    trimmed = elide_tool_outputs(keep_last=0)(messages, budget, counter)
+
+    assert len(trimmed) == len(messages)
+    assert trimmed[4]["content"] == ELIDED_OUTPUT
+    # The history itself is left alone
+    assert messages[4]["content"] != ELIDED_OUTPUT
+
+
+@pytest.mark.asyncio
+async def test_chat_trims_requests_but_not_history():
+    pool = FakeClientPool([content_chunk("Third answer", finish_reason="stop")])
+    chat = Chat(*conversation(), api_key="sk-test", client_pool=pool, max_context_tokens=100, reserve_tokens=20)
+
+    await chat.submit("Third question")
+
+    sent = pool.completions.requests[0]["messages"]
+    assert len(sent) < len(conversation()) + 1
+    assert sent[0]["role"] == "system"
+    assert sent[-1] == human("Third question")
+
+    assert len(chat.messages) == len(conversation()) + 2
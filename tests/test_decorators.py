@@ -1,7 +1,7 @@
 # flake8: noqa
 import pytest
 
-from chatlab.decorators import ChatlabMetadata, expose_exception_to_llm
+from chatlab.decorators import ChatlabMetadata, cached_tool, expose_exception_to_llm, run_in
 
 
 class MyException(Exception):
@@ -40,3 +40,168 @@ def test_decorator_raises_exception():
 
     with pytest.raises(Exception):
         expose_exception_to_llm(func)
+
+
+def test_run_in_decorator():
+    def crunch():
+        """Crunch some numbers"""
+        pass
+
+    assert run_in("process")(crunch) is crunch
+    assert crunch.chatlab_metadata.executor == "process"
+    assert crunch.chatlab_metadata.expose_exception_to_llm == True
+
+
+def test_cached_tool_sync():
+    calls = []
+
+    @cached_tool(maxsize=2)
+    def lookup(term: str, limit: int = 10):
+        """Look something up"""
+        calls.append(term)
+        return f"{term}:{limit}"
+
+    assert lookup("a") == "a:10"
+    assert lookup("a", limit=10) == "a:10"
+    assert lookup(term="a") == "a:10"
+    assert calls == ["a"]
+
+    lookup("b")
+    lookup("c")  # evicts "a"
+    lookup("a")
+    assert calls == ["a", "b", "c", "a"]
+
+    lookup.cache_clear()
+    lookup("c")
+    assert calls == ["a", "b", "c", "a", "c"]
+
+
+def test_cached_tool_ttl(monkeypatch):
+    import time
+
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    calls = []
+
+    @cached_tool(ttl=60)
+    def lookup(term: str):
+        """Look something up"""
+        calls.append(term)
+        return term
+
+    lookup("a")
+    now[0] += 59
+    lookup("a")
+    assert calls == ["a"]
+
+    now[0] += 2
+    lookup("a")
+    assert calls == ["a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_cached_tool_async_coalesces_calls():
+    import asyncio
+
+    calls = []
+
+    @cached_tool()
+    async def fetch(url: str):
+        """Fetch a URL"""
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return url.upper()
+
+    results = await asyncio.gather(*(fetch("https://example.com") for _ in range(5)))
+    assert results == ["HTTPS://EXAMPLE.COM"] * 5
+    assert calls == ["https://example.com"]
+
+    assert await fetch("https://example.com") == "HTTPS://EXAMPLE.COM"
+    assert calls == ["https://example.com"]
+
+
+@pytest.mark.asyncio
+async def test_cached_tool_does_not_cache_errors():
+    calls = []
+
+    @cached_tool()
+    async def flaky(n: int):
+        """Fails the first time"""
+        calls.append(n)
+        if len(calls) == 1:
+            raise ValueError("nope")
+        return n
+
+    with pytest.raises(ValueError):
+        await flaky(1)
+    assert await flaky(1) == 1
+    assert len(calls) == 2
+
+
+def test_cached_tool_disk_tier():
+    from chatlab.cache import ResponseCache
+
+    disk_cache = ResponseCache(":memory:")
+    calls = []
+
+    def lookup(term: str):
+        """Look something up"""
+        calls.append(term)
+        return {"term": term}
+
+    first = cached_tool(disk_cache=disk_cache)(lookup)
+    assert first("a") == {"term": "a"}
+
+    # A fresh memory tier (like a new session) still finds the result on disk
+    second = cached_tool(disk_cache=disk_cache)(lookup)
+    assert second("a") == {"term": "a"}
+    assert calls == ["a"]
+
+
+def test_cached_tool_clear_empties_both_tiers():
+    from chatlab.cache import ResponseCache
+
+    disk_cache = ResponseCache(":memory:")
+    disk_cache.set("unrelated", [{"n": 1}])
+    calls = []
+
+    def lookup(term: str):
+        """Look something up"""
+        calls.append(term)
+        return {"term": term}
+
+    cached = cached_tool(disk_cache=disk_cache)(lookup)
+    cached("a")
+    cached.cache_clear()
+    cached("a")
+
+    assert calls == ["a", "a"]
+    # Other entries in a shared disk cache are left alone
+    assert disk_cache.get("unrelated") == [{"n": 1}]
+
+
+def test_cached_tool_rejects_generators():
+    def numbers():
+        """Count up"""
+        yield 1
+
+    async def letters():
+        """Spell out"""
+        yield "a"
+
+    with pytest.raises(TypeError):
+        cached_tool()(numbers)
+    with pytest.raises(TypeError):
+        cached_tool()(letters)
+
+
+def test_cached_tool_keeps_metadata():
+    @cached_tool()
+    @expose_exception_to_llm
+    def lookup(term: str):
+        """Look something up"""
+        return term
+
+    assert lookup.__name__ == "lookup"
+    assert lookup.__doc__ == "Look something up"
+    assert lookup.chatlab_metadata.expose_exception_to_llm
@@ -0,0 +1,166 @@
+# flake8: noqa
+import pickle
+import sys
+
+import pytest
+
+from chatlab import Chat, FunctionRegistry
+from chatlab.benchmarks import ScriptedToolCall, StreamScript, StubServer, after_tools
+from chatlab.cache import request_key
+from chatlab.clients import ClientPool
+from chatlab.history import MessageHistory, MessageRecord
+from chatlab.messaging import assistant, system, user
+
+
+def test_record_acts_like_a_message_dict():
+    message = {"role": "tool", "content": "42", "tool_call_id": "call_1"}
+    record = MessageRecord(message)
+
+    assert record == message
+    assert message == record
+    assert record["content"] == "42"
+    assert record.get("name") is None
+    assert "name" not in record
+    assert "tool_call_id" in record
+    assert len(record) == 3
+    assert dict(record) == message
+    assert {**record, "content": "elided"}["content"] == "elided"
+    assert record.to_dict() == message
+    assert type(record.to_dict()) is dict
+
+    with pytest.raises(KeyError):
+        record["name"]
+
+    record["content"] = "43"
+    del record["tool_call_id"]
+    assert record == {"role": "tool", "content": "43"}
+
+
+def test_record_keeps_unknown_fields():
+    record = MessageRecord({"role": "assistant", "content": None, "refusal": "No"})
+
+    assert record["refusal"] == "No"
+    assert record.to_dict() == {"role": "assistant", "content": None, "refusal": "No"}
+
+
+def test_record_is_compact():
+    record = MessageRecord(assistant("Hello"))
+
+    assert not hasattr(record, "__dict__")
+    assert sys.getsizeof(record) < sys.getsizeof(record.to_dict())
+
+    # Roles built at runtime share one string
+    role = "".join(["assis", "tant"])
+    assert MessageRecord({"role": role, "content": ""})["role"] is record["role"]
+
+
+def test_record_pickles():
+    record = MessageRecord({"role": "user", "content": "Hi", "name": "kyle"})
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_history_acts_like_a_list():
+    history = MessageHistory([system("Be brief."), "Hi"])
+    history.append(assistant("Hello"))
+
+    assert history == [system("Be brief."), user("Hi"), assistant("Hello")]
+    assert len(history) == 3
+    assert all(isinstance(message, MessageRecord) for message in history)
+    assert history[1:] == [user("Hi"), assistant("Hello")]
+    assert history.to_dicts()[0] == {"role": "system", "content": "Be brief."}
+
+    history[0] = system("Be verbose.")
+    assert history[0]["content"] == "Be verbose."
+
+
+def test_history_view_is_a_snapshot():
+    history = MessageHistory([user("Hi")])
+    pending = [MessageRecord(user("Still there?"))]
+    view = history.view(pending)
+
+    history.append(assistant("Hello"))
+
+    assert len(view) == 2
+    assert view == [user("Hi"), user("Still there?")]
+    assert view[-1] is pending[0]
+    assert view[1:] == [user("Still there?")]
+    assert view[::-1] == [user("Still there?"), user("Hi")]
+
+
+def test_request_key_is_the_same_for_records():
+    messages = [system("Be brief."), user("Hi")]
+    history = MessageHistory(messages)
+
+    assert request_key({"messages": history.view()}) == request_key({"messages": messages})
+
+
+def test_chat_stores_records():
+    chat = Chat(system("Be brief."), "Hi", api_key="sk-test")
+
+    assert isinstance(chat.messages, MessageHistory)
+    assert chat.messages == [system("Be brief."), user("Hi")]
+
+    chat.messages = [user("Fresh start")]
+    assert isinstance(chat.messages, MessageHistory)
+
+    chat.clear_history()
+    assert len(chat.messages) == 0
+
+
+def double(x: int) -> int:
+    """Double a number."""
+    return x * 2
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_tool_calls_are_recorded_once():
+    calls = StreamScript(tool_calls=[ScriptedToolCall(name="double", arguments='{"x": 2}')] * 2)
+    answer = StreamScript(content="Both are 4")
+
+    registry = FunctionRegistry()
+    registry.register(double)
+
+    async with ClientPool(http2=False) as pool:
+        with StubServer(after_tools(calls, answer)) as server:
+            chat = Chat(
+                base_url=server.url, api_key="stub", client_pool=pool, function_registry=registry, display=False
+            )
+            await chat.submit("Double 2 twice", stream=False)
+
+    assert [message["role"] for message in chat.messages] == ["user", "assistant", "tool", "tool", "assistant"]
+    assert len(chat.messages[1]["tool_calls"]) == 2
+
+
+def test_history_adds_like_a_list():
+    history = MessageHistory([user("Hi")])
+
+    combined = history + [assistant("Hello")]
+    assert combined == [user("Hi"), assistant("Hello")]
+    assert type(combined) is list
+    assert all(type(message) is dict for message in combined)
+
+    assert [system("Be brief.")] + history == [system("Be brief."), user("Hi")]
+
+    history += [assistant("Hello")]
+    assert isinstance(history, MessageHistory)
+    assert len(history) == 2
+
+
+def test_history_exports_json():
+    import json
+
+    history = MessageHistory([system("Be brief."), user("Hi")])
+
+    assert json.loads(history.to_json()) == [system("Be brief."), user("Hi")]
+    assert json.dumps(history + [assistant("Hello")])
+
+
+def test_chat_history_is_plain_data():
+    import json
+
+    chat = Chat(system("Be brief."), "Hi", api_key="sk-test")
+
+    history = chat.get_history()
+    assert all(type(message) is dict for message in history)
+    assert json.loads(json.dumps(history)) == [system("Be brief."), user("Hi")]
+    assert json.loads(json.dumps(chat.messages + [assistant("Hello")]))[-1] == assistant("Hello")
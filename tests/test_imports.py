@@ -0,0 +1,63 @@
+# flake8: noqa
+import json
+import subprocess
+import sys
+
+import pytest
+
+import chatlab
+
+# Generous, so that slow CI machines don't fail. Importing chatlab itself takes a few milliseconds.
+IMPORT_BUDGET_SECONDS = 0.25
+TOOLS_IMPORT_BUDGET_SECONDS = 1.0
+
+HEAVY_MODULES = ["openai", "IPython", "spork", "instructor", "aiofiles", "repr_llm", "httpx"]
+
+
+def import_in_subprocess(statement: str) -> dict:
+    code = f"""
+import json, sys, time
+started = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_chatlab_is_lazy():
+    result = import_in_subprocess("import chatlab")
+
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS
+
+
+def test_import_tools_skips_ipython():
+    result = import_in_subprocess("import chatlab.tools, chatlab.builtins")
+
+    assert result["loaded"] == []
+    assert result["seconds"] < TOOLS_IMPORT_BUDGET_SECONDS
+
+
+def test_lazy_attributes():
+    from chatlab.chat import Chat
+    from chatlab.registry import FunctionRegistry
+
+    assert chatlab.Chat is Chat
+    assert chatlab.FunctionRegistry is FunctionRegistry
+    assert chatlab.models.GPT_4 == "gpt-4"
+
+    for name in chatlab.__all__:
+        assert getattr(chatlab, name) is not None
+    assert set(chatlab.__all__) <= set(dir(chatlab))
+
+    with pytest.raises(AttributeError):
+        chatlab.not_a_thing
+
+
+def test_chat_lab_shell_is_still_importable():
+    from chatlab.tools.python import ChatLabShell
+    from chatlab.tools._ipython import ChatLabShell as Shell
+
+    assert ChatLabShell is Shell
@@ -0,0 +1,49 @@
+# flake8: noqa
+import json
+
+import pytest
+from jiter import from_json
+
+from chatlab.partial_json import PartialJSONError, PartialJSONParser
+
+DOCUMENTS = [
+    {"a": 'he"llo\\né 😀', "b": [1, 2.5, -3e2, True, False, None, {"c": []}], "d": {}},
+    {"kg": {"nodes": [{"id": 1, "label": "A", "color": "red"}, {"id": 2, "label": "B"}], "edges": []}},
+    [1, "two", [3, [4, {"five": 5}]]],
+]
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_partial_values_match_jiter(document, ensure_ascii):
+    text = json.dumps(document, ensure_ascii=ensure_ascii)
+
+    parser = PartialJSONParser()
+    for end in range(1, len(text) + 1):
+        # Feed one character at a time, checking every prefix
+        parser.feed(text[end - 1])
+        expected = from_json(text[:end].encode("utf-8"), partial_mode="trailing-strings")
+        assert parser.value == expected, text[:end]
+
+    assert parser.complete
+    assert parser.value == document
+
+
+def test_escapes_split_across_chunks():
+    parser = PartialJSONParser()
+    for chunk in ['{"text": "a\\', "nb \\u00", 'e9"}']:
+        parser.feed(chunk)
+
+    assert parser.value == {"text": "a\nb é"}
+
+
+@pytest.mark.parametrize("text", ['{"a" 1}', '{"a": tru}', "[1 2]", '{"a": 1}}', '{"a": "\\q"}'])
+def test_invalid_json_raises(text):
+    parser = PartialJSONParser()
+    with pytest.raises(PartialJSONError):
+        parser.feed(text)
+
+    # Once broken, the parser stays broken
+    assert parser.error is not None
+    with pytest.raises(PartialJSONError):
+        parser.feed("{}")
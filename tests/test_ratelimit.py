@@ -0,0 +1,83 @@
+# flake8: noqa
+import httpx
+import openai
+import pytest
+
+from chatlab.ratelimit import RateLimitGovernor, TokenBucket, parse_duration, retry_after_from_headers
+
+
+def rate_limit_error(headers=None) -> openai.RateLimitError:
+    response = httpx.Response(
+        429, headers=headers or {}, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    )
+    return openai.RateLimitError("Rate limited", response=response, body=None)
+
+
+def test_parse_duration():
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("1s") == 1
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("1.5") == 1.5
+    assert parse_duration("soon") is None
+
+
+def test_retry_after_from_headers():
+    assert retry_after_from_headers({"retry-after-ms": "250"}) == 0.25
+    assert retry_after_from_headers({"retry-after": "3"}) == 3
+    assert retry_after_from_headers({"x-ratelimit-reset-requests": "2s", "x-ratelimit-reset-tokens": "500ms"}) == 2
+    assert retry_after_from_headers({}) is None
+
+
+def test_retry_after_waits_only_for_the_exhausted_limit():
+    resets = {"x-ratelimit-reset-requests": "2s", "x-ratelimit-reset-tokens": "6m0s"}
+
+    assert retry_after_from_headers({**resets, "x-ratelimit-remaining-requests": "0"}) == 2
+    assert (
+        retry_after_from_headers(
+            {**resets, "x-ratelimit-remaining-requests": "0", "x-ratelimit-remaining-tokens": "5000"}
+        )
+        == 2
+    )
+    assert (
+        retry_after_from_headers({**resets, "x-ratelimit-remaining-requests": "9", "x-ratelimit-remaining-tokens": "0"})
+        == 360
+    )
+    # Without knowing which ran out, wait for both
+    assert retry_after_from_headers(resets) == 360
+
+
+def test_token_bucket_paces_after_capacity():
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(60) == 0
+    # Empty now, refilling at one token per second
+    assert bucket.reserve(1) == pytest.approx(1, abs=0.01)
+    assert bucket.reserve(1) == pytest.approx(2, abs=0.01)
+
+
+def test_governor_honors_retry_after():
+    governor = RateLimitGovernor()
+
+    delay = governor.backoff(1, rate_limit_error({"retry-after": "2"}))
+    assert delay == 2
+
+    # Every chat sharing the governor now waits out the pause
+    assert governor.reserve() >= 1.9
+
+
+def test_governor_backoff_is_capped_and_jittered():
+    governor = RateLimitGovernor(base_delay=1, max_delay=4)
+
+    delays = [governor.backoff(10, rate_limit_error()) for _ in range(20)]
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_governor_observes_exhausted_limits():
+    governor = RateLimitGovernor()
+
+    governor.observe({"x-ratelimit-remaining-requests": "10", "x-ratelimit-reset-requests": "1s"})
+    assert governor.reserve() == 0
+
+    governor.observe({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "3s"})
+    assert governor.reserve() >= 2.9
@@ -1,5 +1,12 @@
 # flake8: noqa
+import asyncio
+import json
+import os
+import re
+import threading
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 from unittest import mock
 from unittest.mock import MagicMock, patch
@@ -7,7 +14,14 @@ from unittest.mock import MagicMock, patch
 import pytest
 from pydantic import BaseModel, Field, PydanticInvalidForJsonSchema
 
-from chatlab.registry import FunctionArgumentError, FunctionRegistry, UnknownFunctionError, generate_function_schema
+from chatlab.decorators import run_in, timeout
+from chatlab.registry import (
+    FunctionArgumentError,
+    FunctionRegistry,
+    ToolTimeoutError,
+    UnknownFunctionError,
+    generate_function_schema,
+)
 
 
 # Define a function to use in testing
@@ -305,6 +319,38 @@ async def test_function_registry_call():
     assert result == "1, str, True"
 
 
+@pytest.mark.asyncio
+async def test_function_registry_call_validates_arguments():
+    registry = FunctionRegistry()
+    registry.register(simple_func_with_model_args)
+
+    result = await registry.call(
+        "simple_func_with_model_args",
+        arguments='{"x": 1, "y": "str", "model": {"x": 2, "y": "inner"}}',
+    )
+    assert result == "1, str, False, x=2 y='inner' z=False, None"
+
+    with pytest.raises(FunctionArgumentError, match="Invalid arguments for simple_func_with_model_args"):
+        await registry.call("simple_func_with_model_args", arguments='{"y": "str"}')
+
+    with pytest.raises(FunctionArgumentError, match="Invalid arguments for simple_func_with_model_args"):
+        await registry.call("simple_func_with_model_args", arguments='{"x": "one", "y": "str"}')
+
+
+@pytest.mark.asyncio
+async def test_function_registry_call_keeps_defaults():
+    registry = FunctionRegistry()
+
+    async def greet(name: str, greeting: Optional[str] = "Hello"):
+        """Greet someone"""
+        return f"{greeting}, {name}"
+
+    registry.register(greet)
+
+    assert await registry.call("greet", arguments='{"name": "Kyle"}') == "Hello, Kyle"
+    assert await registry.call("greet", arguments='{"name": "Kyle", "greeting": null}') == "None, Kyle"
+
+
 # Testing for registry's register method with an invalid function
 def test_function_registry_register_invalid_function():
     registry = FunctionRegistry()
@@ -445,3 +491,214 @@ async def test_function_registry_call_tool():
             },
         },
     ]
+
+
+def test_function_registry_manifest_is_memoized():
+    registry = FunctionRegistry()
+    registry.register(simple_func, SimpleModel)
+
+    manifest = registry.manifest
+    assert registry.manifest is manifest
+    assert registry.tools is manifest.tools
+    assert registry.api_manifest()["functions"] == manifest.functions
+    assert json.loads(manifest.json) == manifest.tools
+
+    # Registering a function invalidates it
+    registry.register(simple_func_with_model_arg)
+    assert registry.manifest is not manifest
+    assert len(registry.manifest) == 2
+    assert registry.manifest.hash != manifest.hash
+
+    # The hash only depends on the definitions
+    other = FunctionRegistry()
+    other.register(simple_func, SimpleModel)
+    assert other.manifest.hash == manifest.hash
+
+
+def current_thread_name():
+    """Get the name of the thread this runs in"""
+    return threading.current_thread().name
+
+
+@run_in("process")
+def current_process_id():
+    """Get the id of the process this runs in"""
+    return os.getpid()
+
+
+@pytest.mark.asyncio
+async def test_function_registry_runs_sync_functions_in_threads():
+    registry = FunctionRegistry()
+    registry.register(current_thread_name)
+
+    assert await registry.call("current_thread_name") != threading.current_thread().name
+
+    registry.default_executor = "inline"
+    assert await registry.call("current_thread_name") == threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_function_registry_sync_functions_dont_block_the_loop():
+    registry = FunctionRegistry()
+
+    def nap():
+        """Take a quick nap"""
+        time.sleep(0.2)
+        return "rested"
+
+    registry.register(nap)
+
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    result, _ = await asyncio.gather(registry.call("nap"), tick())
+    assert result == "rested"
+    assert ticks == 10
+
+
+@pytest.mark.asyncio
+async def test_run_python_runs_on_the_main_thread():
+    from chatlab.tools import run_python
+
+    # The registry sends sync functions to threads, but IPython stays on the main thread
+    registry = FunctionRegistry(python_hallucination_function=run_python)
+    output = await registry.call("python", "import threading\nprint(threading.current_thread().name)")
+
+    assert threading.current_thread() is threading.main_thread()
+    assert "MainThread" in output
+
+
+@pytest.mark.asyncio
+async def test_function_registry_executor_from_metadata():
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        registry = FunctionRegistry(default_executor="inline", process_pool=pool)
+        registry.register(current_process_id)
+
+        assert await registry.call("current_process_id") != os.getpid()
+
+
+@pytest.mark.asyncio
+async def test_function_registry_timeouts():
+    registry = FunctionRegistry(default_timeout=0.05)
+    cancelled = asyncio.Event()
+
+    async def hang():
+        """Never finishes"""
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    @timeout(0.5)
+    async def slow():
+        """Takes a little while"""
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def fail():
+        """Times out on its own"""
+        raise TimeoutError("upstream timed out")
+
+    registry.register(hang)
+    registry.register(slow)
+    registry.register(fail)
+
+    with pytest.raises(ToolTimeoutError, match="hang timed out after 0.05 seconds"):
+        await registry.call("hang")
+    assert cancelled.is_set()
+
+    # The function's own timeout overrides the default
+    assert await registry.call("slow") == "done"
+
+    # Timeouts from inside the function aren't ours
+    with pytest.raises(TimeoutError, match="upstream timed out") as exc_info:
+        await registry.call("fail")
+    assert not isinstance(exc_info.value, ToolTimeoutError)
+
+
+@pytest.mark.asyncio
+async def test_function_registry_times_out_sync_functions():
+    # Even when sync functions run on the event loop by default, timed ones are sent to a thread
+    registry = FunctionRegistry(default_executor="inline")
+
+    @timeout(0.1)
+    def nap():
+        """Take a long nap"""
+        time.sleep(0.5)
+        return "done"
+
+    registry.register(nap)
+
+    started = time.perf_counter()
+    with pytest.raises(ToolTimeoutError, match="nap timed out after 0.1 seconds"):
+        await registry.call("nap")
+    assert time.perf_counter() - started < 0.4
+
+
+def test_function_registry_rejects_timeouts_for_inline_functions():
+    registry = FunctionRegistry()
+
+    @timeout(0.1)
+    @run_in("inline")
+    def nap():
+        """Take a long nap"""
+        time.sleep(0.5)
+
+    with pytest.raises(ValueError, match="can't be timed out"):
+        registry.register(nap)
+
+
+@pytest.mark.asyncio
+async def test_function_registry_streaming_tools():
+    registry = FunctionRegistry()
+
+    async def crawl(pages: int):
+        """Crawl some pages"""
+        for page in range(pages):
+            await asyncio.sleep(0)
+            yield f"page {page}\n"
+
+    def build():
+        """Run a build"""
+        yield "compiling\n"
+        yield {"warnings": 0}
+        yield "done\n"
+
+    registry.register(crawl)
+    registry.register(build)
+
+    chunks = []
+    result = await registry.call("crawl", '{"pages": 3}', on_chunk=chunks.append)
+    assert result == "page 0\npage 1\npage 2\n"
+    assert chunks == ["page 0\n", "page 0\npage 1\n", "page 0\npage 1\npage 2\n"]
+
+    assert await registry.call("build") == "compiling\n{'warnings': 0}\ndone\n"
+
+
+@pytest.mark.asyncio
+async def test_function_registry_streaming_tools_stay_in_budget():
+    registry = FunctionRegistry(default_max_output_chars=100)
+
+    def logs():
+        """Emit a lot of logs"""
+        for line in range(10_000):
+            yield f"line {line}\n"
+
+    registry.register(logs)
+
+    result = await registry.call("logs")
+    assert len(result) <= 100
+    assert result.startswith("line 0\n")
+    assert result.endswith("line 9999\n")
+
+    # One marker, counting everything that was left out
+    head, elided, tail = re.fullmatch(r"(.*)\n\.\.\.\[(\d+) characters elided\]\.\.\.\n(.*)", result, re.S).groups()
+    total = sum(len(f"line {line}\n") for line in range(10_000))
+    assert int(elided) == total - len(head) - len(tail)
+    assert "elided" not in head + tail
@@ -0,0 +1,73 @@
+# flake8: noqa
+import json
+
+import pandas as pd
+import pytest
+
+from chatlab.registry import FunctionRegistry
+from chatlab.decorators import limit_output
+from chatlab.shaping import shape_dataframe, shape_json, shape_output, shape_text
+
+
+def test_small_output_is_unchanged():
+    assert shape_output("hello", max_chars=10) == "hello"
+    assert shape_output({"a": 1}, max_chars=100) == "{'a': 1}"
+    assert shape_output(42, max_chars=None) == "42"
+
+
+def test_shape_text_keeps_head_and_tail():
+    text = "a" * 500 + "b" * 500
+    shaped = shape_text(text, max_chars=100)
+
+    assert len(shaped) <= 100
+    assert shaped.startswith("aaaa")
+    assert shaped.endswith("bbbb")
+    assert "characters elided" in shaped
+
+
+def test_shape_json_summarizes_with_schema_and_sample():
+    value = [{"id": i, "name": f"item {i}", "tags": ["x", "y"]} for i in range(1000)]
+    shaped = json.loads(shape_json(value, max_chars=1000))
+
+    assert "over the limit of 1000" in shaped["note"]
+    assert shaped["schema"] == [{"id": "number", "name": "string", "tags": ["string", "2 items"]}, "1000 items"]
+    assert shaped["sample"][0] == {"id": 0, "name": "item 0", "tags": ["x", "y"]}
+    assert shaped["sample"][-1] == "...[997 items elided]..."
+
+
+def test_json_strings_are_summarized_as_json():
+    value = json.dumps({"rows": list(range(10_000))})
+    shaped = json.loads(shape_output(value, max_chars=500))
+
+    assert shaped["schema"] == {"rows": ["number", "10000 items"]}
+
+
+def test_shape_dataframe_shows_shape_and_head():
+    df = pd.DataFrame({"a": range(10_000), "b": ["text"] * 10_000})
+    assert shape_output(df, max_chars=1000) == repr(df)
+
+    shaped = shape_output(df, max_chars=200)
+    assert len(shaped) <= 200
+    assert "DataFrame with 10000 rows and 2 columns" in shaped
+    assert "a: int64" in shaped
+    assert "rows elided" in shaped
+
+
+@pytest.mark.asyncio
+async def test_registry_formats_output_within_budget():
+    registry = FunctionRegistry(default_max_output_chars=200)
+
+    def big():
+        """Returns a lot"""
+        return "x" * 10_000
+
+    @limit_output(50)
+    def bigger():
+        """Returns even more"""
+        return "x" * 10_000
+
+    registry.register(big)
+    registry.register(bigger)
+
+    assert len(registry.format_output("big", await registry.call("big"))) <= 200
+    assert len(registry.format_output("bigger", await registry.call("bigger"))) <= 50
@@ -0,0 +1,214 @@
+# flake8: noqa
+import os
+import sqlite3
+
+import pytest
+
+from chatlab import Chat
+from chatlab.context import TokenCounter
+from chatlab.messaging import assistant, system, tool_result, user
+from chatlab.stores import JSONLStore, SQLiteStore, decode_message, encode_message, load_tail
+from chatlab.stores.base import ZLIB
+
+from .test_chat import FakeClientPool, content_chunk, finish_chunk
+
+
+@pytest.fixture(params=["sqlite", "jsonl"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteStore(str(tmp_path / "conversations.sqlite3"))
+    return JSONLStore(str(tmp_path / "conversations"))
+
+
+def reopen(store):
+    if isinstance(store, SQLiteStore):
+        return SQLiteStore(store.path)
+    return JSONLStore(store.directory)
+
+
+def test_encode_round_trips_and_compresses_large_messages():
+    small = user("Hi")
+    large = tool_result("call_1", "All work and no play makes Jack a dull boy. " * 100, "lookup")
+
+    assert encode_message(small)[0] != ZLIB
+    encoding, data = encode_message(large)
+    assert encoding == ZLIB
+    assert len(data) < len(large["content"])
+
+    assert decode_message(*encode_message(small)) == small
+    assert decode_message(encoding, data) == large
+
+
+def test_append_and_page(store):
+    messages = [user(f"Message {i}") for i in range(25)]
+    store.append("a", messages[:10])
+    store.append("a", messages[10:])
+
+    assert store.count("a") == 25
+    assert store.count("missing") == 0
+    assert store.load("a") == messages
+    assert store.load("a", 10, 5) == messages[10:15]
+    assert store.load("a", 20, 100) == messages[20:]
+    assert store.load("a", 25) == []
+    assert store.load("missing") == []
+
+
+def test_survives_reopening(store):
+    large = tool_result("call_1", "x" * 5000, "lookup")
+    store.append("a", [system("Be brief."), user("Hi"), large])
+
+    reopened = reopen(store)
+    assert reopened.count("a") == 3
+    assert reopened.load("a", 1) == [user("Hi"), large]
+
+    reopened.append("a", [assistant("Hello")])
+    assert reopened.load("a", 3) == [assistant("Hello")]
+
+
+def test_sessions_and_delete(store):
+    store.append("a", [user("Hi")])
+    store.append("b", [user("Hello")])
+
+    assert store.sessions() == ["a", "b"]
+
+    store.delete("a")
+    assert store.sessions() == ["b"]
+    assert store.count("a") == 0
+    assert store.load("b") == [user("Hello")]
+
+
+def test_large_messages_are_stored_compressed(tmp_path):
+    content = "The quick brown fox jumps over the lazy dog. " * 200
+    store = SQLiteStore(str(tmp_path / "conversations.sqlite3"))
+    store.append("a", [tool_result("call_1", content, "lookup")])
+
+    with sqlite3.connect(store.path) as connection:
+        encoding, data = connection.execute("SELECT encoding, data FROM messages").fetchone()
+    assert encoding == ZLIB
+    assert len(data) < len(content) / 10
+
+    jsonl = JSONLStore(str(tmp_path / "conversations"))
+    jsonl.append("a", [tool_result("call_1", content, "lookup")])
+    assert os.path.getsize(tmp_path / "conversations" / "a.jsonl") < len(content) / 5
+    assert jsonl.load("a")[0]["content"] == content
+
+
+def test_jsonl_ignores_an_interrupted_append(tmp_path):
+    store = JSONLStore(str(tmp_path))
+    store.append("a", [user("Hi")])
+
+    # A line written without its index entry, as if the process died mid-append
+    with open(tmp_path / "a.jsonl", "ab") as data:
+        data.write(b'{"role":"user","content":"Lost"}\n')
+
+    assert store.count("a") == 1
+    assert store.load("a") == [user("Hi")]
+
+    store.append("a", [user("Again")])
+    assert store.load("a") == [user("Hi"), user("Again")]
+
+
+def test_jsonl_rebuilds_a_missing_index(tmp_path):
+    store = JSONLStore(str(tmp_path))
+    store.append("a", [user("Hi"), assistant("Hello")])
+    os.remove(tmp_path / "a.idx")
+
+    assert store.count("a") == 2
+    assert store.load("a", 1) == [assistant("Hello")]
+
+
+def test_jsonl_rejects_unsafe_session_ids(tmp_path):
+    store = JSONLStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.append("../escape", [user("Hi")])
+
+
+def test_load_tail_keeps_system_messages_and_the_end(store):
+    store.append("a", [system("Be brief.")] + [user(f"Message {i}") for i in range(50)])
+
+    assert load_tail(store, "a", max_messages=3, page_size=4) == [
+        system("Be brief."),
+        user("Message 47"),
+        user("Message 48"),
+        user("Message 49"),
+    ]
+
+
+def test_load_tail_fits_the_budget(store):
+    counter = TokenCounter("gpt-4o-mini")
+    messages = [user(f"Message number {i}") for i in range(100)]
+    store.append("a", messages)
+
+    budget = counter.count(messages[-10:])
+    tail = load_tail(store, "a", budget=budget, counter=counter, page_size=7)
+
+    assert tail == messages[-10:]
+
+    # The last message is kept even when it doesn't fit
+    assert load_tail(store, "a", budget=1, counter=counter) == messages[-1:]
+
+
+def test_load_tail_reads_only_what_it_needs(store):
+    store.append("a", [user(f"Message {i}") for i in range(1000)])
+
+    loaded = []
+    load = store.load
+
+    def counting_load(session_id, offset=0, limit=None):
+        page = load(session_id, offset, limit)
+        loaded.extend(page)
+        return page
+
+    store.load = counting_load
+    load_tail(store, "a", max_messages=5, page_size=10)
+
+    assert len(loaded) <= 20
+
+
+def test_load_tail_drops_orphaned_results(store):
+    store.append(
+        "a",
+        [
+            user("What's 6 times 7?"),
+            assistant("Let me check."),
+            tool_result("call_1", "42", "lookup"),
+            assistant("42"),
+        ],
+    )
+
+    assert load_tail(store, "a", max_messages=2) == [assistant("42")]
+
+
+@pytest.mark.asyncio
+async def test_chat_persists_and_resumes(store):
+    pool = FakeClientPool([content_chunk("Hello"), finish_chunk("stop")])
+    chat = Chat(system("Be brief."), api_key="sk-test", client_pool=pool, store=store, session_id="birds")
+
+    await chat.submit("Hi")
+
+    assert store.load("birds") == [system("Be brief."), user("Hi"), assistant("Hello")]
+
+    # Initial context is only used for new sessions
+    resumed = Chat(system("Ignored."), api_key="sk-test", client_pool=pool, store=reopen(store), session_id="birds")
+    assert resumed.messages == [system("Be brief."), user("Hi"), assistant("Hello")]
+
+    resumed.append("More")
+    assert store.count("birds") == 4
+
+
+def test_chat_resumes_only_what_fits(store):
+    store.append("long", [system("Be brief.")] + [user("x" * 400) for _ in range(200)])
+
+    chat = Chat(api_key="sk-test", store=store, session_id="long", max_context_tokens=2000, reserve_tokens=0)
+
+    assert 1 < len(chat.messages) < 50
+    assert chat.messages[0] == system("Be brief.")
+    assert chat.token_counter.count(chat.messages) <= 2000
+
+
+def test_chat_without_a_session_id_starts_a_new_one(store):
+    first = Chat(system("Be brief."), api_key="sk-test", store=store)
+    second = Chat(system("Be brief."), api_key="sk-test", store=store)
+
+    assert first.session_id != second.session_id
+    assert sorted(store.sessions()) == sorted([first.session_id, second.session_id])
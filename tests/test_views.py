@@ -49,3 +49,159 @@ def test_assistant_function_call_view_get():
         "custom_render": None,
         "finished": True,
     }
+
+
+class RecordingSink:
+    def __init__(self):
+        self.events = []
+
+    def display(self, view):
+        self.events.append(("display", type(view).__name__))
+
+    def update(self, view):
+        self.events.append(("update", type(view).__name__))
+
+
+def test_views_send_output_to_sink(capsys):
+    sink = RecordingSink()
+
+    amv = AssistantMessageView(sink=sink)
+    amv.display_once()
+    amv.append("Hello")
+
+    afcv = ToolArguments(id="eh", name="compute_pi", sink=sink)
+    afcv.display()
+    afcv.apply_result("3.14159")
+
+    assert ("display", "AssistantMessageView") in sink.events
+    assert ("update", "AssistantMessageView") in sink.events
+    assert ("display", "ToolArguments") in sink.events
+    assert ("update", "ToolCalled") in sink.events
+    assert capsys.readouterr().out == ""
+
+
+def test_assistant_message_view_coalesces_updates():
+    sink = RecordingSink()
+    amv = AssistantMessageView(sink=sink, max_rate=1)
+    amv.display_once()
+
+    for _ in range(100):
+        amv.append("a")
+
+    # The first delta shows right away and the rest wait for the next frame
+    assert amv.content == "a"
+    updates = len(sink.events)
+
+    # Nothing is lost once flushed
+    assert amv.get_message() == {"role": "assistant", "content": "a" * 100}
+    assert len(sink.events) == updates + 1
+
+
+def test_assistant_message_view_unlimited_rate():
+    sink = RecordingSink()
+    amv = AssistantMessageView(sink=sink, max_rate=None)
+
+    for _ in range(10):
+        amv.append("a")
+
+    assert amv.content == "a" * 10
+    assert sink.events.count(("update", "AssistantMessageView")) == 10
+
+
+def test_tool_arguments_stream_into_custom_render():
+    rendered = []
+
+    def render_greeting(name: str, excited: bool = False):
+        rendered.append((name, excited))
+        return None
+
+    afcv = ToolArguments(id="eh", name="greet", custom_render=render_greeting, sink=RecordingSink())
+    for chunk in ['{"na', 'me": "Pika', 'chu", "exci', 'ted": true}']:
+        afcv.append_arguments(chunk)
+        afcv.render()
+
+    assert afcv.arguments == '{"name": "Pikachu", "excited": true}'
+    assert rendered[-1] == ("Pikachu", True)
+    assert ("Pika", False) in rendered
+
+
+def test_custom_render_model_is_built_once(monkeypatch):
+    from chatlab.views import tools
+
+    calls = []
+    extract = tools.extract_model_from_function
+
+    def counting_extract(name, function):
+        calls.append(name)
+        return extract(name, function)
+
+    monkeypatch.setattr(tools, "extract_model_from_function", counting_extract)
+    cached_before = len(tools._render_models)
+
+    def render_greeting(name: str):
+        return None
+
+    afcv = ToolArguments(id="eh", name="greet", custom_render=render_greeting, sink=RecordingSink())
+    for chunk in ['{"na', 'me": "Pika', 'chu"}']:
+        afcv.append_arguments(chunk)
+    afcv.apply_result("Hello").render()
+
+    assert calls == ["greet"]
+
+    # Models don't outlive their renderers
+    del afcv, render_greeting
+    import gc
+
+    gc.collect()
+    assert len(tools._render_models) == cached_before
+
+
+@pytest.mark.asyncio
+async def test_tool_call_timeout_result():
+    import asyncio
+    import json
+
+    from chatlab.registry import FunctionRegistry
+
+    async def hang():
+        """Never finishes"""
+        await asyncio.sleep(10)
+
+    registry = FunctionRegistry(default_timeout=0.01)
+    registry.register(hang)
+
+    tool = ToolArguments(id="call_1", name="hang", arguments="{}", sink=RecordingSink())
+    called = await tool.call(registry)
+
+    assert called.verbage == "Timed out"
+    assert json.loads(called.result) == {
+        "error": "timeout",
+        "function": "hang",
+        "timeout_seconds": 0.01,
+        "message": "hang did not finish within 0.01 seconds and was cancelled.",
+    }
+
+
+@pytest.mark.asyncio
+async def test_streaming_tool_call_displays_progress():
+    from chatlab.registry import FunctionRegistry
+
+    async def count():
+        """Count to three"""
+        for n in range(3):
+            yield f"{n}\n"
+
+    registry = FunctionRegistry()
+    registry.register(count)
+
+    class VerbageSink(RecordingSink):
+        def update(self, view):
+            self.events.append((view.verbage, getattr(view, "result", None)))
+
+    sink = VerbageSink()
+    tool = ToolArguments(id="call_1", name="count", arguments="{}", sink=sink)
+    called = await tool.call(registry)
+
+    assert called.result == "0\n1\n2\n"
+    assert called.verbage == "Called"
+    assert ("Streaming", "0\n") in sink.events